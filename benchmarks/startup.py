@@ -0,0 +1,138 @@
+"""Measure the startup time of common torch-submit commands against a time budget.
+
+Each command is run in a fresh interpreter, against a temporary home directory holding a
+cluster configuration and a job database whose statuses were all checked recently, so
+that no command needs to reach a node. The median wall time of each command is compared
+with its budget, and the script exits with status 1 if any command is over budget.
+
+Usage:
+    python benchmarks/startup.py [--runs 7] [--jobs 20] [--budget 0.5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Commands to time, with their budget in seconds.
+COMMANDS = [
+    (["--version"], 0.5),
+    (["job", "list"], 0.5),
+    (["cluster", "list"], 0.5),
+]
+
+
+def populate(home: str, num_jobs: int):
+    """Write a cluster configuration and a database of recently checked jobs.
+
+    Args:
+        home (str): The temporary home directory.
+        num_jobs (int): The number of jobs to add to the database.
+    """
+    sys.path.insert(0, REPO_ROOT)
+    from torch_submit.config import Node
+    from torch_submit.job import JobManager
+    from torch_submit.types import Executor, Job, JobStatus
+
+    cache_dir = os.path.join(home, ".cache", "torch-submit")
+    os.makedirs(cache_dir)
+    node = {
+        "public_ip": "10.0.0.1",
+        "private_ip": None,
+        "num_gpus": 8,
+        "nproc": 8,
+        "ssh_user": None,
+        "ssh_pub_key_path": None,
+        "ssh_port": None,
+    }
+    with open(os.path.join(cache_dir, "config.yaml"), "w") as f:
+        yaml.dump(
+            {
+                "clusters": {"bench": {"head_node": node, "worker_nodes": [node] * 3}},
+                "databases": {},
+            },
+            f,
+        )
+
+    job_manager = JobManager(os.path.join(cache_dir, "jobs.db"))
+    nodes = [Node(**dict(node, public_ip=f"10.0.0.{i}")) for i in range(1, 5)]
+    # Far in the future, so that job list serves every status from the database
+    checked_at = time.time() + 365 * 24 * 3600
+    for i in range(num_jobs):
+        job = Job(
+            id=f"job-{i}",
+            name=f"bench-{i}",
+            status=JobStatus.RUNNING,
+            working_dir="/tmp",
+            nodes=nodes,
+            cluster="bench",
+            command="python train.py",
+            pids={node: 1000 + i for node in nodes},
+            executor=Executor.TORCHRUN,
+            status_checked_at=checked_at,
+        )
+        job_manager.add_job(job)
+    job_manager.close()
+
+
+def time_command(args, home: str, runs: int) -> float:
+    """Run a torch-submit command several times and return its median wall time.
+
+    Args:
+        args (List[str]): The arguments of the command.
+        home (str): The home directory of the command.
+        runs (int): The number of runs.
+
+    Returns:
+        float: The median wall time in seconds.
+    """
+    env = dict(os.environ, HOME=home, PYTHONPATH=REPO_ROOT)
+    # Same as the torch-submit console script
+    command = [sys.executable, "-c", "from torch_submit.cli import app; app()"] + args
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="Runs per command")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs in the database")
+    parser.add_argument(
+        "--budget", type=float, default=None, help="Override the budget of all commands"
+    )
+    args = parser.parse_args()
+
+    over_budget = False
+    with tempfile.TemporaryDirectory() as home:
+        populate(home, args.jobs)
+        for command, budget in COMMANDS:
+            budget = args.budget or budget
+            elapsed = time_command(command, home, args.runs)
+            status = "ok" if elapsed <= budget else "OVER BUDGET"
+            over_budget |= elapsed > budget
+            print(
+                f"torch-submit {' '.join(command):<15} {elapsed * 1000:7.1f} ms "
+                f"(budget {budget * 1000:.0f} ms) {status}"
+            )
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from torch_submit.scripts import agent, probe
+
+AGENT = os.path.abspath(agent.__file__)
+
+
+def read_pieces(output):
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, output)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as stream:
+        return list(agent.read_pieces(stream))
+
+
+def test_pieces_end_in_line_feed_or_carriage_return(monkeypatch):
+    # Read in small chunks, so that pieces span several reads
+    monkeypatch.setattr(agent, "READ_BYTES", 3)
+
+    pieces = read_pieces(b" 10%\r 20%\r 30%\rdone\nlast")
+
+    assert pieces == [b" 10%\r", b" 20%\r", b" 30%\r", b"done\n", b"last"]
+
+
+def test_long_output_without_line_breaks_is_split(monkeypatch):
+    monkeypatch.setattr(agent, "MAX_LINE_BYTES", 4)
+
+    pieces = read_pieces(b"abcdefgh\nij")
+
+    assert pieces == [b"abcd", b"efgh", b"\n", b"ij"]
+
+
+def test_agent_records_output_and_restarts(tmp_path):
+    command = (
+        "printf ' 50%%\\r100%%\\r\\n'; "
+        "echo '3/3 attempts left; will restart worker group'; exit 3"
+    )
+
+    subprocess.run([sys.executable, AGENT, str(tmp_path), command], check=True)
+
+    with open(tmp_path / "output.log", "rb") as f:
+        assert f.read() == (
+            b" 50%\r100%\r\n3/3 attempts left; will restart worker group\n"
+        )
+    with open(tmp_path / "state.log") as f:
+        events = [json.loads(line) for line in f]
+    assert [event["event"] for event in events] == ["started", "restarted", "exited"]
+    assert events[-1]["exit_code"] == 3
+    assert (tmp_path / "exit_code").read_text() == "3\n"
+
+
+def probe_job(job_dir, monkeypatch, capsys):
+    monkeypatch.setattr(probe, "JOB_DIR_PREFIX", job_dir[: -len("1")])
+    probe.main({"1"})
+    return json.loads(capsys.readouterr().out)["1"]
+
+
+def test_restarted_job_is_reported_running(tmp_path, monkeypatch, capsys):
+    # `job restart` runs the job again in the directory of the previous run
+    job_dir = str(tmp_path / "job_1")
+    os.makedirs(job_dir)
+    subprocess.run([sys.executable, AGENT, job_dir, "exit 3"], check=True)
+    assert probe_job(job_dir, monkeypatch, capsys)["exit_code"] == 3
+
+    process = subprocess.Popen([sys.executable, AGENT, job_dir, "sleep 30"])
+    try:
+        for _ in range(50):
+            report = probe_job(job_dir, monkeypatch, capsys)
+            if report["alive"]:
+                break
+            time.sleep(0.1)
+        assert report["alive"]
+        assert report["exit_code"] is None
+        assert report["exited_at"] is None
+    finally:
+        if report["alive"]:
+            os.kill(report["pid"], signal.SIGTERM)
+        else:
+            process.kill()
+        process.wait()
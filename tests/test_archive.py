@@ -0,0 +1,170 @@
+import io
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import zipfile
+
+import pytest
+
+from torch_submit.archive import (
+    SEGMENT_SIZE,
+    codec_from_path,
+    extract_command,
+    extract_stream_command,
+    iter_archive,
+    write_archive,
+)
+from torch_submit.types import ArchiveCodec
+
+FILES = {
+    "main.py": b"print('hello')\n" * 100,
+    "empty.txt": b"",
+    "block.bin": b"x" * tarfile.BLOCKSIZE,
+    "pkg/module.py": b"x = 1\n",
+    "weights/model.pt": os.urandom(64 * 1024),
+    "café/ünicode.txt": "ünicode".encode(),
+    "a" * 60 + "/" + "b" * 60 + "/long_name.py": b"long\n",
+}
+
+
+def make_tree(root, files):
+    paths = []
+    for rel_path, content in files.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append((path, rel_path))
+    os.chmod(os.path.join(root, "main.py"), 0o755)
+    return paths
+
+
+def read_tree(root):
+    contents = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                contents[os.path.relpath(path, root)] = f.read()
+    return contents
+
+
+def unpack(data, codec):
+    if codec == ArchiveCodec.ZIP:
+        with zipfile.ZipFile(io.BytesIO(data)) as zipf:
+            return {name: zipf.read(name) for name in zipf.namelist()}
+    if codec == ArchiveCodec.TAR_ZST:
+        zstandard = pytest.importorskip("zstandard")
+        data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        return {
+            member.name: tar.extractfile(member).read()
+            for member in tar.getmembers()
+            if member.isfile()
+        }
+
+
+@pytest.fixture
+def files(tmp_path):
+    return make_tree(str(tmp_path / "src"), FILES)
+
+
+@pytest.mark.parametrize("codec", list(ArchiveCodec))
+def test_write_archive_round_trip(tmp_path, files, codec):
+    if codec == ArchiveCodec.TAR_ZST:
+        pytest.importorskip("zstandard")
+    archive_path = str(tmp_path / f"working_dir.{codec.value}")
+
+    write_archive(files, archive_path, codec)
+
+    with open(archive_path, "rb") as f:
+        assert unpack(f.read(), codec) == FILES
+
+
+@pytest.mark.parametrize("codec", [ArchiveCodec.TAR_GZ, ArchiveCodec.TAR_ZST])
+def test_iter_archive_is_deterministic(files, codec):
+    if codec == ArchiveCodec.TAR_ZST:
+        pytest.importorskip("zstandard")
+
+    first = b"".join(iter_archive(files, codec))
+    second = b"".join(iter_archive(files, codec))
+
+    assert first == second
+
+
+def test_tar_gz_segments_round_trip(tmp_path):
+    # Alternating compressible and stored segments, some larger than a segment
+    files = {
+        "a.txt": b"a" * (SEGMENT_SIZE + 1),
+        "b.pt": os.urandom(1024),
+        "c.txt": b"c" * 10,
+        "d.pt": os.urandom(SEGMENT_SIZE // 2),
+    }
+    paths = make_tree(str(tmp_path / "src"), dict(files, **{"main.py": b""}))
+
+    data = b"".join(iter_archive(paths, ArchiveCodec.TAR_GZ))
+
+    assert unpack(data, ArchiveCodec.TAR_GZ) == dict(files, **{"main.py": b""})
+
+
+def test_tar_records_mode_but_not_owner(files):
+    data = b"".join(iter_archive(files, ArchiveCodec.TAR_GZ))
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        members = {member.name: member for member in tar.getmembers()}
+    assert stat.S_IMODE(members["main.py"].mode) == 0o755
+    assert all(member.uid == 0 and member.uname == "" for member in members.values())
+
+
+@pytest.mark.parametrize("codec", list(ArchiveCodec))
+def test_extract_command(tmp_path, files, codec):
+    tool = {ArchiveCodec.ZIP: "unzip", ArchiveCodec.TAR_ZST: "zstd"}.get(codec, "tar")
+    if shutil.which(tool) is None:
+        pytest.skip(f"{tool} is not installed")
+    if codec == ArchiveCodec.TAR_ZST:
+        pytest.importorskip("zstandard")
+    archive_path = str(tmp_path / f"working_dir.{codec.value}")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    write_archive(files, archive_path, codec)
+
+    subprocess.run(
+        extract_command(archive_path, str(output_dir)), shell=True, check=True
+    )
+
+    assert read_tree(str(output_dir)) == FILES
+
+
+@pytest.mark.parametrize("codec", [ArchiveCodec.TAR_GZ, ArchiveCodec.TAR_ZST])
+def test_extract_stream_command(tmp_path, files, codec):
+    if codec == ArchiveCodec.TAR_ZST and shutil.which("zstd") is None:
+        pytest.skip("zstd is not installed")
+    if codec == ArchiveCodec.TAR_ZST:
+        pytest.importorskip("zstandard")
+    output_dir = str(tmp_path / "out")
+
+    subprocess.run(
+        extract_stream_command(output_dir, codec),
+        shell=True,
+        check=True,
+        input=b"".join(iter_archive(files, codec)),
+    )
+
+    assert read_tree(output_dir) == FILES
+
+
+def test_zip_cannot_be_streamed(files):
+    with pytest.raises(ValueError):
+        list(iter_archive(files, ArchiveCodec.ZIP))
+    with pytest.raises(ValueError):
+        extract_stream_command("/tmp/out", ArchiveCodec.ZIP)
+
+
+def test_codec_from_path():
+    assert codec_from_path("/tmp/working_dir.tar.gz") == ArchiveCodec.TAR_GZ
+    assert codec_from_path("/tmp/working_dir.tar.zst") == ArchiveCodec.TAR_ZST
+    assert codec_from_path("/tmp/working_dir.zip") == ArchiveCodec.ZIP
+    with pytest.raises(ValueError):
+        codec_from_path("/tmp/working_dir.rar")
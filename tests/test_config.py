@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from torch_submit import config as config_module
+from torch_submit.config import load_config_data, save_config_data
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "config.yaml")
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_unchanged_file_is_parsed_once(path):
+    write(path, "clusters:\n  a: 1\n")
+
+    data = load_config_data(path)
+
+    assert data == {"clusters": {"a": 1}}
+    assert load_config_data(path) is data
+
+
+def test_external_write_invalidates_snapshot(path):
+    write(path, "clusters:\n  a: 1\n")
+    data = load_config_data(path)
+
+    # Same size, so only the modification time tells the content changed
+    write(path, "clusters:\n  b: 2\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert load_config_data(path) == {"clusters": {"b": 2}}
+
+    os.remove(path)
+    assert load_config_data(path) == {}
+    assert data == {"clusters": {"a": 1}}
+
+
+def test_save_replaces_file_atomically(path):
+    write(path, "clusters: {}\n")
+    load_config_data(path)
+    data = {"clusters": {"a": {"head_node": "10.0.0.1"}}}
+
+    save_config_data(path, data)
+
+    assert os.listdir(os.path.dirname(path)) == ["config.yaml"]
+    # The saved data is the snapshot of the process, and matches what was written
+    assert load_config_data(path) is data
+    config_module._snapshots.clear()
+    assert load_config_data(path) == data
+
+
+def test_failed_save_leaves_no_temp_file(path, monkeypatch):
+    write(path, "clusters: {}\n")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(config_module.os, "replace", fail)
+    with pytest.raises(OSError):
+        save_config_data(path, {"clusters": {"a": 1}})
+
+    assert os.listdir(os.path.dirname(path)) == ["config.yaml"]
+    monkeypatch.undo()
+    assert load_config_data(path) == {"clusters": {}}
@@ -0,0 +1,122 @@
+import pytest
+
+from torch_submit import connection as connection_module
+from torch_submit.config import Node
+from torch_submit.connection import ConnectionPool
+
+HEAD = Node("10.0.0.1", None, 8, 32, "ubuntu", None, 2222)
+WORKER = Node("10.0.0.2", None, 8, 32, "ubuntu", None, 2222)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.keepalive = None
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeConnection:
+    """Stands in for a Fabric connection, without connecting anywhere."""
+
+    opened = []
+
+    def __init__(self, host, user=None, connect_kwargs=None, port=None):
+        self.host = host
+        self.is_connected = False
+        self.closed = False
+        self.transport = FakeTransport()
+
+    def open(self):
+        self.is_connected = True
+        self.opened.append(self)
+
+    def close(self):
+        self.is_connected = False
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(connection_module, "time", clock)
+    monkeypatch.setattr("fabric.Connection", FakeConnection)
+    FakeConnection.opened = []
+    return clock
+
+
+def test_released_connections_are_reused(clock):
+    pool = ConnectionPool(keepalive=15)
+
+    first = pool.lease(HEAD)
+    # Concurrent leases of the same node get their own connection
+    second = pool.lease(HEAD)
+    assert first is not second
+    assert first.transport.keepalive == 15
+
+    pool.release(HEAD, first)
+    assert pool.lease(HEAD) is first
+    assert pool.lease(WORKER) is not first
+    assert len(FakeConnection.opened) == 3
+    assert not first.closed
+
+
+def test_idle_connections_expire(clock):
+    pool = ConnectionPool(idle_timeout=60)
+    connection = pool.lease(HEAD)
+    pool.release(HEAD, connection)
+
+    clock.now += 61
+
+    assert pool.lease(HEAD) is not connection
+    assert connection.closed
+
+
+def test_idle_connections_are_bounded(clock):
+    pool = ConnectionPool(max_idle=2)
+    connections = [pool.lease(node) for node in (HEAD, HEAD, WORKER)]
+    for node, connection in zip((HEAD, HEAD, WORKER), connections):
+        pool.release(node, connection)
+        clock.now += 1
+
+    # The connection idle for the longest was closed to make room
+    assert [connection.closed for connection in connections] == [True, False, False]
+    assert pool.lease(HEAD) is connections[1]
+    assert pool.lease(WORKER) is connections[2]
+
+
+def test_dead_connections_are_dropped(clock):
+    pool = ConnectionPool()
+    released = pool.lease(HEAD)
+    pool.release(HEAD, released)
+    # The transport died while the connection was idle
+    released.is_connected = False
+
+    leased = pool.lease(HEAD)
+    assert leased is not released
+    assert released.closed
+
+    # Connections that died while leased are not returned to the pool
+    leased.is_connected = False
+    pool.release(HEAD, leased)
+    assert leased.closed
+    assert pool.lease(HEAD) not in (released, leased)
+
+
+def test_close_all(clock):
+    pool = ConnectionPool()
+    connection = pool.lease(HEAD)
+    pool.release(HEAD, connection)
+
+    pool.close_all()
+
+    assert connection.closed
+    assert pool.lease(HEAD) is not connection
@@ -0,0 +1,196 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from torch_submit.config import Node
+from torch_submit.executor import cpu_bind_command, format_cpu_list, plan_cpu_bindings
+from torch_submit.scripts import inventory as inventory_script
+from torch_submit.types import CpuBind
+
+
+def smt_numa_node(numa_id, first, count, smt_offset):
+    """A NUMA node with the usual Linux numbering, where the hyperthread of core c is
+    c + smt_offset."""
+    cores = [[cpu, cpu + smt_offset] for cpu in range(first, first + count)]
+    return {
+        "id": numa_id,
+        "cpus": sorted(cpu for core in cores for cpu in core),
+        "cores": cores,
+        "memory_bytes": 2**36,
+    }
+
+
+def make_node(inventory=None, nproc=64):
+    return Node("10.0.0.1", None, 8, nproc, None, None, None, inventory=inventory)
+
+
+SMT_INVENTORY = {
+    "numa_nodes": [smt_numa_node(0, 0, 16, 32), smt_numa_node(1, 16, 16, 32)],
+    "gpus": [
+        {"index": i, "name": "A100", "memory_mb": 81920, "numa_node": 1 - i // 2}
+        for i in range(4)
+    ],
+}
+
+
+def physical_cores(cpus, smt_offset=32):
+    return {cpu % smt_offset for cpu in cpus}
+
+
+def test_ranks_get_disjoint_physical_cores():
+    bindings = plan_cpu_bindings(make_node(SMT_INVENTORY), 4)
+
+    # GPUs 0 and 1 are on NUMA node 1, GPUs 2 and 3 on NUMA node 0
+    assert [numa_id for numa_id, _ in bindings] == [1, 1, 0, 0]
+    assert [format_cpu_list(cpus) for _, cpus in bindings] == [
+        "16-23,48-55",
+        "24-31,56-63",
+        "0-7,32-39",
+        "8-15,40-47",
+    ]
+    cores = [physical_cores(cpus) for _, cpus in bindings]
+    for i in range(len(cores)):
+        for j in range(i + 1, len(cores)):
+            assert not cores[i] & cores[j]
+
+
+def test_more_ranks_than_cores_split_hyperthreads():
+    inventory = {"numa_nodes": [smt_numa_node(0, 0, 2, 2)], "gpus": []}
+
+    bindings = plan_cpu_bindings(make_node(inventory), 4)
+
+    assert [cpus for _, cpus in bindings] == [[0], [2], [1], [3]]
+
+
+def test_more_ranks_than_cpus_share_cpus():
+    inventory = {"numa_nodes": [smt_numa_node(0, 0, 1, 1)], "gpus": []}
+
+    bindings = plan_cpu_bindings(make_node(inventory), 3)
+
+    assert [cpus for _, cpus in bindings] == [[0], [0], [1]]
+
+
+def test_ranks_share_cpus_evenly():
+    bindings = plan_cpu_bindings(make_node(nproc=2), 4)
+
+    assert [cpus for _, cpus in bindings] == [[0], [0], [1], [1]]
+
+
+def test_ranks_without_gpu_spread_over_numa_nodes():
+    inventory = dict(SMT_INVENTORY, gpus=[])
+
+    bindings = plan_cpu_bindings(make_node(inventory), 2)
+
+    assert bindings == [
+        (0, list(range(0, 16)) + list(range(32, 48))),
+        (1, list(range(16, 32)) + list(range(48, 64))),
+    ]
+
+
+def test_inventory_without_cores():
+    inventory = {"numa_nodes": [{"id": 0, "cpus": [0, 1, 2, 3]}], "gpus": []}
+
+    bindings = plan_cpu_bindings(make_node(inventory), 2)
+
+    assert bindings == [(0, [0, 1]), (0, [2, 3])]
+
+
+def test_numa_nodes_without_usable_cpus_are_skipped():
+    inventory = {
+        "numa_nodes": [
+            {"id": 0, "cpus": [], "cores": []},
+            {"id": 1, "cpus": [4, 5], "cores": [[4], [5]]},
+        ],
+        "gpus": [{"index": 0, "name": "A100", "memory_mb": 1, "numa_node": 0}],
+    }
+
+    bindings = plan_cpu_bindings(make_node(inventory), 2)
+
+    assert bindings == [(1, [4]), (1, [5])]
+
+
+def test_even_split_without_inventory():
+    bindings = plan_cpu_bindings(make_node(nproc=8), 3)
+
+    assert bindings == [(None, [0, 1]), (None, [2, 3, 4]), (None, [5, 6, 7])]
+
+
+def test_format_cpu_list():
+    assert format_cpu_list([3, 0, 1, 2, 8, 10, 11]) == "0-3,8,10-11"
+    assert format_cpu_list([5]) == "5"
+
+
+@pytest.fixture
+def fake_sysfs(monkeypatch):
+    files = {
+        "/sys/devices/system/node/node0/cpulist": "0-3,8-11",
+        "/sys/devices/system/node/node1/cpulist": "4-7,12-15",
+    }
+    for cpu in range(16):
+        core = cpu % 8
+        files[f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"] = (
+            f"{core},{core + 8}"
+        )
+    monkeypatch.setattr(inventory_script, "read", files.get)
+    monkeypatch.setattr(
+        inventory_script.glob,
+        "glob",
+        lambda pattern: [
+            "/sys/devices/system/node/node1",
+            "/sys/devices/system/node/node0",
+        ],
+    )
+
+
+def test_inventory_groups_cpus_by_physical_core(fake_sysfs):
+    nodes = inventory_script.numa_nodes(set(range(16)))
+
+    assert [node["id"] for node in nodes] == [0, 1]
+    assert nodes[0]["cpus"] == [0, 1, 2, 3, 8, 9, 10, 11]
+    assert nodes[0]["cores"] == [[0, 8], [1, 9], [2, 10], [3, 11]]
+    assert nodes[1]["cores"] == [[4, 12], [5, 13], [6, 14], [7, 15]]
+
+
+def test_inventory_only_lists_allowed_cpus(fake_sysfs):
+    nodes = inventory_script.numa_nodes({0, 1, 8, 12, 13})
+
+    assert nodes[0]["cpus"] == [0, 1, 8]
+    assert nodes[0]["cores"] == [[0, 8], [1]]
+    assert nodes[1]["cpus"] == [12, 13]
+    assert nodes[1]["cores"] == [[12], [13]]
+
+
+@pytest.mark.skipif(
+    shutil.which("taskset") is None or not hasattr(os, "sched_getaffinity"),
+    reason="taskset is required",
+)
+@pytest.mark.parametrize("mode", [CpuBind.CORES, CpuBind.NUMA])
+def test_cpu_bind_command_pins_each_rank(mode):
+    cpu = min(os.sched_getaffinity(0))
+    command = cpu_bind_command([(0, [cpu]), (None, [cpu])], mode)
+    report = "echo $OMP_NUM_THREADS $0 $1; grep Cpus_allowed_list /proc/self/status"
+
+    for local_rank in ("0", "1"):
+        output = subprocess.run(
+            f"{command} sh -c '{report}' first second",
+            shell=True,
+            check=True,
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, LOCAL_RANK=local_rank),
+        ).stdout.split()
+        assert output[:3] == ["1", "first", "second"]
+        assert output[-1] == str(cpu)
+
+    # Ranks without a binding run unpinned
+    output = subprocess.run(
+        f"{command} echo unpinned",
+        shell=True,
+        check=True,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, LOCAL_RANK="9"),
+    ).stdout
+    assert output == "unpinned\n"
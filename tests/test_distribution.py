@@ -0,0 +1,22 @@
+from torch_submit.config import Node
+from torch_submit.executor import PRIVATE_SSH_PORT_ENV, head_ssh_destination
+
+# Both nodes forward SSH on their public address
+PRIVATE_WORKER = Node("10.0.0.2", "192.168.0.2", 8, 32, "ubuntu", None, 2222)
+PUBLIC_WORKER = Node("10.0.0.3", None, 8, 32, "ubuntu", None, 2222)
+
+
+def test_private_address_uses_private_port(monkeypatch):
+    monkeypatch.delenv(PRIVATE_SSH_PORT_ENV, raising=False)
+    assert head_ssh_destination(PRIVATE_WORKER) == ("192.168.0.2", 22)
+
+    monkeypatch.setenv(PRIVATE_SSH_PORT_ENV, "2200")
+    assert head_ssh_destination(PRIVATE_WORKER) == ("192.168.0.2", 2200)
+
+
+def test_public_address_uses_configured_port(monkeypatch):
+    monkeypatch.setenv(PRIVATE_SSH_PORT_ENV, "2200")
+    assert head_ssh_destination(PUBLIC_WORKER) == ("10.0.0.3", 2222)
+
+    node = Node("10.0.0.4", None, 8, 32, None, None, None)
+    assert head_ssh_destination(node) == ("10.0.0.4", 22)
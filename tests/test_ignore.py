@@ -0,0 +1,104 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from torch_submit.ignore import IgnoreMatcher
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is required")
+
+
+def make_tree(root, files):
+    for rel_path, content in files.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def git_untracked(root):
+    subprocess.run(["git", "init", "-q", root], check=True)
+    output = subprocess.run(
+        ["git", "ls-files", "--others", "--exclude-standard", "-z"],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return sorted(path for path in output.split("\0") if path)
+
+
+def walked(root):
+    return sorted(
+        rel_path
+        for _, rel_path in IgnoreMatcher(root).walk()
+        if not rel_path.startswith(".git/")
+    )
+
+
+FILES = {
+    "main.py": "",
+    "README.md": "",
+    "debug.log": "",
+    "notes.txt": "",
+    "keep.log": "",
+    "build/out.o": "",
+    "build/keep/out.o": "",
+    "src/app.py": "",
+    "src/app.pyc": "",
+    "src/cache/data.bin": "",
+    "src/nested/deep/file.tmp": "",
+    "src/nested/deep/file.py": "",
+    "src/.gitignore": "*.tmp\n/cache/\n!important.tmp\n",
+    "src/important.tmp": "",
+    "docs/a/b/c.md": "",
+    "docs/a/skip.md": "",
+    "data/train/x.csv": "",
+    "data/val/y.csv": "",
+    "logs/2024/run.txt": "",
+    "space name.txt": "",
+    "#hash.txt": "",
+    "abc.txt": "",
+    "abd.txt": "",
+}
+
+GITIGNORE_CASES = {
+    "names_and_suffixes": "*.log\n!keep.log\n*.pyc\nbuild/\n",
+    "anchored_paths": "/notes.txt\ndocs/a/*.md\ndata/*/x.csv\n",
+    "double_star": "**/deep\nlogs/**\ndocs/**/c.md\n",
+    "character_classes": "ab[cd].txt\n?otes.txt\n[!m]ain.py\n",
+    "escapes_and_comments": "# comment\n\\#hash.txt\nspace\\ name.txt\nREADME.md   \n",
+    "negation_inside_ignored_dir": "build/\n!build/keep/out.o\n",
+    "directory_only": "out.o/\nsrc/\n",
+}
+
+
+@pytest.mark.parametrize("gitignore", GITIGNORE_CASES.values(), ids=GITIGNORE_CASES)
+def test_walk_matches_git(tmp_path, gitignore):
+    root = str(tmp_path)
+    make_tree(root, dict(FILES, **{".gitignore": gitignore}))
+
+    assert walked(root) == git_untracked(root)
+
+
+def test_info_exclude_has_lowest_precedence(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, dict(FILES, **{".gitignore": "!debug.log\n"}))
+    subprocess.run(["git", "init", "-q", root], check=True)
+    with open(os.path.join(root, ".git", "info", "exclude"), "a") as f:
+        f.write("*.log\n*.md\n")
+
+    paths = walked(root)
+    assert paths == git_untracked(root)
+    assert "debug.log" in paths
+    assert "README.md" not in paths
+
+
+def test_default_patterns(tmp_path):
+    root = str(tmp_path)
+    make_tree(root, {"a.py": "", "__pycache__/a.pyc": "", "pkg/__pycache__/b.pyc": ""})
+
+    matcher = IgnoreMatcher(root, default_patterns=["__pycache__/"])
+
+    assert [rel_path for _, rel_path in matcher.walk()] == ["a.py"]
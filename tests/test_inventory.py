@@ -0,0 +1,55 @@
+from torch_submit.config import Node
+from torch_submit.inventory import apply_inventory
+
+
+def make_inventory(**kwargs):
+    inventory = {
+        "cpus": 64,
+        "usable_cpus": 48,
+        "numa_nodes": [
+            {"id": 0, "cpus": list(range(0, 32)), "memory_bytes": 2**36},
+            {"id": 1, "cpus": list(range(32, 64)), "memory_bytes": 2**36},
+        ],
+        "memory_bytes": 2**37,
+        "memory_available_bytes": 2**36,
+        "gpus": [
+            {"index": i, "name": "A100", "memory_mb": 81920, "numa_node": i // 2}
+            for i in range(4)
+        ],
+        "tmp_free_bytes": 2**40,
+        "probed_at": 0.0,
+    }
+    inventory.update(kwargs)
+    return inventory
+
+
+def make_node():
+    return Node("10.0.0.1", None, 8, 8, None, None, None)
+
+
+def test_apply_inventory_resizes_node():
+    node = make_node()
+    inventory = make_inventory()
+
+    apply_inventory(node, inventory)
+
+    assert (node.num_gpus, node.nproc) == (4, 48)
+    assert node.inventory == inventory
+    assert node.inventory is not inventory
+
+
+def test_apply_inventory_keeps_gpus_when_none_found():
+    node = make_node()
+
+    apply_inventory(node, make_inventory(gpus=[]))
+
+    assert (node.num_gpus, node.nproc) == (8, 48)
+
+
+def test_apply_inventory_without_resize():
+    node = make_node()
+
+    apply_inventory(node, make_inventory(), resize=False)
+
+    assert (node.num_gpus, node.nproc) == (8, 8)
+    assert node.inventory["cpus"] == 64
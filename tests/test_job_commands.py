@@ -0,0 +1,122 @@
+import pytest
+from typer.testing import CliRunner
+
+from torch_submit.commands import job as job_commands
+from torch_submit.commands.job import parse_line_range
+from torch_submit.types import SyncMode
+
+runner = CliRunner()
+
+
+@pytest.mark.parametrize(
+    "lines, expected",
+    [
+        (None, (1, None)),
+        ("100", (100, 100)),
+        ("100:200", (100, 200)),
+        ("100:", (100, None)),
+        (":200", (1, 200)),
+        (":", (1, None)),
+    ],
+)
+def test_parse_line_range(lines, expected):
+    assert parse_line_range(lines) == expected
+
+
+@pytest.mark.parametrize("lines", ["abc", "1:x", "1:2:3"])
+def test_parse_line_range_rejects_garbage(lines):
+    with pytest.raises(ValueError):
+        parse_line_range(lines)
+
+
+class FakeJob:
+    id = "job-1"
+    nodes = []
+    status = "stopped"
+    sync_mode = SyncMode.STREAM
+
+
+class FakeJobManager:
+    calls = []
+
+    def get_job(self, job_id):
+        return FakeJob()
+
+    def list_jobs(self):
+        self.calls.append(("list_jobs",))
+        return []
+
+    def get_all_jobs_with_status(self, max_age=None):
+        self.calls.append(("get_all_jobs_with_status", max_age))
+        return []
+
+
+class FakeLogStreamer:
+    searches = []
+
+    def __init__(self, job_id, nodes, ranks=None):
+        pass
+
+    def search(self, pattern, first=1, last=None, ignore_case=False):
+        self.searches.append((pattern, first, last, ignore_case))
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    monkeypatch.setattr(job_commands, "JobManager", FakeJobManager)
+    monkeypatch.setattr(job_commands, "LogStreamer", FakeLogStreamer)
+    FakeLogStreamer.searches = []
+    return FakeLogStreamer.searches
+
+
+def test_logs_grep_searches_whole_log(searches):
+    result = runner.invoke(job_commands.app, ["logs", "job-1", "--grep", "nan", "-i"])
+
+    assert result.exit_code == 0, result.output
+    assert searches == [("nan", 1, None, True)]
+
+
+def test_logs_lines(searches):
+    result = runner.invoke(job_commands.app, ["logs", "job-1", "--lines", "10:20"])
+
+    assert result.exit_code == 0, result.output
+    assert searches == [(None, 10, 20, False)]
+
+
+def test_logs_invalid_lines(searches):
+    result = runner.invoke(job_commands.app, ["logs", "job-1", "--lines", "x:y"])
+
+    assert result.exit_code == 1
+    assert searches == []
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    monkeypatch.setattr(job_commands, "JobManager", FakeJobManager)
+    FakeJobManager.calls = []
+    return FakeJobManager.calls
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        ([], ("list_jobs",)),
+        (["--max-age", "60"], ("get_all_jobs_with_status", 60.0)),
+        (["--refresh"], ("get_all_jobs_with_status", None)),
+    ],
+)
+def test_list_checks_nodes_only_when_asked(calls, args, expected):
+    result = runner.invoke(job_commands.app, ["list"] + args)
+
+    assert result.exit_code == 0, result.output
+    assert calls == [expected]
+
+
+def test_restart_refuses_changed_working_dir(monkeypatch, calls):
+    monkeypatch.setattr(job_commands, "Config", lambda: None)
+    monkeypatch.setattr(job_commands, "working_dir_changes", lambda job: ["train.py"])
+
+    result = runner.invoke(job_commands.app, ["restart", "job-1"])
+
+    assert result.exit_code == 1
+    assert "submit a new job instead" in " ".join(result.output.split())
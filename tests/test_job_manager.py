@@ -0,0 +1,346 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from torch_submit.config import Node
+from torch_submit.job import SCHEMA_VERSION, JobManager
+from torch_submit.types import CpuBind, Executor, Job, JobStatus, SyncMode
+
+HEAD = Node("10.0.0.1", "192.168.0.1", 8, 32, "ubuntu", None, 2222)
+WORKER = Node("10.0.0.2", None, 4, 16, None, None, None)
+
+
+def make_job(**kwargs):
+    fields = dict(
+        id="job-1",
+        name="happy-otter",
+        status=JobStatus.RUNNING,
+        working_dir="/tmp/job-1",
+        nodes=[HEAD, WORKER],
+        cluster="cluster",
+        command="python train.py",
+        pids={HEAD: 100, WORKER: 200},
+        executor=Executor.TORCHRUN,
+    )
+    fields.update(kwargs)
+    return Job(**fields)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+@pytest.fixture
+def job_manager(db_path):
+    job_manager = JobManager(db_path)
+    yield job_manager
+    job_manager.close()
+
+
+def user_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def columns(db_path, table="jobs"):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    finally:
+        conn.close()
+
+
+def test_round_trip(job_manager, db_path):
+    job = make_job(
+        max_restarts=2,
+        num_gpus=4,
+        sync_mode=SyncMode.DELTA,
+        log_max_bytes=1024,
+        log_keep=3,
+        log_compress=True,
+        cpu_bind=CpuBind.NUMA,
+    )
+    job_manager.add_job(job)
+
+    stored = job_manager.get_job("happy-otter")
+    assert stored.nodes == [HEAD, WORKER]
+    assert stored.pids == {HEAD: 100, WORKER: 200}
+    assert stored.cpu_bind == CpuBind.NUMA
+    assert stored.sync_mode == SyncMode.DELTA
+    assert (stored.log_max_bytes, stored.log_keep, stored.log_compress) == (
+        1024,
+        3,
+        True,
+    )
+    assert user_version(db_path) == SCHEMA_VERSION
+
+
+def test_migrate_delimited_jobs(db_path):
+    # The original schema, with the nodes and pids of each job as delimited strings
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            status TEXT,
+            working_dir TEXT,
+            nodes TEXT,
+            cluster TEXT,
+            command TEXT,
+            max_restarts INTEGER DEFAULT 0,
+            num_gpus INTEGER DEFAULT NULL,
+            pids TEXT DEFAULT NULL,
+            executor TEXT DEFAULT NULL,
+            docker_image TEXT DEFAULT NULL,
+            database TEXT DEFAULT NULL,
+            optuna_port INTEGER DEFAULT NULL
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                "job-1",
+                "happy-otter",
+                "stopped",
+                "/tmp/job-1",
+                ",".join([HEAD.to_db(), WORKER.to_db()]),
+                "cluster",
+                "python train.py",
+                1,
+                "",
+                f"{HEAD.public_ip}:100,{WORKER.public_ip}:200",
+                "torchrun",
+                "",
+                "",
+                "",
+            ),
+            # Unreadable nodes are dropped
+            ("job-2", "sad-otter", "running", "/tmp", "garbage", "cluster", "ls")
+            + (0, "", "", "torchrun", "", "", ""),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    job_manager = JobManager(db_path)
+    try:
+        jobs = job_manager.list_jobs()
+    finally:
+        job_manager.close()
+
+    assert [job.id for job in jobs] == ["job-1"]
+    job = jobs[0]
+    assert job.status == JobStatus.STOPPED
+    assert job.nodes == [HEAD, WORKER]
+    assert job.pids == {HEAD: 100, WORKER: 200}
+    assert job.max_restarts == 1
+    assert job.cpu_bind == CpuBind.NONE
+    assert "nodes" not in columns(db_path)
+    assert "cpu_bind" in columns(db_path)
+    assert user_version(db_path) == SCHEMA_VERSION
+
+
+@pytest.mark.skipif(
+    sqlite3.sqlite_version_info < (3, 35), reason="DROP COLUMN needs SQLite 3.35"
+)
+def test_migrate_version_1_adds_cpu_bind(db_path):
+    # Create a current database, then downgrade it to version 1, without cpu_bind
+    job_manager = JobManager(db_path)
+    job_manager.add_job(make_job())
+    job_manager.close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE jobs DROP COLUMN cpu_bind")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    assert "cpu_bind" not in columns(db_path)
+
+    job_manager = JobManager(db_path)
+    try:
+        job = job_manager.get_job("job-1")
+        job_manager.add_job(make_job(id="job-2", name="b", cpu_bind=CpuBind.CORES))
+        added = job_manager.get_job("job-2")
+    finally:
+        job_manager.close()
+
+    assert job.cpu_bind == CpuBind.NONE
+    assert job.nodes == [HEAD, WORKER]
+    assert added.cpu_bind == CpuBind.CORES
+    assert user_version(db_path) == SCHEMA_VERSION
+
+
+def test_migration_is_idempotent(db_path):
+    for _ in range(2):
+        job_manager = JobManager(db_path)
+        job_manager.close()
+
+    assert columns(db_path).count("cpu_bind") == 1
+    assert user_version(db_path) == SCHEMA_VERSION
+
+
+def test_unknown_jobs_are_checked_again(job_manager, monkeypatch):
+    job_manager.add_job(make_job())
+    job_manager.add_job(make_job(id="job-2", name="b", status=JobStatus.FINISHED))
+    unreachable = {WORKER}
+
+    def probe_node(node, job_ids=None):
+        if node in unreachable:
+            raise ConnectionError("unreachable")
+        return {
+            job_id: {"pid": 100, "alive": True, "exit_code": None} for job_id in job_ids
+        }
+
+    monkeypatch.setattr("torch_submit.job.probe_node", probe_node)
+
+    jobs = {job.id: job for job in job_manager.get_all_jobs_with_status()}
+    assert jobs["job-1"].status == JobStatus.UNKNOWN
+    assert jobs["job-2"].status == JobStatus.FINISHED
+    assert job_manager.get_job("job-1").status == JobStatus.UNKNOWN
+
+    unreachable.clear()
+    jobs = {job.id: job for job in job_manager.get_all_jobs_with_status()}
+    assert jobs["job-1"].status == JobStatus.RUNNING
+    assert job_manager.get_job("job-1").status == JobStatus.RUNNING
+
+
+def test_wait_for_terminal_job_keeps_its_status(job_manager, monkeypatch):
+    job_manager.add_job(make_job(status=JobStatus.STOPPED))
+    job_manager.update_job_statuses({"job-1": JobStatus.STOPPED}, checked_at=1.0)
+
+    def probe_node(node, job_ids=None):
+        return {
+            job_id: {"pid": 100, "alive": False, "exit_code": 143} for job_id in job_ids
+        }
+
+    monkeypatch.setattr("torch_submit.job.probe_node", probe_node)
+
+    job = job_manager.get_job("job-1")
+    assert job_manager.wait_for_job(job, timeout=0) == (JobStatus.STOPPED, 143)
+    stored = job_manager.get_job("job-1")
+    assert stored.status == JobStatus.STOPPED
+    assert stored.status_checked_at == 1.0
+
+
+def test_staging_job_stays_submitted(job_manager, monkeypatch):
+    job_manager.add_job(make_job(status=JobStatus.SUBMITTED, pids={}))
+    staged = {HEAD}
+
+    def probe_node(node, job_ids=None):
+        # The job directory exists on staged nodes, before the agent is launched
+        if node in staged:
+            return {"job-1": {"pid": None, "alive": False, "exit_code": None}}
+        return {}
+
+    monkeypatch.setattr("torch_submit.job.probe_node", probe_node)
+
+    jobs = job_manager.get_all_jobs_with_status()
+    assert jobs[0].status == JobStatus.SUBMITTED
+    assert job_manager.get_job("job-1").status == JobStatus.SUBMITTED
+
+
+WRITES = 50
+
+# Updates the jobs of one writer many times, and the pids of the shared job as one writer
+CONCURRENT_WRITER = """
+import sys
+from torch_submit.config import Node
+from torch_submit.job import JobManager
+from torch_submit.types import JobStatus
+
+db_path, writer, writes = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+head = Node("10.0.0.1", "192.168.0.1", 8, 32, "ubuntu", None, 2222)
+worker = Node("10.0.0.2", None, 4, 16, None, None, None)
+job_manager = JobManager(db_path)
+for i in range(writes):
+    pid = writer * 1000 + i
+    job_manager.update_job_statuses(
+        {"job-%d" % writer: JobStatus.RUNNING, "shared": JobStatus.RUNNING},
+        checked_at=float(i),
+        pids={"job-%d" % writer: {head: pid, worker: pid}, "shared": {head: pid, worker: pid}},
+    )
+job_manager.close()
+"""
+
+
+def add_concurrent_jobs(db_path, writers):
+    job_manager = JobManager(db_path)
+    for writer in range(writers):
+        job_manager.add_job(make_job(id=f"job-{writer}", name=f"job-{writer}"))
+    job_manager.add_job(make_job(id="shared", name="shared"))
+    job_manager.close()
+
+
+def assert_no_lost_updates(db_path, writers):
+    job_manager = JobManager(db_path)
+    try:
+        for writer in range(writers):
+            job = job_manager.get_job(f"job-{writer}")
+            last = writer * 1000 + WRITES - 1
+            assert job.status_checked_at == WRITES - 1
+            assert job.pids == {HEAD: last, WORKER: last}
+        # The pids of the shared job all come from the same, last, transaction
+        shared = job_manager.get_job("shared")
+        assert len(set(shared.pids.values())) == 1
+        assert set(shared.pids) == {HEAD, WORKER}
+    finally:
+        job_manager.close()
+
+
+def test_concurrent_updates_from_threads(db_path):
+    writers = 8
+    add_concurrent_jobs(db_path, writers)
+    errors = []
+
+    def write(writer):
+        job_manager = JobManager(db_path)
+        try:
+            for i in range(WRITES):
+                pid = writer * 1000 + i
+                job_manager.update_job_statuses(
+                    {f"job-{writer}": JobStatus.RUNNING, "shared": JobStatus.RUNNING},
+                    checked_at=float(i),
+                    pids={
+                        f"job-{writer}": {HEAD: pid, WORKER: pid},
+                        "shared": {HEAD: pid, WORKER: pid},
+                    },
+                )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert_no_lost_updates(db_path, writers)
+
+
+def test_concurrent_updates_from_processes(db_path):
+    writers = 2
+    add_concurrent_jobs(db_path, writers)
+
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", CONCURRENT_WRITER, db_path, str(writer)]
+            + [str(WRITES)],
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for writer in range(writers)
+    ]
+    for process in processes:
+        _, stderr = process.communicate()
+        assert process.returncode == 0, stderr
+        assert "database is locked" not in stderr
+
+    assert_no_lost_updates(db_path, writers)
@@ -0,0 +1,137 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from torch_submit.scripts import SCRIPTS_DIR
+from torch_submit.scripts.agent import RotatingLog
+
+LINES = [b"line %d\n" % i for i in range(1, 201)]
+
+
+def read_log(*args):
+    return subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "read_log.py")]
+        + [str(arg) for arg in args],
+        check=True,
+        capture_output=True,
+    ).stdout
+
+
+def read_range(path, start, lines):
+    header, _, body = read_log("range", path, start, lines).partition(b"\n")
+    return json.loads(header), gzip.decompress(body) if body else b""
+
+
+def search(path, pattern, first=1, last=0, ignore_case=False):
+    output = gzip.decompress(
+        read_log("search", path, pattern, first, last, int(ignore_case))
+    )
+    return [
+        (int(number), line)
+        for number, _, line in (
+            entry.partition(b"\t") for entry in output.splitlines(keepends=True)
+        )
+    ]
+
+
+def write_log(job_dir, max_bytes=100, keep=0, compress=False):
+    log = RotatingLog(str(job_dir), max_bytes, keep, compress)
+    for line in LINES:
+        log.write(line)
+    log.close()
+    return os.path.join(str(job_dir), "output.log")
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "compressed"])
+def log_path(tmp_path, request):
+    return write_log(tmp_path, compress=request.param)
+
+
+def test_log_is_rotated(log_path):
+    names = os.listdir(os.path.dirname(log_path))
+    segments = [name for name in names if name.startswith("output.log.")]
+    assert len(segments) > 10
+    assert os.path.getsize(log_path) <= 100
+
+
+def test_range_reads_across_segments(log_path):
+    output = b"".join(LINES)
+
+    header, data = read_range(log_path, 0, 0)
+    assert header == {"size": len(output), "start": 0, "missing": False}
+    assert data == output
+
+    header, data = read_range(log_path, 1234, 0)
+    assert header["start"] == 1234
+    assert data == output[1234:]
+
+    header, data = read_range(log_path, len(output), 0)
+    assert data == b""
+
+
+def test_range_last_lines(log_path):
+    output = b"".join(LINES)
+
+    header, data = read_range(log_path, 0, 25)
+    assert data == b"".join(LINES[-25:])
+    assert header["start"] == len(output) - len(data)
+
+    # Never before start
+    _, data = read_range(log_path, len(output) - 20, 25)
+    assert data == output[-20:]
+
+
+def test_range_restarts_at_oldest_segment_after_pruning(tmp_path):
+    log_path = write_log(tmp_path, keep=2)
+    base = int(open(log_path + ".base").read())
+    oldest = min(
+        int(name.split(".")[2])
+        for name in os.listdir(str(tmp_path))
+        if name.startswith("output.log.") and name.split(".")[2].isdigit()
+    )
+    output = b"".join(LINES)
+
+    header, data = read_range(log_path, 0, 0)
+    assert 0 < oldest < base
+    assert header["start"] == oldest
+    assert data == output[oldest:]
+
+
+def test_range_missing_log(tmp_path):
+    header, data = read_range(str(tmp_path / "output.log"), 0, 0)
+
+    assert header == {"size": 0, "start": 0, "missing": True}
+    assert data == b""
+
+
+def test_search(log_path):
+    assert search(log_path, "line 1[0-9]$") == [
+        (number, b"line %d\n" % number) for number in range(10, 20)
+    ]
+    assert search(log_path, "LINE 19[0-9]", ignore_case=True) == [
+        (number, b"line %d\n" % number) for number in range(190, 200)
+    ]
+    assert search(log_path, "LINE 19[0-9]") == []
+
+
+def test_search_line_window(log_path):
+    assert search(log_path, "", first=95, last=105) == [
+        (number, b"line %d\n" % number) for number in range(95, 106)
+    ]
+    assert search(log_path, "line", first=199) == [
+        (199, b"line 199\n"),
+        (200, b"line 200\n"),
+    ]
+
+
+def test_search_missing_log(tmp_path):
+    assert search(str(tmp_path / "output.log"), "line") == []
+
+
+def test_print(log_path):
+    assert read_log("print", log_path, 3) == b"".join(LINES[-3:])
+    assert read_log("print", log_path, 0) == b"".join(LINES)
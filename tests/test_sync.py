@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from torch_submit.executor import WorkingDirectoryArchiver
+from torch_submit.sync import (
+    build_manifest,
+    diff_manifests,
+    load_manifest,
+    prune_trees_command,
+    working_dir_changes,
+)
+from torch_submit.types import Executor, Job, JobStatus, SyncMode
+
+DAY = 24 * 3600
+
+
+def make_file(path, content="", age_days=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+
+
+def make_tree(tree_dir, key, age_days):
+    make_file(os.path.join(tree_dir, key, "train.py"), "print(1)\n")
+    make_file(os.path.join(tree_dir, f"{key}.json"), "{}", age_days)
+    make_file(os.path.join(tree_dir, f"{key}.lock"))
+
+
+def test_diff_manifests(tmp_path):
+    root = str(tmp_path)
+    make_file(os.path.join(root, "a.py"), "a")
+    make_file(os.path.join(root, "b.py"), "b")
+    files = [(os.path.join(root, name), name) for name in ("a.py", "b.py")]
+    remote = build_manifest(files)
+
+    make_file(os.path.join(root, "b.py"), "changed")
+    make_file(os.path.join(root, "c.py"), "c")
+    files = [(os.path.join(root, name), name) for name in ("b.py", "c.py")]
+    local = build_manifest(files, remote)
+
+    assert diff_manifests(local, remote) == (["b.py", "c.py"], ["a.py"])
+    assert load_manifest("") == {}
+
+
+@pytest.mark.skipif(shutil.which("flock") is None, reason="flock is required")
+def test_prune_trees_command(tmp_path):
+    tree_dir = str(tmp_path)
+    make_tree(tree_dir, "recent", age_days=1)
+    make_tree(tree_dir, "old", age_days=10)
+    make_tree(tree_dir, "locked", age_days=10)
+    make_file(os.path.join(tree_dir, "old.job-1.tar.gz"), age_days=10)
+    make_file(os.path.join(tree_dir, "old.job-1.deleted"), age_days=10)
+    make_file(os.path.join(tree_dir, "recent.job-2.tar.gz"))
+
+    # A sync in progress holds the lock of its tree
+    with open(os.path.join(tree_dir, "locked.lock")) as lock:
+        subprocess.run(["flock", "-n", str(lock.fileno())], pass_fds=[lock.fileno()])
+        subprocess.run(
+            ["bash", "-c", prune_trees_command(tree_dir, retention_days=7)], check=True
+        )
+
+    assert sorted(os.listdir(tree_dir)) == [
+        "locked",
+        "locked.json",
+        "locked.lock",
+        "recent",
+        "recent.job-2.tar.gz",
+        "recent.json",
+        "recent.lock",
+    ]
+
+
+@pytest.mark.parametrize("sync_mode", [SyncMode.DELTA, SyncMode.STREAM])
+def test_working_dir_changes(tmp_path, monkeypatch, sync_mode):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    root = str(tmp_path / "src")
+    make_file(os.path.join(root, "train.py"), "print(1)\n", age_days=1)
+    make_file(os.path.join(root, "model.py"), "model\n", age_days=1)
+    archiver = WorkingDirectoryArchiver("job-1", "happy-otter")
+    if sync_mode == SyncMode.DELTA:
+        working_dir = archiver.manifest(root)
+    else:
+        working_dir = archiver.file_list(root)
+    job = Job(
+        id="job-1",
+        name="happy-otter",
+        status=JobStatus.STOPPED,
+        working_dir=working_dir,
+        nodes=[],
+        cluster="cluster",
+        command="python train.py",
+        executor=Executor.TORCHRUN,
+        sync_mode=sync_mode,
+    )
+
+    assert working_dir_changes(job) == []
+
+    make_file(os.path.join(root, "train.py"), "print(2)\n")
+    os.remove(os.path.join(root, "model.py"))
+    assert sorted(working_dir_changes(job)) == ["model.py", "train.py"]
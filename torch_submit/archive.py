@@ -0,0 +1,311 @@
+import gzip
+import io
+import os
+import stat
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .types import ArchiveCodec
+
+# File types that are already compressed and are stored without compression.
+INCOMPRESSIBLE_SUFFIXES = frozenset(
+    {
+        ".7z",
+        ".avi",
+        ".bz2",
+        ".ckpt",
+        ".egg",
+        ".flac",
+        ".gif",
+        ".gz",
+        ".jar",
+        ".jpeg",
+        ".jpg",
+        ".lz4",
+        ".mkv",
+        ".mov",
+        ".mp3",
+        ".mp4",
+        ".npz",
+        ".ogg",
+        ".parquet",
+        ".png",
+        ".pt",
+        ".pth",
+        ".rar",
+        ".safetensors",
+        ".tgz",
+        ".webp",
+        ".whl",
+        ".xz",
+        ".zip",
+        ".zst",
+    }
+)
+
+# Size of the independently compressed segments of a tar.gz stream.
+SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Size of the chunks in which file contents are read.
+READ_SIZE = 1024 * 1024
+
+# Flags with which tar unpacks each tar codec, followed by the archive path or "-".
+_TAR_EXTRACT_FLAGS = {
+    ArchiveCodec.TAR_GZ: "-xzf",
+    ArchiveCodec.TAR_ZST: "-I zstd -xf",
+}
+
+
+def is_compressible(path: str) -> bool:
+    """Check whether a file is worth compressing, based on its file type.
+
+    Args:
+        path: The path to the file.
+
+    Returns:
+        False for file types that are already compressed, True otherwise.
+    """
+    return os.path.splitext(path)[1].lower() not in INCOMPRESSIBLE_SUFFIXES
+
+
+def codec_from_path(path: str) -> ArchiveCodec:
+    """Determine the codec of an archive from its file name.
+
+    Args:
+        path: The path to the archive.
+
+    Returns:
+        The codec of the archive.
+
+    Raises:
+        ValueError: If the file name does not end in a known archive suffix.
+    """
+    for codec in ArchiveCodec:
+        if path.endswith(f".{codec.value}"):
+            return codec
+    raise ValueError(f"Unknown archive type: {path}")
+
+
+def extract_command(archive_path: str, output_dir: str) -> str:
+    """Build the shell command that unpacks an archive on a node.
+
+    Args:
+        archive_path: The path to the archive on the node.
+        output_dir: The directory to unpack the archive into.
+
+    Returns:
+        The shell command.
+    """
+    codec = codec_from_path(archive_path)
+    if codec == ArchiveCodec.ZIP:
+        return f"unzip -q -o {archive_path} -d {output_dir}"
+    return f"tar {_TAR_EXTRACT_FLAGS[codec]} {archive_path} -C {output_dir}"
+
+
+def extract_stream_command(output_dir: str, codec: ArchiveCodec) -> str:
+    """Build the shell command that unpacks an archive read from standard input on a node.
+
+    Args:
+        output_dir: The directory to unpack the archive into. It is created if needed.
+        codec: The codec of the archive. Zip archives cannot be streamed.
+
+    Returns:
+        The shell command.
+    """
+    if codec not in _TAR_EXTRACT_FLAGS:
+        raise ValueError(f"Codec {codec.value} cannot be streamed")
+    return f"mkdir -p {output_dir} && tar {_TAR_EXTRACT_FLAGS[codec]} - -C {output_dir}"
+
+
+def write_archive(
+    files: Iterable[Tuple[str, str]], archive_path: str, codec: ArchiveCodec
+):
+    """Write files into an archive.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        archive_path: The path of the archive to write.
+        codec: The codec of the archive.
+    """
+    if codec == ArchiveCodec.ZIP:
+        write_zip(files, archive_path)
+        return
+
+    with open(archive_path, "wb") as f:
+        for chunk in iter_archive(files, codec):
+            f.write(chunk)
+
+
+def iter_archive(
+    files: Iterable[Tuple[str, str]], codec: ArchiveCodec
+) -> Iterator[bytes]:
+    """Stream files as a compressed tar archive.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        codec: The codec of the archive. Zip archives cannot be streamed.
+
+    Yields:
+        The bytes of the archive.
+    """
+    if codec == ArchiveCodec.TAR_GZ:
+        yield from iter_tar_gz(files)
+    elif codec == ArchiveCodec.TAR_ZST:
+        yield from iter_tar_zst(files)
+    else:
+        raise ValueError(f"Codec {codec.value} cannot be streamed")
+
+
+def write_zip(files: Iterable[Tuple[str, str]], archive_path: str):
+    """Write files into a zip archive, storing already compressed files as they are.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        archive_path: The path of the archive to write.
+    """
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for file_path, arcname in files:
+            compress_type = (
+                zipfile.ZIP_DEFLATED
+                if is_compressible(file_path)
+                else zipfile.ZIP_STORED
+            )
+            zipf.write(file_path, arcname, compress_type=compress_type)
+
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    """Compress data as a single gzip member without a timestamp, so that it is reproducible.
+
+    gzip.compress only accepts an mtime from Python 3.8, so the member is written with
+    GzipFile instead.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=level, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+def iter_tar_gz(
+    files: Iterable[Tuple[str, str]], level: int = 6, workers: Optional[int] = None
+) -> Iterator[bytes]:
+    """Stream files as a tar.gz archive that is compressed in parallel.
+
+    The tar stream is cut into segments that are compressed concurrently as independent gzip
+    members. Concatenated gzip members form a valid gzip stream, so the result unpacks with a
+    plain `tar -xzf`. Segments holding already compressed files are stored at level 0.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        level: The compression level for compressible segments.
+        workers: The number of compression threads. Defaults to the number of CPUs.
+
+    Yields:
+        The bytes of the archive.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for segment, compressible in _iter_segments(files):
+            pending.append(
+                executor.submit(_gzip_member, segment, level if compressible else 0)
+            )
+            # Bound the number of segments held in memory
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_tar_zst(files: Iterable[Tuple[str, str]], level: int = 3) -> Iterator[bytes]:
+    """Stream files as a tar.zst archive, compressed with one zstd worker per CPU.
+
+    This codec requires the optional zstandard package locally and zstd on the nodes.
+    Already compressed data is detected by zstd itself and stored in raw blocks.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        level: The zstd compression level.
+
+    Yields:
+        The bytes of the archive.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "The tar.zst codec requires the zstandard package: pip install zstandard"
+        )
+
+    compressor = zstandard.ZstdCompressor(level=level, threads=-1).compressobj()
+    for piece, _ in _iter_tar(files):
+        chunk = compressor.compress(piece)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def _iter_segments(
+    files: Iterable[Tuple[str, str]], segment_size: int = SEGMENT_SIZE
+) -> Iterator[Tuple[bytes, bool]]:
+    """Cut a tar stream into segments of compressible or incompressible data.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        segment_size: The size above which a segment is closed.
+
+    Yields:
+        Tuple[bytes, bool]: Each segment and whether it is worth compressing.
+    """
+    buffer = bytearray()
+    buffer_compressible = True
+    for piece, compressible in _iter_tar(files):
+        if buffer and compressible != buffer_compressible:
+            yield bytes(buffer), buffer_compressible
+            buffer.clear()
+        buffer_compressible = compressible
+        buffer += piece
+        if len(buffer) >= segment_size:
+            yield bytes(buffer), buffer_compressible
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer), buffer_compressible
+
+
+def _iter_tar(files: Iterable[Tuple[str, str]]) -> Iterator[Tuple[bytes, bool]]:
+    """Generate an uncompressed tar stream.
+
+    Ownership is not recorded, so that files are owned by the extracting user and the same
+    files always produce the same stream.
+
+    Args:
+        files: Pairs of local file path and archive name.
+
+    Yields:
+        Tuple[bytes, bool]: Pieces of the stream and whether they are worth compressing.
+    """
+    for file_path, arcname in files:
+        st = os.stat(file_path)
+        info = tarfile.TarInfo(arcname)
+        info.size = st.st_size
+        info.mtime = int(st.st_mtime)
+        info.mode = stat.S_IMODE(st.st_mode)
+        yield info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"), True
+
+        compressible = is_compressible(file_path)
+        remaining = info.size
+        with open(file_path, "rb") as f:
+            while remaining > 0:
+                chunk = f.read(min(READ_SIZE, remaining))
+                if not chunk:
+                    # The file shrank while it was being read, keep the header size
+                    chunk = bytes(min(READ_SIZE, remaining))
+                remaining -= len(chunk)
+                if remaining == 0 and info.size % tarfile.BLOCKSIZE:
+                    chunk += bytes(tarfile.BLOCKSIZE - info.size % tarfile.BLOCKSIZE)
+                yield chunk, compressible
+
+    # End of archive marker, padded to a full record
+    yield bytes(tarfile.RECORDSIZE), True
@@ -1,5 +1,3 @@
-from importlib.metadata import version
-
 import typer
 
 from .commands import cluster, database, job
@@ -13,6 +11,9 @@ app.add_typer(database.app, name="db")
 
 def version_callback(value: bool):
     if value:
+        # importlib.metadata is slow to import, so it is only loaded for --version
+        from importlib.metadata import version
+
         print(f"torch-submit version: {version('torch-submit')}")
         raise typer.Exit()
 
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import typer
 from rich import box
 from rich.console import Console
@@ -5,10 +7,10 @@ from rich.prompt import Confirm, Prompt
 from rich.table import Table
 
 from ..config import Config, Node
+from ..inventory import apply_inventory, probe_inventories
 
 app = typer.Typer()
 console = Console()
-config = Config()
 
 
 @app.command("create")
@@ -19,6 +21,7 @@ def create_cluster():
     Prompts the user for cluster details such as name, head node, and worker nodes.
     Adds the new cluster configuration to the config.
     """
+    config = Config()
     name = Prompt.ask("Enter cluster name")
 
     # Head node
@@ -85,6 +88,7 @@ def list_clusters():
 
     Retrieves the list of clusters from the config and displays them in a table format.
     """
+    config = Config()
     clusters = config.list_clusters()
 
     table = Table(title="Available Clusters", box=box.ROUNDED)
@@ -113,6 +117,94 @@ def list_clusters():
     console.print(table)
 
 
+@app.command("probe")
+def probe_clusters(
+    name: Optional[str] = typer.Argument(
+        None, help="Name of the cluster to probe, defaults to all clusters"
+    ),
+    update: bool = typer.Option(
+        True, help="Update the GPU and process counts of the nodes from their hardware"
+    ),
+):
+    """
+    Probe the hardware of the nodes of a cluster.
+
+    Connects to all nodes in parallel and collects their CPU count, NUMA layout, memory,
+    GPUs and free space on /tmp. The results are cached in the config with the time of
+    the probe, and the GPU and process counts of the nodes are updated from them.
+
+    Args:
+        name (Optional[str]): The name of the cluster to probe, defaults to all clusters.
+        update (bool): Update the GPU and process counts of the nodes.
+    """
+    config = Config()
+    names = [name] if name else config.list_clusters()
+    try:
+        clusters = {
+            cluster_name: config.get_cluster(cluster_name) for cluster_name in names
+        }
+    except ValueError as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(code=1)
+
+    nodes = {}
+    for cluster in clusters.values():
+        for node in [cluster.head_node] + cluster.worker_nodes:
+            nodes.setdefault(node.public_ip, node)
+    console.print(f"[bold blue]Probing {len(nodes)} nodes...[/bold blue]")
+    inventories = probe_inventories(list(nodes.values()))
+
+    table = Table(title="Node Inventory", box=box.ROUNDED)
+    table.add_column("Cluster", style="cyan")
+    table.add_column("Node", style="magenta")
+    table.add_column("CPUs", style="green")
+    table.add_column("NUMA Nodes", style="green")
+    table.add_column("Memory", style="blue")
+    table.add_column("GPUs", style="yellow")
+    table.add_column("Free /tmp", style="blue")
+    table.add_column("Changes", style="red")
+
+    for cluster_name, cluster in clusters.items():
+        for node in [cluster.head_node] + cluster.worker_nodes:
+            inventory = inventories[nodes[node.public_ip]]
+            if inventory is None:
+                table.add_row(
+                    cluster_name, node.public_ip, "-", "-", "-", "-", "-", "unreachable"
+                )
+                continue
+
+            before = (node.num_gpus, node.nproc)
+            apply_inventory(node, inventory, resize=update)
+            changes = []
+            if node.num_gpus != before[0]:
+                changes.append(f"GPUs {before[0]} -> {node.num_gpus}")
+            if node.nproc != before[1]:
+                changes.append(f"processes {before[1]} -> {node.nproc}")
+            if update and not inventory["gpus"] and node.num_gpus:
+                changes.append(
+                    f"[yellow]warning: no GPUs found, kept {node.num_gpus} GPUs[/yellow]"
+                )
+
+            gpu_names = sorted({gpu["name"] for gpu in inventory["gpus"]})
+            table.add_row(
+                cluster_name,
+                node.public_ip,
+                f"{inventory['usable_cpus']}/{inventory['cpus']}",
+                str(len(inventory["numa_nodes"])),
+                _format_bytes(inventory["memory_bytes"]),
+                f"{len(inventory['gpus'])} {', '.join(gpu_names)}".strip(),
+                _format_bytes(inventory["tmp_free_bytes"]),
+                ", ".join(changes),
+            )
+
+    config.save_config()
+    console.print(table)
+
+
+def _format_bytes(size: Optional[int]) -> str:
+    return "-" if size is None else f"{size / 2**30:.1f} GiB"
+
+
 @app.command("remove")
 def remove_cluster(name: str):
     """
@@ -123,6 +215,7 @@ def remove_cluster(name: str):
     Args:
         name (str): The name of the cluster to remove.
     """
+    config = Config()
     if Confirm.ask(f"Are you sure you want to remove cluster '{name}'?"):
         config.remove_cluster(name)
         console.print(f"Cluster [bold red]{name}[/bold red] removed.")
@@ -140,6 +233,7 @@ def edit_cluster(name: str):
     Args:
         name (str): The name of the cluster to edit.
     """
+    config = Config()
     try:
         cluster = config.get_cluster(name)
     except ValueError:
@@ -8,7 +8,6 @@ from ..config import Config, DatabaseType
 
 app = typer.Typer()
 console = Console()
-config = Config()
 
 @app.command("create")
 def create_database():
@@ -18,6 +17,7 @@ def create_database():
     Prompts the user for database details such as name, type, address, port, username, and password.
     Adds the new database configuration to the config.
     """
+    config = Config()
     name = Prompt.ask("Enter database name")
 
     # Database address and port
@@ -38,6 +38,7 @@ def list_databases():
 
     Retrieves the list of databases from the config and displays them in a table format.
     """
+    config = Config()
     databases = config.list_dbs()
 
     table = Table(title="Available Databases", box=box.ROUNDED)
@@ -72,6 +73,7 @@ def remove_database(name: str):
     Args:
         name (str): The name of the database to remove.
     """
+    config = Config()
     if Confirm.ask(f"Are you sure you want to remove database '{name}'?"):
         config.remove_db(name)
         console.print(f"Database [bold red]{name}[/bold red] removed.")
@@ -89,6 +91,7 @@ def edit_database(name: str):
     Args:
         name (str): The name of the database to edit.
     """
+    config = Config()
     try:
         database = config.get_db(name)
     except ValueError:
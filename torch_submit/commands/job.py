@@ -1,7 +1,8 @@
 import os
 import random
+import time
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import typer
 import yaml
@@ -10,19 +11,22 @@ from rich.table import Table
 
 from ..config import Config
 from ..connection import NodeConnection
-from ..executor import (
-    BaseExecutor,
-    WorkingDirectoryArchiver,
-)
 from ..job import JobManager
-from ..types import Executor, Job, JobStatus
+from ..logs import LogStreamer
+from ..sync import working_dir_changes
+from ..types import (
+    ArchiveCodec,
+    CpuBind,
+    Distribution,
+    Executor,
+    Job,
+    JobStatus,
+    SyncMode,
+)
 from ..utils import generate_friendly_name
 
 app = typer.Typer()
 console = Console()
-config = Config()
-job_manager = JobManager()
-config = Config()
 
 
 @app.command("submit")
@@ -47,6 +51,33 @@ def submit(
     runtime_env: Optional[str] = typer.Option(
         None, help="Runtime environment yaml file to use"
     ),
+    sync_mode: SyncMode = typer.Option(
+        SyncMode.ARCHIVE,
+        "--sync",
+        help="How to ship the working directory: a full archive, only the files changed since the last sync, or an archive streamed to the nodes without a local copy. Delta and stream jobs keep no copy of the code, so they can only be restarted while the working directory is unchanged",
+    ),
+    distribution: Distribution = typer.Option(
+        Distribution.DIRECT,
+        help="Upload the archive to every node directly, or only to the head node which forwards it to the workers. The head node must know the host keys of the workers, or set TORCH_SUBMIT_ACCEPT_NEW_HOST_KEYS=1 to trust them on first use. It connects to private addresses on port 22, or TORCH_SUBMIT_PRIVATE_SSH_PORT",
+    ),
+    codec: ArchiveCodec = typer.Option(
+        ArchiveCodec.TAR_GZ,
+        help="Archive format; tar.zst needs the zstandard package locally and zstd on the nodes",
+    ),
+    log_max_size: int = typer.Option(
+        100,
+        help="Rotate the output log of each node once it reaches this many MB, 0 to never rotate",
+    ),
+    log_keep: int = typer.Option(
+        10, help="Number of rotated log segments to keep on each node, 0 to keep all"
+    ),
+    compress_logs: bool = typer.Option(
+        True, help="Compress rotated log segments on the nodes"
+    ),
+    cpu_bind: CpuBind = typer.Option(
+        CpuBind.NONE,
+        help="Pin each torchrun rank to its own cores; numa also binds its memory to its NUMA node",
+    ),
 ):
     """
     Submit a new job to a specified cluster.
@@ -63,7 +94,16 @@ def submit(
         docker_image (Optional[str]): Docker image to use.
         database (Optional[str]): Database to use.
         runtime_env (Optional[str]): Runtime environment yaml file to use.
+        sync_mode (SyncMode): How to ship the working directory to the nodes.
+        distribution (Distribution): How the archive reaches the worker nodes.
+        codec (ArchiveCodec): The format and compression of the working directory archive.
+        log_max_size (int): The size in MB at which the output log of each node is rotated.
+        log_keep (int): The number of rotated log segments to keep on each node.
+        compress_logs (bool): Compress rotated log segments on the nodes.
+        cpu_bind (CpuBind): How to pin the local ranks of a torchrun job to CPUs.
     """
+    config = Config()
+    job_manager = JobManager()
     if executor == Executor.OPTUNA:
         if not database:
             console.print(
@@ -76,6 +116,27 @@ def submit(
             console.print(f"Could not find database {database}")
             raise typer.Exit(code=1)
 
+    if cpu_bind != CpuBind.NONE and executor != Executor.TORCHRUN:
+        console.print(
+            "[bold red]Error:[/bold red] CPU binding is only supported for the torchrun executor"
+        )
+        raise typer.Exit(code=1)
+
+    if distribution == Distribution.HEAD and sync_mode in (
+        SyncMode.DELTA,
+        SyncMode.STREAM,
+    ):
+        console.print(
+            f"[bold red]Error:[/bold red] Head distribution is not supported for {sync_mode.value} sync"
+        )
+        raise typer.Exit(code=1)
+
+    if sync_mode == SyncMode.STREAM and codec == ArchiveCodec.ZIP:
+        console.print(
+            "[bold red]Error:[/bold red] Zip archives cannot be streamed, use tar.gz or tar.zst"
+        )
+        raise typer.Exit(code=1)
+
     try:
         cluster_info = config.get_cluster(cluster)
     except ValueError as e:
@@ -93,6 +154,9 @@ def submit(
 
     working_dir = os.path.abspath(working_dir)
 
+    # The executors pull in fabric and optuna, so they are only imported when needed
+    from ..executor import WorkingDirectoryArchiver
+
     job_id = str(uuid.uuid4())
     archiver = WorkingDirectoryArchiver(job_id=job_id, job_name=name)
 
@@ -108,11 +172,24 @@ def submit(
     else:
         runtime_env_vars = None
 
-    console.print("Archiving working directory...")
-    archived_dir = archiver.archive(working_dir)
-    console.print(
-        f"Working directory archived to: [bold green]{archived_dir}[/bold green]"
-    )
+    if sync_mode == SyncMode.DELTA:
+        console.print("Building working directory manifest...")
+        archived_dir = archiver.manifest(working_dir)
+        console.print(
+            f"Working directory manifest written to: [bold green]{archived_dir}[/bold green]"
+        )
+    elif sync_mode == SyncMode.STREAM:
+        console.print("Listing working directory...")
+        archived_dir = archiver.file_list(working_dir, codec)
+        console.print(
+            f"Working directory file list written to: [bold green]{archived_dir}[/bold green]"
+        )
+    else:
+        console.print("Archiving working directory...")
+        archived_dir = archiver.archive(working_dir, codec)
+        console.print(
+            f"Working directory archived to: [bold green]{archived_dir}[/bold green]"
+        )
 
     nodes = [cluster_info.head_node] + cluster_info.worker_nodes
     job = Job(
@@ -129,6 +206,12 @@ def submit(
         docker_image=docker_image,
         database=database,
         optuna_port=random.randint(8000, 9000) if executor == Executor.OPTUNA else None,
+        sync_mode=sync_mode,
+        distribution=distribution,
+        log_max_bytes=log_max_size * 1024 * 1024,
+        log_keep=log_keep,
+        log_compress=compress_logs,
+        cpu_bind=cpu_bind,
     )
     console.print("Submitting job...")
     job_manager.add_job(job)
@@ -139,13 +222,9 @@ def submit(
     if all(pid is None for pid in pids.values()):
         job_manager.update_job_status(job_id, JobStatus.CRASHED)
         console.print(f"Job [bold red]{job_id}[/bold red] failed to start.")
-        for node in nodes:
-            with NodeConnection(node) as c:
-                c.run(f"pkill -TERM -P {pids[node]}", hide=True)
         raise typer.Exit(code=1)
 
-    job_manager.update_job_status(job_id, JobStatus.RUNNING)
-    job_manager.update_job_pids(job_id, pids)
+    job_manager.update_job_statuses({job_id: JobStatus.RUNNING}, pids={job_id: pids})
 
     console.print(f"Job submitted with name: [bold green]{name}[/bold green]")
     console.print(f"Job ID: [bold blue]{job_id}[/bold blue]")
@@ -158,33 +237,99 @@ def submit(
 
     if tail:
         console.print("Tailing logs...")
-        with NodeConnection(nodes[0]) as c:
-            c.run(f"tail -f /tmp/torch_submit_job_{job.id}/output.log")
+        LogStreamer(job.id, nodes).stream(follow=True)
+
+
+def parse_line_range(lines: Optional[str]) -> Tuple[int, Optional[int]]:
+    """
+    Parse a line or range of line numbers, such as 100, 100:200, 100: or :200.
+
+    Args:
+        lines (Optional[str]): The line range, or None for all lines.
+
+    Returns:
+        Tuple[int, Optional[int]]: The first line, counting from 1, and the last line, or
+                                   None for the end of the log.
+
+    Raises:
+        ValueError: If the line range cannot be parsed.
+    """
+    if lines is None:
+        return 1, None
+    first, colon, last = lines.partition(":")
+    first = int(first or 1)
+    if not colon:
+        return first, first
+    return first, int(last) if last else None
 
 
 @app.command("logs")
 def print_logs(
     job_id: str = typer.Argument(..., help="Job ID or name"),
-    tail: bool = typer.Option(False, help="Tail the logs"),
+    follow: bool = typer.Option(
+        False, "--follow", "-f", help="Keep printing new output as it is written"
+    ),
+    tail: Optional[int] = typer.Option(
+        None, "--tail", "-n", help="Only print the last N lines of each rank"
+    ),
+    since: bool = typer.Option(
+        False, help="Only print the output written since the previous call"
+    ),
+    rank: Optional[List[int]] = typer.Option(
+        None, help="Only show the logs of this rank, can be repeated"
+    ),
+    grep: Optional[str] = typer.Option(
+        None,
+        help="Only print lines matching this regular expression, searched on the nodes",
+    ),
+    ignore_case: bool = typer.Option(
+        False, "--ignore-case", "-i", help="Match --grep case-insensitively"
+    ),
+    lines: Optional[str] = typer.Option(
+        None,
+        help="Only print this line or range of line numbers, e.g. 100, 100:200, 100: or :200",
+    ),
 ):
     """
-    Tail the logs of a specific job.
+    Print the logs of a specific job from all nodes, prefixed with the rank and host.
+
+    Logs are cached locally, so repeated calls only fetch the output written since the
+    previous call. With --grep or --lines, the logs are filtered on the nodes instead and
+    only the selected lines are transferred, compressed.
 
     Args:
         job_id (str): Job ID or name.
-        tail (bool): Tail the logs.
+        follow (bool): Keep printing new output as it is written.
+        tail (Optional[int]): Only print the last N lines of each rank.
+        since (bool): Only print the output written since the previous call.
+        rank (Optional[List[int]]): Only show the logs of these ranks.
+        grep (Optional[str]): Only print lines matching this regular expression.
+        ignore_case (bool): Match grep case-insensitively.
+        lines (Optional[str]): Only print this range of line numbers.
     """
     job_manager = JobManager()
     job = job_manager.get_job(job_id)
     if job:
-        console.print(f"Tailing logs for job [bold green]{job_id}[/bold green]")
-        console.print("Press [bold red]Ctrl+C[/bold red] to stop")
-        with NodeConnection(job.nodes[0]) as c:
-            if tail:
-                c.run(f"tail -f /tmp/torch_submit_job_{job.id}/output.log")
-            else:
-                result = c.run(f"cat /tmp/torch_submit_job_{job.id}/output.log")
-                console.print(result.stdout)
+        try:
+            streamer = LogStreamer(job.id, job.nodes, rank)
+        except ValueError as e:
+            console.print(f"[bold red]Error:[/bold red] {str(e)}")
+            raise typer.Exit(code=1)
+        if grep or lines:
+            try:
+                first, last = parse_line_range(lines)
+            except ValueError:
+                console.print(
+                    f"[bold red]Error:[/bold red] Invalid line range: {lines}"
+                )
+                raise typer.Exit(code=1)
+            streamer.search(grep, first, last, ignore_case)
+        elif follow:
+            console.print(f"Tailing logs for job [bold green]{job_id}[/bold green]")
+            console.print("Press [bold red]Ctrl+C[/bold red] to stop")
+            streamer.stream(follow=True, tail=tail)
+        else:
+            streamer.fetch(tail=tail, since=since)
     else:
         console.print(
             f"Job with ID [bold red]{job_id}[/bold red] not found", style="bold red"
@@ -192,12 +337,32 @@ def print_logs(
 
 
 @app.command("list")
-def list_jobs():
+def list_jobs(
+    refresh: bool = typer.Option(
+        False, help="Check the status of all live jobs on the nodes"
+    ),
+    max_age: Optional[float] = typer.Option(
+        None,
+        help="Check the status of jobs last checked more than this many seconds ago, and show cached statuses for the others",
+    ),
+):
     """
     List all submitted jobs.
+
+    Statuses are served from the local cache without connecting to the nodes, unless
+    --refresh or --max-age is given. `job refresh` keeps the cache up to date.
+
+    Args:
+        refresh (bool): Check the status of all live jobs on the nodes.
+        max_age (Optional[float]): Maximum age in seconds of cached job statuses.
     """
     job_manager = JobManager()
-    jobs = job_manager.get_all_jobs_with_status()
+    if refresh:
+        jobs = job_manager.get_all_jobs_with_status()
+    elif max_age is not None:
+        jobs = job_manager.get_all_jobs_with_status(max_age=max_age)
+    else:
+        jobs = job_manager.list_jobs()
 
     table = Table()
     table.add_column("ID", style="cyan", no_wrap=True)
@@ -205,7 +370,9 @@ def list_jobs():
     table.add_column("Status", style="green")
     table.add_column("Cluster", style="yellow")
     table.add_column("Nodes", style="blue")
+    table.add_column("Checked", style="white")
 
+    now = time.time()
     for job in jobs:
         status_style = {
             "started": "bold yellow",
@@ -221,10 +388,80 @@ def list_jobs():
             f"[{status_style}]{job.status}[/{status_style}]",
             job.cluster,
             str(len(job.nodes)),
+            (
+                f"{int(now - job.status_checked_at)}s ago"
+                if job.status_checked_at
+                else "never"
+            ),
         )
     console.print(table)
 
 
+@app.command("refresh")
+def refresh_jobs(
+    interval: Optional[float] = typer.Option(
+        None,
+        help="Keep refreshing every this many seconds, e.g. to keep the status cache warm in the background",
+    ),
+):
+    """
+    Check the status of all live jobs on the nodes and update the status cache.
+
+    Args:
+        interval (Optional[float]): Keep refreshing every this many seconds.
+    """
+    job_manager = JobManager()
+    while True:
+        jobs = job_manager.get_all_jobs_with_status()
+        console.print(f"Refreshed the status of {len(jobs)} jobs")
+        if interval is None:
+            break
+        time.sleep(interval)
+
+
+@app.command("wait")
+def wait_for_job(
+    job_id: str = typer.Argument(..., help="Job ID or name"),
+    timeout: Optional[float] = typer.Option(
+        None, help="Maximum number of seconds to wait"
+    ),
+    max_interval: float = typer.Option(
+        30.0, help="Maximum number of seconds between two status checks"
+    ),
+):
+    """
+    Wait until a job has stopped, finished or crashed on all nodes, and exit with its exit code.
+
+    Args:
+        job_id (str): Job ID or name.
+        timeout (Optional[float]): Maximum number of seconds to wait.
+        max_interval (float): Maximum number of seconds between two status checks.
+    """
+    job_manager = JobManager()
+    job = job_manager.get_job(job_id)
+    if not job:
+        console.print(
+            f"Job with ID [bold red]{job_id}[/bold red] not found", style="bold red"
+        )
+        raise typer.Exit(code=1)
+
+    console.print(f"Waiting for job [bold yellow]{job.id}[/bold yellow]...")
+    try:
+        status, exit_code = job_manager.wait_for_job(
+            job, timeout=timeout, max_interval=max_interval
+        )
+    except TimeoutError as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(code=124)
+
+    console.print(
+        f"Job [bold green]{job.id}[/bold green] {status.value} with exit code {exit_code}"
+    )
+    if exit_code is None:
+        exit_code = 0 if status == JobStatus.FINISHED else 1
+    raise typer.Exit(code=exit_code)
+
+
 @app.command("stop")
 def stop_job(job_id: str = typer.Argument(..., help="Job ID or name")):
     """
@@ -250,7 +487,10 @@ def stop_job(job_id: str = typer.Argument(..., help="Job ID or name")):
 
         if job.optuna_port:
             with NodeConnection(job.nodes[0]) as c:
-                c.run(f"pkill -TERM -f 'optuna-dashboard --port {job.optuna_port}'", warn=True)
+                c.run(
+                    f"pkill -TERM -f 'optuna-dashboard --port {job.optuna_port}'",
+                    warn=True,
+                )
 
         job_manager.update_job_status(job_id, JobStatus.STOPPING)
         console.print(f"Job [bold green]{job_id}[/bold green] is stopping")
@@ -267,6 +507,8 @@ def restart_job(job_id: str = typer.Argument(..., help="Job ID or name")):
     Args:
         job_id (str): Job ID or name.
     """
+    config = Config()
+    job_manager = JobManager()
     job = job_manager.get_job(job_id)
     if not job:
         console.print(
@@ -280,6 +522,22 @@ def restart_job(job_id: str = typer.Argument(..., help="Job ID or name")):
         )
         raise typer.Exit(code=1)
 
+    # Delta and stream jobs are restarted from the working directory as it is now
+    try:
+        changed = working_dir_changes(job)
+    except (OSError, ValueError) as e:
+        console.print(
+            f"[bold red]Error checking the working directory of the job:[/bold red] {str(e)}"
+        )
+        raise typer.Exit(code=1)
+    if changed:
+        console.print(
+            f"[bold red]{len(changed)} files of the working directory changed since job "
+            f"{job_id} was submitted, e.g. {changed[0]}.[/bold red] Jobs submitted with "
+            f"--sync {job.sync_mode.value} keep no copy of their code, submit a new job instead."
+        )
+        raise typer.Exit(code=1)
+
     console.print(f"Restarting job [bold yellow]{job_id}[/bold yellow]")
 
     try:
@@ -301,8 +559,9 @@ def restart_job(job_id: str = typer.Argument(..., help="Job ID or name")):
         executor = job.get_executor()
         pids = executor.execute()
 
-        job_manager.update_job_status(job_id, JobStatus.RUNNING)
-        job_manager.update_job_pids(job_id, pids)
+        job_manager.update_job_statuses(
+            {job_id: JobStatus.RUNNING}, pids={job_id: pids}
+        )
         console.print(f"Job [bold green]{job_id}[/bold green] has been restarted")
     except Exception as e:
         console.print(f"[bold red]Error restarting job:[/bold red] {str(e)}")
@@ -353,6 +612,8 @@ def delete_job(
             except typer.Exit:
                 console.print(f"Failed to stop job [bold yellow]{job.id}[/bold yellow]")
 
+    from ..executor import BaseExecutor
+
     # Clean-up the job from remote (executor.cleanup)
     for job in jobs:
         try:
@@ -1,10 +1,86 @@
 import os
+import tempfile
+import threading
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
-from sqlalchemy import create_engine, text
+
+# The C implementations of the YAML parser and emitter, when PyYAML was built with libyaml.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Identifies a version of a file: inode, size and modification time in nanoseconds. The
+# inode changes on every save, since saves replace the file.
+FileSignature = Tuple[int, int, int]
+
+# The parsed configuration files of the process, keyed by path, with the signature of the
+# file they were parsed from. Shared by all Config instances, so that the file is only
+# parsed again after it changed.
+_snapshots: Dict[str, Tuple[FileSignature, Dict[str, Any]]] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _signature(stat: os.stat_result) -> FileSignature:
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def load_config_data(path: str) -> Dict[str, Any]:
+    """Get the parsed content of a configuration file, parsing it only if it changed.
+
+    Args:
+        path (str): The path to the configuration file.
+
+    Returns:
+        Dict[str, Any]: The content of the file, or an empty dictionary if it does not
+                        exist. The dictionary is shared and must not be modified.
+    """
+    with _snapshots_lock:
+        try:
+            f = open(path, "r")
+        except FileNotFoundError:
+            _snapshots.pop(path, None)
+            return {}
+        with f:
+            signature = _signature(os.fstat(f.fileno()))
+            snapshot = _snapshots.get(path)
+            if snapshot is not None and snapshot[0] == signature:
+                return snapshot[1]
+            data = yaml.load(f, Loader=_YamlLoader) or {}
+        _snapshots[path] = (signature, data)
+        return data
+
+
+def save_config_data(path: str, data: Dict[str, Any]):
+    """Write a configuration file atomically and make it the snapshot of the process.
+
+    The content is written to a temporary file next to the configuration file, which then
+    replaces it, so that concurrent readers see either the old or the new file in full.
+
+    Args:
+        path (str): The path to the configuration file.
+        data (Dict[str, Any]): The content of the file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    text = yaml.dump(data, Dumper=_YamlDumper)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+            signature = _signature(os.fstat(f.fileno()))
+        with _snapshots_lock:
+            os.replace(tmp_path, path)
+            _snapshots[path] = (signature, data)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 @dataclass
@@ -18,6 +94,9 @@ class Node:
         nproc (int): The number of processes that can run on the node.
         ssh_user (Optional[str]): The SSH username for accessing the node, if available.
         ssh_pub_key_path (Optional[str]): The path to the SSH public key file, if available.
+        inventory (Optional[Dict[str, Any]]): The hardware of the node as reported by
+                                              `cluster probe`, with the time of the probe
+                                              under probed_at, if it was probed.
     """
 
     public_ip: str
@@ -27,6 +106,7 @@ class Node:
     ssh_user: Optional[str]
     ssh_pub_key_path: Optional[str]
     ssh_port: Optional[int]
+    inventory: Optional[Dict[str, Any]] = None
 
     def __post_init__(self):
         """Initialize the Node object after creation."""
@@ -246,7 +326,11 @@ class Config:
     """
 
     def __init__(self):
-        """Initialize the Config object."""
+        """Initialize the Config object.
+
+        The configuration file is parsed once per process and parsed again only when it
+        changes, so Config objects are cheap to create.
+        """
         self.config_path = os.path.expanduser("~/.cache/torch-submit/config.yaml")
         self.clusters: Dict[str, Cluster] = {}
         self.databases: Dict[str, Database] = {}
@@ -254,11 +338,7 @@ class Config:
 
     def load_config(self):
         """Load the configuration from the YAML file."""
-        if not os.path.exists(self.config_path):
-            return
-
-        with open(self.config_path, "r") as f:
-            config = yaml.safe_load(f) or {}
+        config = load_config_data(self.config_path)
 
         for cluster_name, cluster_data in config.get("clusters", {}).items():
             head_node = Node(**cluster_data["head_node"])
@@ -270,8 +350,7 @@ class Config:
             self.databases[database_name] = database
 
     def save_config(self):
-        """Save the current configuration to the YAML file."""
-        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+        """Save the current configuration to the YAML file, atomically."""
         config = {"clusters": {}, "databases": {}}
 
         for cluster_name, cluster in self.clusters.items():
@@ -284,6 +363,7 @@ class Config:
                     "ssh_user": cluster.head_node.ssh_user or None,
                     "ssh_pub_key_path": cluster.head_node.ssh_pub_key_path or None,
                     "ssh_port": cluster.head_node.ssh_port or None,
+                    "inventory": cluster.head_node.inventory,
                 },
                 "worker_nodes": [
                     {
@@ -294,6 +374,7 @@ class Config:
                         "ssh_user": node.ssh_user or None,
                         "ssh_pub_key_path": node.ssh_pub_key_path or None,
                         "ssh_port": node.ssh_port or None,
+                        "inventory": node.inventory,
                     }
                     for node in cluster.worker_nodes
                 ],
@@ -308,8 +389,7 @@ class Config:
                 "type": database.type.value,
             }
 
-        with open(self.config_path, "w") as f:
-            yaml.dump(config, f)
+        save_config_data(self.config_path, config)
 
     # Cluster methods
     def add_cluster(self, name: str, head_node: Node, worker_nodes: List[Node]):
@@ -429,6 +509,9 @@ class Config:
         """
         self.databases[name] = Database(address, port, username, password, type)
         self.save_config()
+        # SQLAlchemy is slow to import and only needed here
+        from sqlalchemy import create_engine, text
+
         engine = create_engine(self.databases[name].uri.strip("/torch_submit"))
         with engine.connect() as conn:
             conn.execute(text("CREATE DATABASE IF NOT EXISTS torch_submit"))
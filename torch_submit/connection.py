@@ -1,10 +1,383 @@
-from fabric import Connection
+import atexit
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .config import Node
 
+if TYPE_CHECKING:
+    # Fabric and Paramiko take a while to import, so they are only loaded once a connection
+    # is made
+    from fabric import Connection
+    from invoke import Result
+
+# Seconds between keepalive packets on pooled connections, so that idle connections are
+# not dropped by firewalls and dead peers are detected.
+KEEPALIVE_INTERVAL = 30
+
+# Idle connections are closed after this many seconds.
+IDLE_TIMEOUT = 300
+
+# Upper bound on the number of idle connections kept open by the pool.
+MAX_IDLE_CONNECTIONS = 64
+
+# Transport used by NodeConnection: "paramiko" for in-process Fabric connections, or
+# "openssh" for the system ssh client with persistent ControlMaster sockets.
+SSH_BACKEND_ENV = "TORCH_SUBMIT_SSH_BACKEND"
+
+# Directory holding the ControlMaster sockets of the openssh backend.
+CONTROL_DIR = os.path.expanduser("~/.cache/torch-submit/ssh")
+
+# How long a ControlMaster stays alive after its last session, so that consecutive CLI
+# invocations reuse the authenticated connection.
+CONTROL_PERSIST = "10m"
+
+ConnectionKey = Tuple[str, Optional[str], Optional[int], Optional[str]]
+
+
+class ConnectionPool:
+    """
+    A process-wide pool of SSH connections, keyed by host, user, port and key file.
+
+    Connections are leased exclusively, so concurrent operations on the same node each get
+    their own connection. Released connections are kept open for reuse, so that a command
+    touching the same node many times only pays for the SSH handshake once. Connections
+    that are no longer active are discarded, idle connections are closed after IDLE_TIMEOUT
+    seconds, and at most MAX_IDLE_CONNECTIONS idle connections are kept.
+    """
+
+    def __init__(
+        self,
+        max_idle: int = MAX_IDLE_CONNECTIONS,
+        idle_timeout: float = IDLE_TIMEOUT,
+        keepalive: int = KEEPALIVE_INTERVAL,
+    ):
+        """
+        Initialize the ConnectionPool.
+
+        Args:
+            max_idle (int): The maximum number of idle connections kept open.
+            idle_timeout (float): The number of seconds after which idle connections are closed.
+            keepalive (int): The interval between keepalive packets, in seconds.
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._idle: Dict[ConnectionKey, List[Tuple["Connection", float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(node: Node) -> ConnectionKey:
+        return (node.public_ip, node.ssh_user, node.ssh_port, node.ssh_pub_key_path)
+
+    def lease(self, node: Node) -> "Connection":
+        """
+        Lease an open connection to a node, reusing an idle one if possible.
+
+        Args:
+            node (Node): The node to connect to.
+
+        Returns:
+            Connection: An open connection, for the exclusive use of the caller until it is
+                        released.
+        """
+        key = self._key(node)
+        with self._lock:
+            stale = self._evict_expired()
+            idle = self._idle.get(key, [])
+            connection = None
+            while idle:
+                candidate, _ = idle.pop()
+                if candidate.is_connected:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        if connection is not None:
+            return connection
+
+        from fabric import Connection
+
+        connect_kwargs = None
+        if node.ssh_pub_key_path:
+            connect_kwargs = {
+                "key_filename": node.ssh_pub_key_path,
+            }
+        connection = Connection(
+            node.public_ip,
+            user=node.ssh_user,
+            connect_kwargs=connect_kwargs,
+            port=node.ssh_port,
+        )
+        connection.open()
+        connection.transport.set_keepalive(self.keepalive)
+        return connection
+
+    def release(self, node: Node, connection: "Connection"):
+        """
+        Return a leased connection to the pool.
+
+        Connections that are no longer active are closed instead. If the pool is full, the
+        connection that has been idle the longest is closed.
+
+        Args:
+            node (Node): The node the connection belongs to.
+            connection (Connection): The connection to return.
+        """
+        if not connection.is_connected:
+            connection.close()
+            return
+
+        with self._lock:
+            stale = self._evict_expired()
+            # Entries are kept in release order, so the first entry of each key is its oldest
+            self._idle.setdefault(self._key(node), []).append(
+                (connection, time.monotonic())
+            )
+            if sum(len(entries) for entries in self._idle.values()) > self.max_idle:
+                oldest = min(self._idle, key=lambda key: self._idle[key][0][1])
+                stale.append(self._idle[oldest].pop(0)[0])
+                if not self._idle[oldest]:
+                    del self._idle[oldest]
+        for candidate in stale:
+            candidate.close()
+
+    def close_all(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for connection, _ in entries:
+                connection.close()
+
+    def _evict_expired(self) -> List["Connection"]:
+        """
+        Remove the connections that have been idle for too long. Must hold the lock.
+
+        Returns:
+            List[Connection]: The removed connections, to be closed by the caller.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        expired = []
+        for key in list(self._idle):
+            entries = self._idle[key]
+            expired.extend(
+                conn for conn, released_at in entries if released_at < deadline
+            )
+            entries[:] = [entry for entry in entries if entry[1] >= deadline]
+            if not entries:
+                del self._idle[key]
+        return expired
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+
+class OpenSSHConnection:
+    """
+    A connection to a node through the system ssh client, multiplexed over a ControlMaster.
+
+    The first session to a node starts a master connection that outlives the process for
+    CONTROL_PERSIST, so later sessions, including those of subsequent CLI invocations, skip
+    the SSH handshake. The connection offers the subset of the Fabric Connection interface
+    used by torch-submit, and picks up the user's ssh configuration and agent.
+
+    Attributes:
+        node (Node): The node to connect to.
+        host (str): The address of the node.
+    """
+
+    def __init__(self, node: Node):
+        """
+        Initialize the OpenSSHConnection.
+
+        Args:
+            node (Node): The node to connect to.
+        """
+        self.node = node
+        self.host = node.public_ip
+        os.makedirs(CONTROL_DIR, mode=0o700, exist_ok=True)
+
+    def _options(self, port_flag: str) -> List[str]:
+        options = [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={CONTROL_DIR}/%C",
+            "-o", f"ControlPersist={CONTROL_PERSIST}",
+            "-o", "BatchMode=yes",
+        ]  # fmt: skip
+        if self.node.ssh_port:
+            options += [port_flag, str(self.node.ssh_port)]
+        if self.node.ssh_pub_key_path:
+            options += ["-i", self.node.ssh_pub_key_path]
+        return options
+
+    def _target(self) -> str:
+        if self.node.ssh_user:
+            return f"{self.node.ssh_user}@{self.host}"
+        return self.host
+
+    def _ssh(self, command: str) -> List[str]:
+        return ["ssh", *self._options("-p"), self._target(), command]
+
+    def run(
+        self, command: str, warn: bool = False, hide: bool = False, disown: bool = False
+    ) -> Optional["Result"]:
+        """
+        Run a shell command on the node.
+
+        Args:
+            command (str): The command to run.
+            warn (bool): Return the result of a failed command instead of raising.
+            hide (bool): Capture the output without printing it.
+            disown (bool): Start the command and return immediately without waiting for it.
+
+        Returns:
+            Optional[Result]: The result of the command, or None if it was disowned.
+
+        Raises:
+            UnexpectedExit: If the command fails and warn is not set.
+        """
+        if disown:
+            subprocess.Popen(
+                self._ssh(command),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            return None
+
+        process = subprocess.Popen(
+            self._ssh(command),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # Read both streams concurrently, echoing them as they arrive unless hidden
+        stdout, stderr = [], []
+        readers = [
+            threading.Thread(
+                target=self._pump,
+                args=(process.stdout, stdout, None if hide else sys.stdout),
+            ),
+            threading.Thread(
+                target=self._pump,
+                args=(process.stderr, stderr, None if hide else sys.stderr),
+            ),
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+
+        from invoke import Result, UnexpectedExit
+
+        result = Result(
+            stdout="".join(stdout),
+            stderr="".join(stderr),
+            command=command,
+            exited=process.wait(),
+            hide=("stdout", "stderr") if hide else (),
+        )
+        if not result.ok and not warn:
+            raise UnexpectedExit(result)
+        return result
+
+    @staticmethod
+    def _pump(stream: IO[bytes], buffer: List[str], echo: Optional[IO[str]]):
+        for line in iter(stream.readline, b""):
+            text = line.decode(errors="replace")
+            buffer.append(text)
+            if echo is not None:
+                echo.write(text)
+                echo.flush()
+        stream.close()
+
+    def put(self, local: str, remote: str):
+        """
+        Copy a local file to the node.
+
+        Args:
+            local (str): The path of the local file.
+            remote (str): The path on the node. Relative paths are relative to the home
+                          directory of the remote user.
+        """
+        subprocess.run(
+            ["scp", "-q", *self._options("-P"), local, f"{self._target()}:{remote}"],
+            check=True,
+        )
+
+    def run_with_input(self, command: str, chunks: Iterable[bytes]):
+        """
+        Run a command on the node while streaming binary data to its standard input.
+
+        Args:
+            command (str): The shell command to run.
+            chunks (Iterable[bytes]): The data to write to the standard input of the command.
+
+        Raises:
+            RuntimeError: If the command exits with a non-zero status.
+        """
+        process = subprocess.Popen(
+            self._ssh(command), stdin=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stderr = []
+        reader = threading.Thread(
+            target=self._pump, args=(process.stderr, stderr, None)
+        )
+        reader.start()
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            status = process.wait()
+            reader.join()
+        if status != 0:
+            raise RuntimeError(
+                f"Command failed on {self.host} with exit code {status}: {''.join(stderr).strip()}"
+            )
+
+    def iter_output_lines(self, command: str) -> Iterator[bytes]:
+        """
+        Run a command on the node and yield its standard output line by line.
+
+        Args:
+            command (str): The shell command to run.
+
+        Yields:
+            bytes: Each line of output, including the line terminator.
+        """
+        process = subprocess.Popen(
+            self._ssh(command),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            yield from iter(process.stdout.readline, b"")
+        finally:
+            process.kill()
+            process.wait()
+
+    @property
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self):
+        """Sessions are closed as they finish; the master connection persists on its own."""
+
 
 class NodeConnection:
-    """A context manager for handling SSH connections to a node."""
+    """A context manager for leasing an SSH connection to a node from the connection pool."""
 
     def __init__(self, node: Node):
         """Initialize the NodeConnection with a Node object.
@@ -15,32 +388,92 @@ class NodeConnection:
         self.node = node
 
     def __enter__(self):
-        """Establish an SSH connection to the node.
+        """Lease an SSH connection to the node.
+
+        With the openssh backend, selected by setting TORCH_SUBMIT_SSH_BACKEND=openssh, the
+        connection runs the system ssh client over a persistent ControlMaster instead.
 
         Returns:
             Connection: The established SSH connection.
         """
-        connect_kwargs = None
-        if self.node.ssh_pub_key_path:
-            connect_kwargs = {
-                "key_filename": self.node.ssh_pub_key_path,
-            }
-
-        self.connection = Connection(
-            self.node.public_ip,
-            user=self.node.ssh_user,
-            connect_kwargs=connect_kwargs,
-            port=self.node.ssh_port,
-        )
-        self.connection.open()
+        if os.environ.get(SSH_BACKEND_ENV) == "openssh":
+            self.connection = OpenSSHConnection(self.node)
+        else:
+            self.connection = pool.lease(self.node)
         return self.connection
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Close the SSH connection when exiting the context.
+        """Return the SSH connection to the pool when exiting the context.
 
         Args:
             exc_type: The type of the exception that caused the context to be exited.
             exc_val: The instance of the exception that caused the context to be exited.
             exc_tb: A traceback object encapsulating the call stack at the point where the exception occurred.
         """
-        self.connection.close()
+        if isinstance(self.connection, OpenSSHConnection):
+            return
+        pool.release(self.node, self.connection)
+
+
+def run_with_input(conn: "Connection", command: str, chunks: Iterable[bytes]):
+    """Run a command on a node while streaming binary data to its standard input.
+
+    Unlike Connection.run, which decodes its input as text, the data is written to a raw
+    SSH channel as it is produced, so it never has to be held in memory or on disk.
+
+    Args:
+        conn (Connection): The open connection to the node.
+        command (str): The shell command to run.
+        chunks (Iterable[bytes]): The data to write to the standard input of the command.
+
+    Raises:
+        RuntimeError: If the command exits with a non-zero status.
+    """
+    if isinstance(conn, OpenSSHConnection):
+        conn.run_with_input(command, chunks)
+        return
+
+    channel = conn.create_session()
+    try:
+        channel.exec_command(command)
+        for chunk in chunks:
+            channel.sendall(chunk)
+        channel.shutdown_write()
+        status = channel.recv_exit_status()
+        if status != 0:
+            stderr = channel.makefile_stderr("rb").read().decode(errors="replace")
+            raise RuntimeError(
+                f"Command failed on {conn.host} with exit code {status}: {stderr.strip()}"
+            )
+    finally:
+        channel.close()
+
+
+def iter_output_lines(conn: "Connection", command: str) -> Iterator[bytes]:
+    """Run a command on a node and yield its standard output line by line as it arrives.
+
+    Output is read from a raw SSH channel instead of being accumulated in memory, so this
+    is suitable for commands that run indefinitely, such as `tail -f`. Reading is paced by
+    the caller: while lines are not consumed, the SSH flow control window fills up and the
+    remote command blocks, without affecting other channels of the same connection.
+
+    Closing the generator closes the channel, which closes the standard input of the
+    command. Commands that must stop when the reader goes away can watch for that.
+
+    Args:
+        conn (Connection): The open connection to the node.
+        command (str): The shell command to run.
+
+    Yields:
+        bytes: Each line of output, including the line terminator.
+    """
+    if isinstance(conn, OpenSSHConnection):
+        yield from conn.iter_output_lines(command)
+        return
+
+    channel = conn.create_session()
+    try:
+        channel.exec_command(command)
+        yield from iter(channel.makefile("rb").readline, b"")
+    finally:
+        channel.close()
@@ -1,29 +1,144 @@
-import fnmatch
+import hashlib
 import json
 import os
+import queue
 import random
-import zipfile
+import shlex
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import optuna
 from fabric import Connection
 from invoke import UnexpectedExit
 from rich.console import Console
 
+from .archive import (
+    codec_from_path,
+    extract_command,
+    extract_stream_command,
+    iter_archive,
+    write_archive,
+)
 from .config import Config, Node
-from .connection import NodeConnection
-from .types import Job
+from .connection import NodeConnection, run_with_input
+from .ignore import IgnoreMatcher
+from .scripts import script_source
+from .sync import (
+    TREE_CACHE_DIR,
+    build_manifest,
+    diff_manifests,
+    load_manifest,
+    prune_trees_command,
+    tree_key,
+    write_delta,
+)
+from .types import ArchiveCodec, CpuBind, Distribution, Job, SyncMode
+from .utils import file_digest
 
 console = Console()
 
+# Upper bound on the number of nodes that are set up concurrently.
+MAX_PARALLEL_NODES = 32
+
+# Content-addressed store for working directory archives on each node, relative to the
+# remote user's home directory. Blobs that have not been used for a while are pruned.
+BLOB_CACHE_DIR = ".cache/torch-submit/blobs"
+BLOB_RETENTION_DAYS = 7
+
+# Options for the SSH sessions the head node opens to the workers when distributing archives.
+HEAD_SSH_OPTIONS = "-o BatchMode=yes"
+
+# Set to 1 to let the head node trust the host keys of workers it has never connected to.
+ACCEPT_NEW_HOST_KEYS_ENV = "TORCH_SUBMIT_ACCEPT_NEW_HOST_KEYS"
+
+# The SSH port of the workers on their private addresses, which the head node connects to.
+# The configured ssh_port of a node is its port on the public address, which may be
+# forwarded.
+PRIVATE_SSH_PORT_ENV = "TORCH_SUBMIT_PRIVATE_SSH_PORT"
+DEFAULT_PRIVATE_SSH_PORT = 22
+
+# Number of archive chunks buffered per node when streaming the working directory. The
+# slowest node paces the shared producer once its buffer is full.
+STREAM_BUFFER_CHUNKS = 16
+
+
+class _ChunkBroadcast:
+    """
+    Feeds the chunks of a single producer to several consumers, each in its own thread.
+
+    Every consumer reads from a bounded queue, so memory use stays constant and the producer
+    runs at the pace of the slowest consumer. A consumer that fails detaches itself and no
+    longer holds the others back. The producer stops early once every consumer has detached.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], consumers: int):
+        self._chunks = chunks
+        self._queues = [queue.Queue(STREAM_BUFFER_CHUNKS) for _ in range(consumers)]
+        self._detached = [threading.Event() for _ in range(consumers)]
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def reader(self, index: int) -> Iterator[bytes]:
+        """
+        Read the chunks for one consumer.
+
+        Args:
+            index (int): The index of the consumer.
+
+        Yields:
+            bytes: The chunks, in order.
+
+        Raises:
+            Exception: Whatever the producer raised while generating the chunks.
+        """
+        while True:
+            item = self._queues[index].get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def detach(self, index: int):
+        """
+        Stop delivering chunks to a consumer, e.g. because it failed.
+
+        Args:
+            index (int): The index of the consumer.
+        """
+        self._detached[index].set()
+
+    def _produce(self):
+        try:
+            for chunk in self._chunks:
+                if all(detached.is_set() for detached in self._detached):
+                    return
+                self._put(chunk)
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item: Any):
+        for q, detached in zip(self._queues, self._detached):
+            while not detached.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
 
 class WorkingDirectoryArchiver:
     """
     A class to handle archiving of working directories for jobs.
 
-    This class creates a zip archive of the specified working directory, including job metadata
-    and excluding files specified in a .gitignore file.
+    This class creates an archive of the specified working directory, excluding files
+    specified in a .gitignore file. Files are archived in a stable order and job metadata is
+    kept out of the archive, so that unchanged code always produces the same archive and can
+    be served from the content-addressed cache on each node.
 
     Attributes:
         job_id (str): The ID of the job.
@@ -45,70 +160,116 @@ class WorkingDirectoryArchiver:
         self.output_dir = os.path.expanduser(f"~/.cache/torch-submit/jobs/{job_id}")
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def archive(self, working_dir: str) -> str:
+    def archive(
+        self, working_dir: str, codec: ArchiveCodec = ArchiveCodec.TAR_GZ
+    ) -> str:
         """
-        Create a zip archive of the specified working directory.
+        Create an archive of the specified working directory.
 
-        This method reads the .gitignore file in the working directory to determine which files
-        to exclude from the archive. It also includes job metadata in the archive.
+        Files excluded by the gitignore rules of the working directory are not archived.
+        Already compressed file types are stored without compression. The tar codecs compress
+        in parallel across all cores.
 
         Args:
             working_dir (str): The path to the working directory to be archived.
+            codec (ArchiveCodec): The format and compression of the archive.
 
         Returns:
-            str: The path to the created zip archive.
+            str: The path to the created archive.
         """
-        archive_name = f"{os.path.basename(working_dir)}.zip"
+        archive_name = f"{os.path.basename(working_dir)}.{codec.value}"
         archive_path = os.path.join(self.output_dir, archive_name)
+        write_archive(self._iter_files(working_dir), archive_path, codec)
+        return archive_path
 
-        gitignore_path = os.path.join(working_dir, ".gitignore")
-        ignore_patterns = []
-        if os.path.exists(gitignore_path):
-            with open(gitignore_path, "r") as gitignore_file:
-                ignore_patterns = [
-                    line.strip()
-                    for line in gitignore_file
-                    if line.strip() and not line.startswith("#")
-                ]
+    def manifest(self, working_dir: str) -> str:
+        """
+        Create a manifest of the specified working directory for delta syncing.
+
+        The manifest records the size, modification time and SHA-256 hash of every file that
+        would be archived. Hashes are reused from the previous manifest of the same working
+        directory for files whose size and modification time did not change.
+
+        Args:
+            working_dir (str): The path to the working directory.
+
+        Returns:
+            str: The path to the created manifest.
+        """
+        working_dir = os.path.abspath(working_dir)
+        key = tree_key(working_dir)
+        cache_path = os.path.expanduser(f"~/.cache/torch-submit/manifests/{key}.json")
+
+        previous = None
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                previous = json.load(f)
+
+        files = build_manifest(self._iter_files(working_dir), previous)
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(files, f)
+
+        manifest_path = os.path.join(self.output_dir, "manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump({"root": working_dir, "key": key, "files": files}, f)
+        return manifest_path
+
+    def file_list(
+        self, working_dir: str, codec: ArchiveCodec = ArchiveCodec.TAR_GZ
+    ) -> str:
+        """
+        Record the files of the specified working directory for streaming.
 
-        def should_ignore(path):
-            """
-            Determine if a file should be ignored based on .gitignore patterns.
+        Only the list of files, with their sizes and modification times, is written locally.
+        Their contents are read and compressed while the archive is streamed to the nodes, so
+        no archive is stored on this machine.
 
-            Args:
-                path (str): The path to the file.
+        Args:
+            working_dir (str): The path to the working directory.
+            codec (ArchiveCodec): The tar codec with which the files are streamed.
 
-            Returns:
-                bool: True if the file should be ignored, False otherwise.
-            """
-            rel_path = os.path.relpath(path, working_dir)
-            return any(
-                rel_path.startswith(pattern) or fnmatch.fnmatch(rel_path, pattern)
-                for pattern in ignore_patterns
+        Returns:
+            str: The path to the file list.
+        """
+        if codec == ArchiveCodec.ZIP:
+            raise ValueError("Zip archives cannot be streamed")
+        working_dir = os.path.abspath(working_dir)
+        files = []
+        stats = {}
+        for file_path, arcname in self._iter_files(working_dir):
+            stat = os.stat(file_path)
+            files.append(arcname)
+            stats[arcname] = [stat.st_size, stat.st_mtime_ns]
+        file_list_path = os.path.join(self.output_dir, "files.json")
+        with open(file_list_path, "w") as f:
+            json.dump(
+                {
+                    "root": working_dir,
+                    "codec": codec.value,
+                    "files": files,
+                    "stats": stats,
+                },
+                f,
             )
+        return file_list_path
 
-        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            # Write job metadata under .torch/job.json
-            job_metadata = {
-                "id": self.job_id,
-                "name": self.job_name,
-            }
-            zipf.writestr(".torch_submit/job.json", json.dumps(job_metadata))
-
-            # Archive files
-            for root, dirs, files in os.walk(working_dir):
-                dirs[:] = [
-                    d
-                    for d in dirs
-                    if d != "__pycache__" and not should_ignore(os.path.join(root, d))
-                ]
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if not should_ignore(file_path):
-                        arcname = os.path.relpath(file_path, working_dir)
-                        zipf.write(file_path, arcname)
+    def _iter_files(self, working_dir: str) -> Iterator[Tuple[str, str]]:
+        """
+        Walk the working directory in a stable order, skipping ignored files.
 
-        return archive_path
+        Files are skipped according to the .gitignore files in the working directory and its
+        subdirectories and to .git/info/exclude. __pycache__ directories are always skipped.
+
+        Args:
+            working_dir (str): The path to the working directory.
+
+        Yields:
+            Tuple[str, str]: The path of each file and its path relative to the working directory.
+        """
+        matcher = IgnoreMatcher(working_dir, default_patterns=["__pycache__/"])
+        yield from matcher.walk()
 
 
 class BaseExecutor(ABC):
@@ -129,6 +290,12 @@ class BaseExecutor(ABC):
         self.job = job
         self.remote_dir = f"/tmp/torch_submit_job_{self.job.id}"
         self.cluster = Config().get_cluster(self.job.cluster)
+        self.archive_codec: Optional[ArchiveCodec] = None
+        self.archive_digest: Optional[str] = None
+        self.delta_manifest: Optional[Dict[str, Any]] = None
+        self.stream_files: Optional[Dict[str, Any]] = None
+        self._deltas: Dict[str, Tuple[str, str, str]] = {}
+        self._delta_lock = threading.Lock()
 
     @abstractmethod
     def get_command(self, rank: int, env_vars: Optional[Dict[str, str]] = None):
@@ -147,28 +314,168 @@ class BaseExecutor(ABC):
         """
         Execute the job command on each node in the cluster.
 
-        This method sets up the remote environment, copies the working directory,
-        and runs the job command on each node in the cluster. It manages the setup
-        and execution process, handling any exceptions that occur during execution.
+        Execution happens in two phases. The stage phase sets up the remote environment
+        and copies the working directory to every node. Only once staging has succeeded
+        everywhere does the launch phase start the job on all nodes at once, so that every
+        rank reaches the rendezvous together. Both phases run concurrently across nodes on
+        a bounded thread pool and report errors per node.
+
+        With head distribution, the working directory archive is uploaded to the head node
+        only, which then pushes it to the workers over their private addresses before the
+        workers are staged. With stream sync, the archive is compressed once and streamed to
+        all nodes at the same time, and each node unpacks it as it arrives.
+
+        If staging fails on any node, nothing is launched. If launching fails on any node,
+        the processes already started on the other nodes are terminated.
 
         Returns:
-            Dict[Node, int]: A dictionary mapping nodes to their process IDs.
+            Dict[Node, int]: A dictionary mapping nodes to their process IDs. All nodes map
+                             to None if the job could not be started on every node.
         """
-        pids = {}
-        for rank, node in enumerate(
-            [self.cluster.head_node] + self.cluster.worker_nodes
+        nodes = [self.cluster.head_node] + self.cluster.worker_nodes
+
+        if self.job.distribution == Distribution.HEAD and self.job.sync_mode in (
+            SyncMode.DELTA,
+            SyncMode.STREAM,
         ):
-            try:
-                with NodeConnection(node) as conn:
-                    self._setup_remote_env(conn)
-                    self._copy_working_dir(conn)
-                    pids[node] = self._run_job(conn, rank, env_vars)
-            except Exception:
-                console.print_exception()
-                console.print(f"Error executing job on node {node.public_ip}")
-                pids[node] = None
+            raise ValueError(
+                f"Head distribution is not supported for {self.job.sync_mode.value} sync"
+            )
+
+        if self.job.sync_mode == SyncMode.DELTA:
+            with open(self.job.working_dir, "r") as f:
+                self.delta_manifest = json.load(f)
+        elif self.job.sync_mode == SyncMode.STREAM:
+            with open(self.job.working_dir, "r") as f:
+                self.stream_files = json.load(f)
+        else:
+            self.archive_codec = codec_from_path(self.job.working_dir)
+            self.archive_digest = file_digest(self.job.working_dir)
+
+        if self.job.distribution == Distribution.HEAD and len(nodes) > 1:
+            staged = self._for_each_node(nodes[:1], self._stage)
+            if staged[nodes[0]]:
+                self._distribute_from_head(nodes[0], nodes[1:])
+                staged.update(self._for_each_node(nodes[1:], self._stage))
+        elif self.job.sync_mode == SyncMode.STREAM:
+            staged = self._stream_to_nodes(nodes)
+        else:
+            staged = self._for_each_node(nodes, self._stage)
+        failed = [node for node, ok in staged.items() if not ok]
+        if failed:
+            console.print(
+                f"[bold red]Staging failed on {', '.join(node.public_ip for node in failed)}, "
+                "aborting launch[/bold red]"
+            )
+            return {node: None for node in nodes}
+
+        pids = self._for_each_node(
+            nodes, lambda rank, node: self._launch(rank, node, env_vars)
+        )
+        if any(pid is None for pid in pids.values()):
+            console.print(
+                "[bold red]Launch failed on some nodes, terminating the others[/bold red]"
+            )
+            self.terminate(pids)
+            return {node: None for node in nodes}
         return pids
 
+    def _for_each_node(
+        self, nodes: List[Node], func: Callable[[int, Node], Any]
+    ) -> Dict[Node, Any]:
+        """
+        Run a function for every node concurrently on a bounded thread pool.
+
+        Args:
+            nodes (List[Node]): The nodes, in rank order.
+            func (Callable[[int, Node], Any]): Called with the rank and node of each node.
+
+        Returns:
+            Dict[Node, Any]: A dictionary mapping nodes to the result of the function, in rank
+                             order. Nodes on which the function raised map to None.
+        """
+        results = {}
+        with ThreadPoolExecutor(
+            max_workers=min(len(nodes), MAX_PARALLEL_NODES)
+        ) as executor:
+            futures = {
+                executor.submit(func, rank, node): node
+                for rank, node in enumerate(nodes)
+            }
+            for future in as_completed(futures):
+                node = futures[future]
+                try:
+                    results[node] = future.result()
+                except Exception:
+                    console.print_exception()
+                    console.print(f"Error executing job on node {node.public_ip}")
+                    results[node] = None
+        return {node: results[node] for node in nodes}
+
+    def _stage(
+        self, rank: int, node: Node, chunks: Optional[Iterable[bytes]] = None
+    ) -> bool:
+        """
+        Set up the remote environment and copy the working directory to a node.
+
+        Args:
+            rank (int): The rank of the node in the cluster.
+            node (Node): The node to stage the job on.
+            chunks (Optional[Iterable[bytes]]): The archive stream, with stream sync.
+
+        Returns:
+            bool: True once the node is ready to launch the job.
+        """
+        with NodeConnection(node) as conn:
+            self._setup_remote_env(conn)
+            if self.job.sync_mode == SyncMode.DELTA:
+                self._sync_working_dir(conn)
+            elif self.job.sync_mode == SyncMode.STREAM:
+                self._stream_working_dir(conn, chunks)
+            else:
+                self._copy_working_dir(conn)
+        return True
+
+    def _launch(
+        self,
+        rank: int,
+        node: Node,
+        env_vars: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Start the job on a node that has already been staged.
+
+        Args:
+            rank (int): The rank of the node in the cluster.
+            node (Node): The node to run the job on.
+
+        Returns:
+            int: The process ID of the running job.
+        """
+        with NodeConnection(node) as conn:
+            return self._run_job(conn, rank, env_vars)
+
+    def terminate(self, pids: Dict[Node, Optional[int]]):
+        """
+        Terminate the job processes on all nodes on which they were started.
+
+        Args:
+            pids (Dict[Node, Optional[int]]): A dictionary mapping nodes to process IDs.
+                                              Nodes without a process ID are skipped.
+        """
+
+        def terminate_node(rank: int, node: Node):
+            with NodeConnection(node) as conn:
+                conn.run(
+                    f"pkill -TERM -P {pids[node]}; kill -TERM {pids[node]}",
+                    warn=True,
+                    hide=True,
+                )
+
+        started = [node for node, pid in pids.items() if pid is not None]
+        if started:
+            self._for_each_node(started, terminate_node)
+
     def _prepare_command(self, rank: int, env_vars: Optional[Dict[str, str]] = None):
         return (
             f"cd {self.remote_dir} && "
@@ -186,7 +493,9 @@ class BaseExecutor(ABC):
         Run the job on the specified node.
 
         This method changes the directory to the remote directory, runs the provided torchrun command
-        along with the job command, and captures the process ID of the running job.
+        along with the job command under the node agent, and captures the process ID of the running
+        job. The agent records the state of the job in state.log in the remote directory, and
+        rotates output.log according to the log settings of the job.
 
         Args:
             conn (Connection): The connection object to the node.
@@ -200,36 +509,300 @@ class BaseExecutor(ABC):
             f"[bold blue]Running job on {conn.host} (rank {node_rank})...[/bold blue]"
         )
         full_command = self._prepare_command(node_rank, env_vars)
+        # The agent runs the command, writes its PID to job.pid and records its state. Remove
+        # the job.pid of a previous run first, so that the wait below sees the new one.
         conn.run(
+            f"rm -f {self.remote_dir}/job.pid && "
             "source ~/.profile && "
-            f"USE_TORCHSUBMIT=1 {full_command} > {self.remote_dir}/output.log 2>&1 & "
-            f"pid=$!; "
-            f"echo $pid > {self.remote_dir}/job.pid; "
-            f"wait $pid; "
-            f"echo $? > {self.remote_dir}/exit_code",
+            f"USE_TORCHSUBMIT=1 nohup python3 {self.remote_dir}/.torch_submit/agent.py "
+            f"{self.remote_dir} {shlex.quote(full_command)} "
+            f"{self.job.log_max_bytes} {self.job.log_keep} {int(self.job.log_compress)} "
+            "> /dev/null 2>&1 &",
             disown=True,
         )
-        # Parse the PID from the job.pid file
-        result = conn.run(f"cat {self.remote_dir}/job.pid", hide=True)
+        # Parse the PID from the job.pid file, which the agent writes shortly after
+        result = conn.run(
+            f"for i in $(seq 50); do [ -s {self.remote_dir}/job.pid ] && break; sleep 0.1; done; "
+            f"cat {self.remote_dir}/job.pid",
+            hide=True,
+        )
         pid = int(result.stdout.strip())
         return pid
 
     def _setup_remote_env(self, conn: Connection):
-        conn.run(f"mkdir -p {self.remote_dir}")
+        # Job metadata lives outside the archive so that the archive stays content-addressable
+        job_metadata = json.dumps({"id": self.job.id, "name": self.job.name})
+        # A restarted job runs in the same directory, so clear the state of the previous run
+        conn.run(
+            f"rm -f {self.remote_dir}/job.pid {self.remote_dir}/exit_code {self.remote_dir}/state.log && "
+            f"mkdir -p {self.remote_dir}/.torch_submit && "
+            f"printf '%s' {shlex.quote(job_metadata)} > {self.remote_dir}/.torch_submit/job.json && "
+            f"printf '%s' {shlex.quote(script_source('agent'))} > {self.remote_dir}/.torch_submit/agent.py"
+        )
 
     def _copy_working_dir(self, conn: Connection):
-        remote_zip_path = f"{self.remote_dir}/working_dir.zip"
+        """
+        Copy the working directory archive to the node and unpack it into the remote directory.
+
+        Archives are stored on the node under their SHA-256 digest. If the node already holds
+        the archive, e.g. because the same code was submitted before, the upload is skipped and
+        the job directory is materialized from the cached blob with a hardlink.
+
+        Args:
+            conn (Connection): The connection object to the node.
+        """
+        remote_archive_path = (
+            f"{self.remote_dir}/working_dir.{self.archive_codec.value}"
+        )
+        blob_path = self._blob_path()
+
+        cached = conn.run(
+            f"test -f ~/{blob_path} && touch ~/{blob_path}", warn=True, hide=True
+        )
+        if cached.ok:
+            console.print(
+                f"[bold blue]Working directory already cached on {conn.host}, skipping upload[/bold blue]"
+            )
+        else:
+            console.print(
+                f"[bold blue]Copying working directory to {conn.host}...[/bold blue]"
+            )
+            partial_path = f"{blob_path}.{self.job.id}.part"
+            conn.run(f"mkdir -p ~/{BLOB_CACHE_DIR}", hide=True)
+            conn.put(self.job.working_dir, partial_path)
+            conn.run(
+                f"mv ~/{partial_path} ~/{blob_path} && "
+                f"find ~/{BLOB_CACHE_DIR} -type f -mtime +{BLOB_RETENTION_DAYS} -delete",
+                hide=True,
+            )
+        conn.run(
+            f"ln -f ~/{blob_path} {remote_archive_path} || "
+            f"cp ~/{blob_path} {remote_archive_path}",
+            hide=True,
+        )
+
+        console.print(
+            f"[bold blue]Unpacking working directory on {conn.host}...[/bold blue]"
+        )
+        conn.run(extract_command(remote_archive_path, self.remote_dir))
+        console.print("[bold green]Working directory successfully synced.[/bold green]")
+
+    def _blob_path(self) -> str:
+        """
+        Get the path of the working directory archive in the blob cache of a node.
+
+        Returns:
+            str: The path, relative to the home directory of the remote user.
+        """
+        return f"{BLOB_CACHE_DIR}/{self.archive_digest}.{self.archive_codec.value}"
+
+    def _distribute_from_head(self, head_node: Node, worker_nodes: List[Node]):
+        """
+        Push the working directory archive from the head node to the worker nodes.
+
+        The head node copies the archive from its blob cache into the blob cache of every
+        worker over SSH, using the private address of each worker when it is known. Private
+        addresses are reached on port 22, or TORCH_SUBMIT_PRIVATE_SSH_PORT if set, and public
+        addresses on the configured SSH port of the worker. This
+        requires the head node to be able to SSH into the workers, and to know their host
+        keys unless TORCH_SUBMIT_ACCEPT_NEW_HOST_KEYS=1 is set. Workers that already hold
+        the archive are skipped. A failed push is not fatal: the worker then receives the
+        archive directly from the submitting machine when it is staged.
+
+        Args:
+            head_node (Node): The head node, which already holds the archive.
+            worker_nodes (List[Node]): The worker nodes to push the archive to.
+        """
+        blob_path = self._blob_path()
+        partial_path = f"{blob_path}.{self.job.id}.part"
+        receive = (
+            f"test -f ~/{blob_path} && touch ~/{blob_path} || "
+            f"{{ mkdir -p ~/{BLOB_CACHE_DIR} && cat > ~/{partial_path} && "
+            f"mv ~/{partial_path} ~/{blob_path}; }}"
+        )
+
+        # ssh uses the first value given for an option, so the host key policy is set once
+        host_key_checking = (
+            "accept-new" if os.environ.get(ACCEPT_NEW_HOST_KEYS_ENV) == "1" else "yes"
+        )
+        ssh_options = f"{HEAD_SSH_OPTIONS} -o StrictHostKeyChecking={host_key_checking}"
+
+        pushes = []
+        for node in worker_nodes:
+            target, port = head_ssh_destination(node)
+            if node.ssh_user:
+                target = f"{node.ssh_user}@{target}"
+            pushes.append(
+                f"(ssh -p {port} {ssh_options} {target} "
+                f"{shlex.quote(receive)} < ~/{blob_path} "
+                f"&& echo ok {node.public_ip} || echo failed {node.public_ip}) &"
+            )
+
+        console.print(
+            f"[bold blue]Distributing working directory from {head_node.public_ip} "
+            f"to {len(worker_nodes)} workers...[/bold blue]"
+        )
+        with NodeConnection(head_node) as conn:
+            result = conn.run(" ".join(pushes) + " wait", warn=True, hide=True)
+
+        for line in result.stdout.splitlines():
+            status, _, node_ip = line.partition(" ")
+            if status == "failed":
+                console.print(
+                    f"[bold yellow]Warning: Could not distribute working directory to {node_ip} "
+                    "from the head node, uploading directly. Check that the head node can "
+                    "SSH into it and knows its host key[/bold yellow]"
+                )
+
+    def _stream_to_nodes(self, nodes: List[Node]) -> Dict[Node, Any]:
+        """
+        Stage nodes while streaming the working directory archive to them.
+
+        The archive is generated once per batch of at most MAX_PARALLEL_NODES nodes and fed
+        to all nodes of the batch at the same time, so that reading, compression, transfer
+        and unpacking overlap. A node that fails is detached from the stream without
+        affecting the others.
+
+        Args:
+            nodes (List[Node]): The nodes, in rank order.
+
+        Returns:
+            Dict[Node, Any]: A dictionary mapping nodes to the result of staging them.
+        """
+        root = self.stream_files["root"]
+        files = [
+            (os.path.join(root, arcname), arcname)
+            for arcname in self.stream_files["files"]
+        ]
+        codec = ArchiveCodec(self.stream_files["codec"])
+
+        staged = {}
+        for start in range(0, len(nodes), MAX_PARALLEL_NODES):
+            batch = nodes[start : start + MAX_PARALLEL_NODES]
+            broadcast = _ChunkBroadcast(iter_archive(files, codec), len(batch))
+            broadcast.start()
+
+            def stage(index: int, node: Node) -> bool:
+                try:
+                    return self._stage(start + index, node, broadcast.reader(index))
+                finally:
+                    broadcast.detach(index)
+
+            staged.update(self._for_each_node(batch, stage))
+        return staged
+
+    def _stream_working_dir(self, conn: Connection, chunks: Iterable[bytes]):
+        """
+        Stream the working directory archive to the node, which unpacks it on the fly.
+
+        Args:
+            conn (Connection): The connection object to the node.
+            chunks (Iterable[bytes]): The archive stream.
+        """
         console.print(
-            f"[bold blue]Copying working directory to {conn.host}...[/bold blue]"
+            f"[bold blue]Streaming working directory to {conn.host}...[/bold blue]"
+        )
+        codec = ArchiveCodec(self.stream_files["codec"])
+        run_with_input(conn, extract_stream_command(self.remote_dir, codec), chunks)
+        console.print("[bold green]Working directory successfully synced.[/bold green]")
+
+    def _sync_working_dir(self, conn: Connection):
+        """
+        Sync the working directory to the node by shipping only new or changed files.
+
+        Each node keeps a mirror of the working directory together with the manifest of the
+        job that last updated it. The local manifest is diffed against that remote manifest,
+        the changed files are sent in a single tar.gz stream and deleted files are removed,
+        along with the directories they leave empty. The mirror is then copied into the
+        remote directory of the job. Trees that no job synced for TREE_RETENTION_DAYS are
+        removed from the node afterwards.
+
+        Args:
+            conn (Connection): The connection object to the node.
+        """
+        key = self.delta_manifest["key"]
+        tree_dir = f"~/{TREE_CACHE_DIR}"
+        remote_manifest = conn.run(
+            f"cat {tree_dir}/{key}.json", warn=True, hide=True
+        ).stdout
+        base = (
+            hashlib.sha256(remote_manifest.encode()).hexdigest()
+            if remote_manifest
+            else ""
+        )
+        delta_path, deleted_path, manifest_path = self._build_delta(
+            base, load_manifest(remote_manifest)
         )
-        conn.put(self.job.working_dir, remote_zip_path)
 
         console.print(
-            f"[bold blue]Unzipping working directory on {conn.host}...[/bold blue]"
+            f"[bold blue]Syncing working directory to {conn.host}...[/bold blue]"
+        )
+        staged = f"{key}.{self.job.id}"
+        conn.run(f"mkdir -p {tree_dir}/{key}", hide=True)
+        conn.put(delta_path, f"{TREE_CACHE_DIR}/{staged}.tar.gz")
+        conn.put(deleted_path, f"{TREE_CACHE_DIR}/{staged}.deleted")
+        conn.put(manifest_path, f"{TREE_CACHE_DIR}/{staged}.json")
+
+        # Apply the delta under a lock and only if no other job updated the tree meanwhile
+        if base:
+            check = f'[ "$(sha256sum {key}.json | cut -c1-64)" = "{base}" ]'
+        else:
+            check = f"[ ! -f {key}.json ]"
+        conn.run(
+            f"cd {tree_dir} && ( flock 9 && "
+            f"{{ {check} || {{ echo 'Remote tree changed during sync, please resubmit' >&2; exit 1; }}; }} && "
+            f"tar -xzf {staged}.tar.gz -C {key} && "
+            f"(cd {key} && xargs -0 -r rm -f -- < ../{staged}.deleted && "
+            "find . -mindepth 1 -type d -empty -delete) && "
+            f"mv {staged}.json {key}.json && "
+            f"cp -a {key}/. {self.remote_dir}/ "
+            f") 9> {key}.lock; status=$?; "
+            f"rm -f {staged}.tar.gz {staged}.deleted {staged}.json; "
+            f"{prune_trees_command()} 2> /dev/null; exit $status",
+            hide=True,
         )
-        conn.run(f"unzip -q -o {remote_zip_path} -d {self.remote_dir}")
         console.print("[bold green]Working directory successfully synced.[/bold green]")
 
+    def _build_delta(self, base: str, remote_manifest: Dict) -> Tuple[str, str, str]:
+        """
+        Build the files needed to bring a remote tree up to date with the local manifest.
+
+        Deltas are cached by the digest of the remote manifest, so nodes whose trees are in
+        the same state share a single delta.
+
+        Args:
+            base (str): The digest of the remote manifest, or an empty string if there is none.
+            remote_manifest (Dict): The manifest of the remote tree.
+
+        Returns:
+            Tuple[str, str, str]: The paths to the tar.gz of changed files, the NUL-separated
+                                  list of deleted files and the updated manifest.
+        """
+        with self._delta_lock:
+            if base not in self._deltas:
+                output_dir = os.path.dirname(self.job.working_dir)
+                name = f"delta-{base[:16] or 'full'}"
+                delta_path = os.path.join(output_dir, f"{name}.tar.gz")
+                deleted_path = os.path.join(output_dir, f"{name}.deleted")
+                manifest_path = os.path.join(output_dir, f"{name}.json")
+
+                files = self.delta_manifest["files"]
+                changed, deleted = diff_manifests(files, remote_manifest)
+                files = write_delta(
+                    self.delta_manifest["root"], files, changed, delta_path
+                )
+                with open(deleted_path, "w") as f:
+                    f.write("".join(f"{arcname}\0" for arcname in deleted))
+                with open(manifest_path, "w") as f:
+                    json.dump(files, f)
+
+                console.print(
+                    f"[bold blue]Delta contains {len(changed)} changed and "
+                    f"{len(deleted)} deleted files[/bold blue]"
+                )
+                self._deltas[base] = (delta_path, deleted_path, manifest_path)
+            return self._deltas[base]
+
     def cleanup(self):
         """
         Clean up the remote directories on all nodes.
@@ -300,6 +873,147 @@ class DistributedExecutor(BaseExecutor):
         )
 
 
+def head_ssh_destination(node: Node) -> Tuple[str, int]:
+    """
+    Get the address and port on which the head node reaches a worker over SSH.
+
+    Args:
+        node (Node): The worker node.
+
+    Returns:
+        Tuple[str, int]: The private address of the node and the private SSH port, or the
+                         public address and SSH port of the node if it has no private
+                         address.
+    """
+    if node.private_ip:
+        port = os.environ.get(PRIVATE_SSH_PORT_ENV)
+        return node.private_ip, int(port) if port else DEFAULT_PRIVATE_SSH_PORT
+    return node.public_ip, node.ssh_port or 22
+
+
+def plan_cpu_bindings(
+    node: Node, nproc_per_node: int
+) -> List[Tuple[Optional[int], List[int]]]:
+    """
+    Split the CPUs of a node into disjoint, NUMA-local sets, one per local rank.
+
+    With the topology recorded by `cluster probe`, local ranks are spread over the NUMA
+    nodes. A rank whose GPU (the GPU with the index of the local rank) sits on a known NUMA
+    node is placed on that NUMA node. The physical cores of each NUMA node are then split
+    evenly between its ranks, each rank getting all hyperthreads of its cores. The topology
+    only lists the CPUs the SSH user may run on. Without a recorded topology, the first
+    nproc CPUs of the node are split evenly between all ranks.
+
+    Args:
+        node (Node): The node.
+        nproc_per_node (int): The number of local ranks.
+
+    Returns:
+        List[Tuple[Optional[int], List[int]]]: For each local rank, its NUMA node, or None
+                                               if the topology is unknown, and its CPUs.
+    """
+    inventory = node.inventory or {}
+    # Each NUMA node as a list of physical cores, each a list of hyperthreads. Inventories
+    # recorded before cores were probed have one CPU per core.
+    domains = [
+        (
+            numa_node["id"],
+            numa_node.get("cores") or [[cpu] for cpu in numa_node["cpus"]],
+        )
+        for numa_node in inventory.get("numa_nodes", [])
+        if numa_node["cpus"]
+    ]
+    if not domains:
+        domains = [(None, [[cpu] for cpu in range(max(node.nproc, 1))])]
+    numa_ids = [numa_id for numa_id, _ in domains]
+    gpu_numa_nodes = {
+        gpu["index"]: gpu["numa_node"] for gpu in inventory.get("gpus", [])
+    }
+
+    domain_ranks: List[List[int]] = [[] for _ in domains]
+    for local_rank in range(nproc_per_node):
+        numa_id = gpu_numa_nodes.get(local_rank)
+        if numa_id is not None and numa_id in numa_ids:
+            index = numa_ids.index(numa_id)
+        else:
+            index = local_rank * len(domains) // nproc_per_node
+        domain_ranks[index].append(local_rank)
+
+    bindings: List[Tuple[Optional[int], List[int]]] = [(None, [])] * nproc_per_node
+    for (numa_id, cores), ranks in zip(domains, domain_ranks):
+        if len(ranks) > len(cores):
+            # More ranks than cores on this NUMA node: split the hyperthreads instead
+            cores = [[cpu] for core in cores for cpu in core]
+        for i, local_rank in enumerate(ranks):
+            if len(ranks) > len(cores):
+                # More ranks than CPUs on this NUMA node: neighbouring ranks share a CPU
+                share = [cores[i * len(cores) // len(ranks)]]
+            else:
+                share = cores[
+                    i * len(cores) // len(ranks) : (i + 1) * len(cores) // len(ranks)
+                ]
+            bindings[local_rank] = (
+                numa_id,
+                sorted(cpu for core in share for cpu in core),
+            )
+    return bindings
+
+
+def format_cpu_list(cpus: List[int]) -> str:
+    """
+    Format CPU ids as a CPU list, such as 0-3,8-11, as accepted by taskset.
+
+    Args:
+        cpus (List[int]): The CPU ids.
+
+    Returns:
+        str: The CPU list.
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in ranges
+    )
+
+
+def cpu_bind_command(
+    bindings: List[Tuple[Optional[int], List[int]]], mode: CpuBind
+) -> str:
+    """
+    Build the command that torchrun runs for each local rank to pin it before running the
+    job command.
+
+    The command picks the binding of the rank from LOCAL_RANK, which torchrun sets for each
+    worker, exports OMP_NUM_THREADS to the number of CPUs of the rank, and runs the job
+    command under taskset. In NUMA mode, ranks with a known NUMA node run under numactl
+    instead, if it is installed, which also binds their memory to their NUMA node.
+
+    Args:
+        bindings (List[Tuple[Optional[int], List[int]]]): The NUMA node and CPUs of each
+                                                          local rank.
+        mode (CpuBind): The binding mode.
+
+    Returns:
+        str: The command, to be followed by the job command.
+    """
+    cases = []
+    for local_rank, (numa_id, cpus) in enumerate(bindings):
+        cpu_list = format_cpu_list(cpus)
+        run = f'exec taskset -c {cpu_list} "$@"'
+        if mode == CpuBind.NUMA and numa_id is not None:
+            run = (
+                "command -v numactl > /dev/null && "
+                f'exec numactl --physcpubind={cpu_list} --membind={numa_id} "$@"; {run}'
+            )
+        cases.append(f"{local_rank}) export OMP_NUM_THREADS={len(cpus)}; {run};;")
+    script = f'case "$LOCAL_RANK" in {" ".join(cases)} esac; exec "$@"'
+    return f"sh -c {shlex.quote(script)} torch-submit-bind"
+
+
 class TorchrunExecutor(BaseExecutor):
     def __init__(self, job: Job):
         super().__init__(job)
@@ -311,7 +1025,9 @@ class TorchrunExecutor(BaseExecutor):
 
         This method sets up the necessary parameters for a torchrun command, including
         the number of nodes, the number of processes per node, the rendezvous backend,
-        the rendezvous endpoint, the job ID, and the maximum number of restarts.
+        the rendezvous endpoint, the job ID, and the maximum number of restarts. Unless the
+        CPU binding of the job is none, each local rank runs pinned to its own set of CPUs,
+        as planned by plan_cpu_bindings, with OMP_NUM_THREADS set to match.
 
         Args:
             rank (int): The rank of the current node.
@@ -320,26 +1036,18 @@ class TorchrunExecutor(BaseExecutor):
             str: The full command to run the job with torchrun.
         """
         nnodes = len(self.cluster.worker_nodes) + 1  # including head node
+        node = (
+            self.cluster.head_node if rank == 0 else self.cluster.worker_nodes[rank - 1]
+        )
 
         # Determine nproc_per_node
-        if rank == 0:  # Head node
-            if self.job.num_gpus is not None:
-                nproc_per_node = self.job.num_gpus
-            elif self.cluster.head_node.num_gpus is not None:
-                nproc_per_node = self.cluster.head_node.num_gpus
-            else:
-                nproc_per_node = 1  # Default to 1 if no GPU information is available
-            omp_num_threads = self.cluster.head_node.nproc // nproc_per_node
-        else:  # Worker node
-            if self.job.num_gpus is not None:
-                nproc_per_node = self.job.num_gpus
-            elif self.cluster.worker_nodes[rank - 1].num_gpus is not None:
-                nproc_per_node = self.cluster.worker_nodes[rank - 1].num_gpus
-            else:
-                nproc_per_node = 1  # Default to 1 if no GPU information is available
-            omp_num_threads = (
-                self.cluster.worker_nodes[rank - 1].nproc // nproc_per_node
-            )
+        if self.job.num_gpus is not None:
+            nproc_per_node = self.job.num_gpus
+        elif node.num_gpus is not None:
+            nproc_per_node = node.num_gpus
+        else:
+            nproc_per_node = 1  # Default to 1 if no GPU information is available
+        omp_num_threads = node.nproc // nproc_per_node
 
         if len(self.cluster.worker_nodes) == 0:
             rdzv_endpoint = f"localhost:{self.port}"
@@ -365,8 +1073,15 @@ class TorchrunExecutor(BaseExecutor):
             f"--rdzv-id={self.job.id} "
             f"--max-restarts={self.job.max_restarts} "
             "--no-python"
+            f"{self._cpu_bind_command(node, nproc_per_node)}"
         )
 
+    def _cpu_bind_command(self, node: Node, nproc_per_node: int) -> str:
+        if self.job.cpu_bind == CpuBind.NONE or nproc_per_node < 1:
+            return ""
+        bindings = plan_cpu_bindings(node, nproc_per_node)
+        return " " + cpu_bind_command(bindings, self.job.cpu_bind)
+
 
 class OptunaExecutor(DistributedExecutor):
     """
@@ -416,6 +1131,9 @@ class OptunaExecutor(DistributedExecutor):
         Returns:
             Dict[Node, int]: A dictionary mapping nodes to their process IDs.
         """
+        # Optuna is slow to import and only needed by this executor
+        import optuna
+
         optuna.create_study(
             study_name=self.job.name,
             storage=self.job.database.uri,
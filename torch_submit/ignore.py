@@ -0,0 +1,311 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Characters that make a pattern more than a literal name
+_SPECIAL_CHARS = re.compile(r"[*?\[\\]")
+
+
+def _translate(pattern: str) -> Tuple[str, bool]:
+    """Translate a single gitignore pattern into a regular expression.
+
+    Args:
+        pattern (str): The pattern, without negation prefix or trailing slash.
+
+    Returns:
+        Tuple[str, bool]: The regular expression and whether the pattern is anchored to its
+                          directory. Patterns that are not anchored match the name of a file or
+                          directory at any depth.
+    """
+    # A slash at the beginning or in the middle anchors the pattern to its directory
+    anchored = "/" in pattern
+    if pattern.startswith("/"):
+        pattern = pattern[1:]
+
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern[i : i + 2] == "**" and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    # Trailing "/**" matches everything inside
+                    out.append(".*")
+                    i += 2
+                    continue
+                if pattern[i + 2] == "/":
+                    # Leading "**/" and "/**/" match zero or more directories
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+            while i + 1 < n and pattern[i + 1] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                chars = pattern[i + 1 : j]
+                if chars[:1] in ("!", "^"):
+                    chars = "^/" + chars[1:]
+                out.append("[" + chars.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return "".join(out), anchored
+
+
+class _RuleIndex:
+    """
+    Patterns indexed for fast lookup of the last pattern matching a path.
+
+    Literal names and "*.suffix" patterns are looked up in dictionaries. Anchored patterns
+    are grouped by their first path component when it is literal, so that a path is only
+    matched against the patterns that can apply to it. The remaining patterns are compiled
+    into one regular expression per group, with the alternatives listed from the last pattern
+    to the first, so that the first alternative to match is the last matching pattern.
+    """
+
+    def __init__(self, rules: List[Tuple[int, str, str, bool]]):
+        self.names: Dict[str, int] = {}
+        self.suffixes: Dict[str, int] = {}
+        name_alternatives, path_alternatives = [], []
+        prefixed_alternatives: Dict[str, List[str]] = {}
+        for index, pattern, regex, anchored in rules:
+            first, _, rest = pattern.partition("/")
+            if not anchored and not _SPECIAL_CHARS.search(pattern):
+                self.names[pattern] = index
+            elif (
+                not anchored
+                and pattern.startswith("*.")
+                and not _SPECIAL_CHARS.search(pattern[1:])
+            ):
+                self.suffixes[pattern[1:]] = index
+            elif anchored and rest and not _SPECIAL_CHARS.search(first):
+                prefixed_alternatives.setdefault(first, []).insert(
+                    0, f"(?P<r{index}>{regex})"
+                )
+            elif anchored:
+                path_alternatives.insert(0, f"(?P<r{index}>{regex})")
+            else:
+                name_alternatives.insert(0, f"(?P<r{index}>{regex})")
+        self.name_regex = self._compile(name_alternatives)
+        self.path_regex = self._compile(path_alternatives)
+        self.prefixed_regexes = {
+            first: self._compile(alternatives)
+            for first, alternatives in prefixed_alternatives.items()
+        }
+
+    @staticmethod
+    def _compile(alternatives: List[str]) -> Optional["re.Pattern"]:
+        return re.compile("|".join(alternatives), re.DOTALL) if alternatives else None
+
+    def last_match(self, path: str, name: str) -> int:
+        """
+        Find the last pattern matching a path.
+
+        Args:
+            path (str): The path relative to the directory of the ignore file.
+            name (str): The last component of the path.
+
+        Returns:
+            int: The index of the last matching pattern, or -1 if no pattern matches.
+        """
+        index = self.names.get(name, -1)
+        if self.suffixes:
+            dot = name.find(".")
+            while dot != -1:
+                index = max(index, self.suffixes.get(name[dot:], -1))
+                dot = name.find(".", dot + 1)
+        prefixed_regex = (
+            self.prefixed_regexes.get(path.partition("/")[0])
+            if self.prefixed_regexes
+            else None
+        )
+        for regex, target in (
+            (self.name_regex, name),
+            (self.path_regex, path),
+            (prefixed_regex, path),
+        ):
+            if regex is not None:
+                m = regex.fullmatch(target)
+                if m is not None:
+                    index = max(index, int(m.lastgroup[1:]))
+        return index
+
+
+class IgnoreRules:
+    """
+    The compiled patterns of a single ignore file.
+
+    As in git, the last pattern matching a path decides whether it is ignored, and patterns
+    with a trailing slash only match directories.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        """
+        Compile the patterns of an ignore file.
+
+        Args:
+            lines (Iterable[str]): The lines of the ignore file.
+        """
+        rules = []
+        self.negations = set()
+        for line in lines:
+            rule = self._parse(line)
+            if rule is None:
+                continue
+            pattern, negated, dir_only = rule
+            regex, anchored = _translate(pattern)
+            index = len(rules)
+            if negated:
+                self.negations.add(index)
+            rules.append((index, pattern.lstrip("/"), regex, anchored, dir_only))
+
+        self.file_index = _RuleIndex([rule[:4] for rule in rules if not rule[4]])
+        self.dir_index = _RuleIndex([rule[:4] for rule in rules])
+        self._empty = not rules
+
+    def __bool__(self):
+        return not self._empty
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Tuple[str, bool, bool]]:
+        """
+        Parse a line of an ignore file.
+
+        Args:
+            line (str): The line to parse.
+
+        Returns:
+            Optional[Tuple[str, bool, bool]]: The pattern, whether it is negated and whether it
+                                              only matches directories, or None for blank lines
+                                              and comments.
+        """
+        line = line.rstrip("\r\n")
+        # Trailing spaces are ignored unless they are escaped
+        while line.endswith(" ") and not line.endswith("\\ "):
+            line = line[:-1]
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        return line, negated, dir_only
+
+    def match(self, path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against the patterns.
+
+        Args:
+            path (str): The path relative to the directory of the ignore file.
+            name (str): The last component of the path.
+            is_dir (bool): Whether the path is a directory.
+
+        Returns:
+            Optional[bool]: True if the path is ignored, False if it is re-included by a
+                            negated pattern and None if no pattern matches.
+        """
+        index = (self.dir_index if is_dir else self.file_index).last_match(path, name)
+        if index < 0:
+            return None
+        return index not in self.negations
+
+
+class IgnoreMatcher:
+    """
+    Walks a directory while skipping the files excluded by gitignore rules.
+
+    The rules of .git/info/exclude and of the .gitignore files found in the directory and its
+    subdirectories are honoured, with deeper .gitignore files taking precedence. Ignored
+    directories are pruned without being visited, so their contents cannot be re-included,
+    as in git.
+
+    Attributes:
+        root (str): The directory to walk.
+    """
+
+    def __init__(self, root: str, default_patterns: Iterable[str] = ()):
+        """
+        Initialize the IgnoreMatcher.
+
+        Args:
+            root (str): The directory to walk.
+            default_patterns (Iterable[str]): Patterns applied with the lowest precedence.
+        """
+        self.root = root
+        lines = list(default_patterns)
+        exclude_path = os.path.join(root, ".git", "info", "exclude")
+        if os.path.exists(exclude_path):
+            with open(exclude_path, "r") as f:
+                lines.extend(f)
+        self._base_rules = IgnoreRules(lines)
+
+    def walk(self) -> Iterator[Tuple[str, str]]:
+        """
+        Walk the directory in a stable order, skipping ignored files and directories.
+
+        Symbolic links to directories are not followed.
+
+        Yields:
+            Tuple[str, str]: The path of each file and its path relative to the root.
+        """
+        levels = [("", self._base_rules)] if self._base_rules else []
+        yield from self._walk(self.root, "", levels)
+
+    def _walk(
+        self, path: str, rel_path: str, levels: List[Tuple[str, IgnoreRules]]
+    ) -> Iterator[Tuple[str, str]]:
+        gitignore_path = os.path.join(path, ".gitignore")
+        if os.path.isfile(gitignore_path):
+            with open(gitignore_path, "r") as f:
+                rules = IgnoreRules(f)
+            if rules:
+                levels = levels + [(rel_path, rules)]
+
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+
+        for entry in entries:
+            entry_rel_path = rel_path + entry.name
+            if entry.is_dir():
+                if entry.is_symlink() or self._ignored(
+                    levels, entry_rel_path, entry.name, True
+                ):
+                    continue
+                yield from self._walk(entry.path, entry_rel_path + "/", levels)
+            elif not self._ignored(levels, entry_rel_path, entry.name, False):
+                yield entry.path, entry_rel_path
+
+    @staticmethod
+    def _ignored(
+        levels: List[Tuple[str, IgnoreRules]], rel_path: str, name: str, is_dir: bool
+    ) -> bool:
+        for base, rules in reversed(levels):
+            ignored = rules.match(rel_path[len(base) :], name, is_dir)
+            if ignored is not None:
+                return ignored
+        return False
@@ -0,0 +1,77 @@
+import copy
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from rich.console import Console
+
+from .config import Node
+from .connection import NodeConnection
+from .scripts import remote_command
+
+console = Console()
+
+
+def probe_inventory(node: Node) -> Dict[str, Any]:
+    """Report the hardware of a node in a single round trip.
+
+    Args:
+        node (Node): The node to probe.
+
+    Returns:
+        Dict[str, Any]: The CPU count, NUMA layout, memory, GPUs and free space on /tmp of
+                        the node, as reported by the inventory script, with the time of
+                        the probe under probed_at.
+    """
+    with NodeConnection(node) as c:
+        result = c.run(remote_command("inventory"), hide=True)
+    inventory = json.loads(result.stdout)
+    inventory["probed_at"] = time.time()
+    return inventory
+
+
+def probe_inventories(nodes: List[Node]) -> Dict[Node, Optional[Dict[str, Any]]]:
+    """Probe the hardware of several nodes concurrently.
+
+    Args:
+        nodes (List[Node]): The nodes to probe.
+
+    Returns:
+        Dict[Node, Optional[Dict[str, Any]]]: A dictionary mapping each node to its
+                                              inventory, or to None if it could not be
+                                              probed.
+    """
+
+    def probe(node: Node) -> Optional[Dict[str, Any]]:
+        try:
+            return probe_inventory(node)
+        except Exception as exc:
+            console.print(f"Error probing node {node.public_ip}: {exc}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(len(nodes), 1)) as executor:
+        return dict(zip(nodes, executor.map(probe, nodes)))
+
+
+def apply_inventory(node: Node, inventory: Dict[str, Any], resize: bool = True):
+    """Record the inventory of a node and size the node from it.
+
+    The number of GPUs of the node is set to the number of GPUs found, and its number of
+    processes to the number of CPUs usable by the SSH user, which the executors use for
+    --nproc-per-node, WORLD_SIZE and OMP_NUM_THREADS. Nodes on which no GPU was found keep
+    their GPU count, since nvidia-smi may be missing from the PATH of non-login shells.
+
+    Args:
+        node (Node): The node.
+        inventory (Dict[str, Any]): The inventory of the node.
+        resize (bool): Update the GPU and process counts of the node from the inventory.
+    """
+    # Nodes listed in several clusters get their own copy, which keeps the config free
+    # of YAML aliases
+    node.inventory = copy.deepcopy(inventory)
+    if not resize:
+        return
+    if inventory["gpus"]:
+        node.num_gpus = len(inventory["gpus"])
+    node.nproc = inventory["usable_cpus"] or inventory["cpus"] or node.nproc
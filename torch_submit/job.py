@@ -1,19 +1,183 @@
+import atexit
+import json
 import os
+import random
 import sqlite3
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from rich.console import Console
 
 from .config import Node
 from .connection import NodeConnection
-from .types import Job, JobStatus
+from .scripts import remote_command
+from .types import Executor, Job, JobStatus
 
 console = Console()
 
+# Statuses after which a job no longer changes on its own.
+TERMINAL_STATUSES = (JobStatus.STOPPED, JobStatus.FINISHED, JobStatus.CRASHED)
+
+# Statuses of jobs that may still run on some of their nodes, which are checked again on
+# the nodes. A job is unknown when some of its nodes could not be reached.
+LIVE_STATUSES = (
+    JobStatus.SUBMITTED,
+    JobStatus.RUNNING,
+    JobStatus.STOPPING,
+    JobStatus.UNKNOWN,
+)
+
+# Version of the database schema, stored in the user_version of the database.
+SCHEMA_VERSION = 2
+
+# Seconds to wait for another process to release the database before failing.
+BUSY_TIMEOUT = 30.0
+
+# Open databases, shared by all JobManagers of the process, keyed by path.
+_databases: Dict[str, Tuple[sqlite3.Connection, threading.RLock]] = {}
+_databases_lock = threading.Lock()
+
+
+def _close_databases():
+    with _databases_lock:
+        for conn, lock in _databases.values():
+            with lock:
+                conn.close()
+        _databases.clear()
+
+
+atexit.register(_close_databases)
+
+
+def probe_node(node: Node, job_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Report the state of the torch-submit jobs on a node in a single round trip.
+
+    Args:
+        node (Node): The node to probe.
+        job_ids (Optional[List[str]]): The jobs to report. Defaults to all jobs on the node.
+
+    Returns:
+        Dict[str, Dict]: A dictionary mapping job IDs to their pid, whether the process is
+                         alive, its exit code, its start time and its process tree. Jobs
+                         without a directory on the node are missing.
+    """
+    with NodeConnection(node) as c:
+        result = c.run(remote_command("probe", *(job_ids or [])), hide=True)
+    return json.loads(result.stdout)
+
+
+def node_status(job: Job, report: Optional[Dict]) -> JobStatus:
+    """Derive the status of a job on one node from the probe report of that node.
+
+    Args:
+        job (Job): The job, with its last known status.
+        report (Optional[Dict]): The probe report of the job, or None if the job directory
+                                 does not exist on the node.
+
+    Returns:
+        JobStatus: The status of the job on the node.
+    """
+    if job.status == JobStatus.SUBMITTED and (report is None or report["pid"] is None):
+        # The job is still being staged, and the agent has not been launched yet
+        return JobStatus.SUBMITTED
+    # An exit code recorded by the agent wins over a live pid, which may have been reused
+    alive = report is not None and report["alive"] and report["exit_code"] is None
+    if alive:
+        return (
+            JobStatus.STOPPING
+            if job.status == JobStatus.STOPPING
+            else JobStatus.RUNNING
+        )
+    if job.status == JobStatus.STOPPING:
+        return JobStatus.STOPPED
+    if report is not None and report["exit_code"] == 0:
+        return JobStatus.FINISHED
+    return JobStatus.CRASHED
+
+
+def node_statuses(
+    job: Job, reports: Dict[Node, Optional[Dict[str, Dict]]]
+) -> List[JobStatus]:
+    """Derive the status of a job on each of its nodes from the probe reports of the nodes.
+
+    Args:
+        job (Job): The job, with its last known status.
+        reports (Dict[Node, Optional[Dict[str, Dict]]]): The probe report of each node, or
+                                                        None for nodes that could not be
+                                                        probed.
+
+    Returns:
+        List[JobStatus]: The status of the job on each node, in rank order.
+    """
+    return [
+        JobStatus.UNKNOWN
+        if reports[node] is None
+        else node_status(job, reports[node].get(job.id))
+        for node in job.nodes
+    ]
+
+
+def job_exit_code(
+    job: Job, reports: Dict[Node, Optional[Dict[str, Dict]]]
+) -> Optional[int]:
+    """Get the exit code of a job from the probe reports of its nodes.
+
+    Args:
+        job (Job): The job.
+        reports (Dict[Node, Optional[Dict[str, Dict]]]): The probe report of each node.
+
+    Returns:
+        Optional[int]: The first non-zero exit code in rank order, 0 if all ranks exited
+                       successfully, or None if no rank reported an exit code.
+    """
+    exit_codes = [
+        reports[node][job.id]["exit_code"]
+        for node in job.nodes
+        if reports[node] and job.id in reports[node]
+    ]
+    exit_codes = [code for code in exit_codes if code is not None]
+    if not exit_codes:
+        return None
+    return next((code for code in exit_codes if code != 0), 0)
+
+
+def aggregate_status(node_statuses: List[JobStatus]) -> JobStatus:
+    """Aggregate the statuses of a job on its nodes into the status of the job.
+
+    Args:
+        node_statuses (List[JobStatus]): The status of the job on each node.
+
+    Returns:
+        JobStatus: The status of the job.
+    """
+    if all(status == JobStatus.RUNNING for status in node_statuses):
+        return JobStatus.RUNNING
+    elif all(status == JobStatus.STOPPED for status in node_statuses):
+        return JobStatus.STOPPED
+    elif all(status == JobStatus.FINISHED for status in node_statuses):
+        return JobStatus.FINISHED
+    elif any(status == JobStatus.CRASHED for status in node_statuses):
+        return JobStatus.CRASHED
+    elif any(status == JobStatus.STOPPING for status in node_statuses):
+        return JobStatus.STOPPING
+    elif any(status == JobStatus.SUBMITTED for status in node_statuses):
+        return JobStatus.SUBMITTED
+    else:
+        return JobStatus.UNKNOWN
+
 
 class JobManager:
-    """Manages job-related operations and database interactions."""
+    """Manages job-related operations and database interactions.
+
+    All JobManagers of a process share one connection per database, which may be used from
+    any thread. Accesses are serialized with a lock, and writes run in `BEGIN IMMEDIATE`
+    transactions. The database is in WAL mode, so readers in other processes are not
+    blocked by a writer, and a process waits up to BUSY_TIMEOUT seconds for the write lock
+    held by another process instead of failing with "database is locked".
+    """
 
     def __init__(
         self, db_path: str = os.path.expanduser("~/.cache/torch-submit/jobs.db")
@@ -23,29 +187,100 @@ class JobManager:
         Args:
             db_path (str): Path to the SQLite database file.
         """
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
-        self.create_table()
-        self.migrate_table()
+        db_path = os.path.abspath(db_path)
+        with _databases_lock:
+            if db_path in _databases:
+                self.conn, self.lock = _databases[db_path]
+                return
+
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            # Transactions are managed explicitly, see _transaction
+            self.conn = sqlite3.connect(
+                db_path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self.conn.row_factory = sqlite3.Row
+            self.lock = threading.RLock()
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            # Durable at checkpoints only, which is enough for a local job registry
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.create_table()
+            self.migrate_table()
+            _databases[db_path] = (self.conn, self.lock)
+
+    @contextmanager
+    def _transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """Run statements in one transaction, holding the lock of the connection.
+
+        Write transactions take the database write lock up front, so that they wait for
+        other writers through the busy timeout, rather than failing when upgrading a read
+        lock in the middle of the transaction.
+
+        Args:
+            write (bool): Whether the transaction writes to the database.
+
+        Yields:
+            sqlite3.Connection: The connection.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
 
     def create_table(self):
-        """Create the jobs table if it doesn't exist."""
+        """Create the jobs, job_nodes and job_pids tables if they don't exist."""
+        self._create_jobs_table()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_nodes (
+                job_id TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                public_ip TEXT NOT NULL,
+                private_ip TEXT DEFAULT NULL,
+                num_gpus INTEGER DEFAULT 0,
+                nproc INTEGER DEFAULT 1,
+                ssh_user TEXT DEFAULT NULL,
+                ssh_pub_key_path TEXT DEFAULT NULL,
+                ssh_port INTEGER DEFAULT NULL,
+                PRIMARY KEY (job_id, rank)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_pids (
+                job_id TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                pid INTEGER NOT NULL,
+                PRIMARY KEY (job_id, rank)
+            ) WITHOUT ROWID
+        """)
+
+    def _create_jobs_table(self):
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS jobs (
                 id TEXT PRIMARY KEY,
                 name TEXT,
                 status TEXT,
                 working_dir TEXT,
-                nodes TEXT,
                 cluster TEXT,
                 command TEXT,
                 max_restarts INTEGER DEFAULT 0,
                 num_gpus INTEGER DEFAULT NULL,
-                pids TEXT DEFAULT NULL,
                 executor TEXT DEFAULT NULL,
                 docker_image TEXT DEFAULT NULL,
                 database TEXT DEFAULT NULL,
-                optuna_port INTEGER DEFAULT NULL
+                optuna_port INTEGER DEFAULT NULL,
+                sync_mode TEXT DEFAULT NULL,
+                distribution TEXT DEFAULT NULL,
+                status_checked_at REAL DEFAULT NULL,
+                log_max_bytes INTEGER DEFAULT 0,
+                log_keep INTEGER DEFAULT 0,
+                log_compress INTEGER DEFAULT 0,
+                cpu_bind TEXT DEFAULT NULL
             )
         """)
 
@@ -55,14 +290,18 @@ class JobManager:
         Args:
             job (Job): The job to be added.
         """
-        self.conn.execute(
-            """
-            INSERT INTO jobs (id, name, status, working_dir, nodes, cluster, command, max_restarts, num_gpus, pids, executor, docker_image, database, optuna_port)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            job.to_db(),
-        )
-        self.conn.commit()
+        row = job.to_db()
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(row)}) "
+                f"VALUES ({', '.join('?' for _ in row)})",
+                tuple(row.values()),
+            )
+            conn.executemany(
+                "INSERT INTO job_nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                job.nodes_to_db(),
+            )
+            conn.executemany("INSERT INTO job_pids VALUES (?, ?, ?)", job.pids_to_db())
 
     def get_job(self, job_id_or_name: str) -> Optional[Job]:
         """Retrieve a job by its ID or name.
@@ -73,19 +312,26 @@ class JobManager:
         Returns:
             Optional[Job]: The retrieved job, or None if not found.
         """
-        # Try to get by id first
-        cursor = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id_or_name,))
-        row = cursor.fetchone()
-        if not row:
-            # If not found by id, try to get by name
-            cursor = self.conn.execute(
-                "SELECT * FROM jobs WHERE name = ?", (job_id_or_name,)
-            )
+        with self._transaction(write=False) as conn:
+            # Try to get by id first
+            cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id_or_name,))
             row = cursor.fetchone()
-
-        if not row:
-            return None
-        return Job.from_db(row)
+            if not row:
+                # If not found by id, try to get by name
+                cursor = conn.execute(
+                    "SELECT * FROM jobs WHERE name = ?", (job_id_or_name,)
+                )
+                row = cursor.fetchone()
+
+            if not row:
+                return None
+            node_rows = conn.execute(
+                "SELECT * FROM job_nodes WHERE job_id = ?", (row["id"],)
+            ).fetchall()
+            pid_rows = conn.execute(
+                "SELECT * FROM job_pids WHERE job_id = ?", (row["id"],)
+            ).fetchall()
+        return Job.from_db(row, node_rows, pid_rows)
 
     def list_jobs(self) -> List[Job]:
         """Retrieve all jobs from the database.
@@ -93,8 +339,19 @@ class JobManager:
         Returns:
             List[Job]: A list of all jobs.
         """
-        cursor = self.conn.execute("SELECT * FROM jobs")
-        return [Job.from_db(row) for row in cursor.fetchall()]
+        # Three scans joined in memory, rather than two lookups per job
+        node_rows: Dict[str, List[sqlite3.Row]] = {}
+        pid_rows: Dict[str, List[sqlite3.Row]] = {}
+        with self._transaction(write=False) as conn:
+            for node_row in conn.execute("SELECT * FROM job_nodes"):
+                node_rows.setdefault(node_row["job_id"], []).append(node_row)
+            for pid_row in conn.execute("SELECT * FROM job_pids"):
+                pid_rows.setdefault(pid_row["job_id"], []).append(pid_row)
+            rows = conn.execute("SELECT * FROM jobs").fetchall()
+        return [
+            Job.from_db(row, node_rows.get(row["id"], []), pid_rows.get(row["id"], []))
+            for row in rows
+        ]
 
     def check_job_status(self, job: Job) -> str:
         """Check the current status of a job.
@@ -103,93 +360,158 @@ class JobManager:
             job (Job): The job to check.
 
         Returns:
-            str: The current status of the job.
+            str: The current status of the job, or unknown if it could not be checked.
+        """
+        return self.check_job_statuses([job]).get(job.id, JobStatus.UNKNOWN)
 
-        Raises:
-            RuntimeError: If an unknown job status is encountered.
-        """
-        if job.status in [JobStatus.STOPPED, JobStatus.FINISHED, JobStatus.CRASHED]:
-            return job.status
-
-        if job.status in [JobStatus.SUBMITTED, JobStatus.RUNNING, JobStatus.STOPPING]:
-            node_statuses = []
-
-            def check_node_status(node):
-                try:
-                    with NodeConnection(node) as c:
-                        result = c.run(
-                            f"ps -p {job.pids[node]}",
-                            warn=True,
-                            hide=True,
-                        )
-
-                        if result.ok and job.status in [
-                            JobStatus.SUBMITTED,
-                            JobStatus.RUNNING,
-                        ]:
-                            return JobStatus.RUNNING
-                        elif result.ok and job.status == JobStatus.STOPPING:
-                            return JobStatus.STOPPING
-                        elif not result.ok and job.status == JobStatus.STOPPING:
-                            return JobStatus.STOPPED
-                        elif not result.ok:
-                            exit_code_result = c.run(
-                                f"cat {job.working_dir}/exit_code.log",
-                                warn=True,
-                                hide=True,
-                            )
-                            if (
-                                exit_code_result.ok
-                                and exit_code_result.stdout.strip() == "0"
-                            ):
-                                return JobStatus.FINISHED
-                            else:
-                                return JobStatus.CRASHED
-                        else:
-                            raise RuntimeError(
-                                f"Unknown job status: {job.status} for node {node}, {result.stdout}"
-                            )
-
-                except Exception as exc:
-                    console.print(f"Error checking node status: {exc}")
-                    return JobStatus.UNKNOWN
-
-            with ThreadPoolExecutor() as executor:
-                node_statuses = list(executor.map(check_node_status, job.nodes))
-
-            # Aggregate job status across all nodes
-            if all(status == JobStatus.RUNNING for status in node_statuses):
-                return JobStatus.RUNNING
-            elif all(status == JobStatus.STOPPED for status in node_statuses):
-                return JobStatus.STOPPED
-            elif all(status == JobStatus.FINISHED for status in node_statuses):
-                return JobStatus.FINISHED
-            elif any(status == JobStatus.CRASHED for status in node_statuses):
-                return JobStatus.CRASHED
-            elif any(status == JobStatus.STOPPING for status in node_statuses):
-                return JobStatus.STOPPING
+    def check_job_statuses(self, jobs: List[Job]) -> Dict[str, JobStatus]:
+        """Check the current status of several jobs with one probe per node.
+
+        Jobs that have already stopped, finished or crashed keep their status without any
+        remote access. The live jobs, including the unknown ones, are grouped by node, and
+        each node is probed once for all of its jobs, concurrently across nodes. The reports
+        are then aggregated per job. Nodes that cannot be probed make their jobs unknown, so
+        that they are checked again next time.
+
+        Args:
+            jobs (List[Job]): The jobs to check.
+
+        Returns:
+            Dict[str, JobStatus]: A dictionary mapping job IDs to their current status. Jobs
+                                  whose status could not be derived are left out.
+        """
+        statuses = {}
+        live_jobs = []
+        for job in jobs:
+            if job.status in LIVE_STATUSES:
+                live_jobs.append(job)
             else:
-                return JobStatus.UNKNOWN
+                statuses[job.id] = job.status
+        if not live_jobs:
+            return statuses
+
+        reports = self.probe_jobs(live_jobs)
+        for job in live_jobs:
+            try:
+                statuses[job.id] = aggregate_status(node_statuses(job, reports))
+            except Exception as exc:
+                console.print(f"Job {job.id} generated an exception: {exc}")
+        return statuses
+
+    def probe_jobs(self, jobs: List[Job]) -> Dict[Node, Optional[Dict[str, Dict]]]:
+        """Probe the nodes of several jobs, once per node and concurrently across nodes.
+
+        Args:
+            jobs (List[Job]): The jobs to probe.
+
+        Returns:
+            Dict[Node, Optional[Dict[str, Dict]]]: A dictionary mapping each node to its probe
+                                                   report, or to None if it could not be
+                                                   probed.
+        """
+        jobs_by_node: Dict[Node, List[str]] = {}
+        for job in jobs:
+            for node in job.nodes:
+                jobs_by_node.setdefault(node, []).append(job.id)
+
+        def probe(node: Node) -> Optional[Dict[str, Dict]]:
+            try:
+                return probe_node(node, jobs_by_node[node])
+            except Exception as exc:
+                console.print(f"Error checking status on node {node.public_ip}: {exc}")
+                return None
+
+        with ThreadPoolExecutor() as executor:
+            return dict(zip(jobs_by_node, executor.map(probe, jobs_by_node)))
+
+    def wait_for_job(
+        self,
+        job: Job,
+        timeout: Optional[float] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+    ) -> Tuple[JobStatus, Optional[int]]:
+        """Block until a job has stopped, finished or crashed on all of its nodes.
+
+        The nodes are polled with exponential backoff: the interval doubles from
+        min_interval up to max_interval while nothing changes, and drops back to
+        min_interval whenever the status of any node changes. Each sleep is jittered, so
+        that many waiting clients do not poll the nodes in lockstep. A job that has already
+        stopped, finished or crashed keeps its status, and the nodes are only probed for the
+        exit code recorded by the agent.
+
+        Args:
+            job (Job): The job to wait for.
+            timeout (Optional[float]): The maximum number of seconds to wait.
+            min_interval (float): The initial polling interval in seconds.
+            max_interval (float): The maximum polling interval in seconds.
 
-        raise RuntimeError(f"Unknown job status: {job.status}")
+        Returns:
+            Tuple[JobStatus, Optional[int]]: The final status of the job and its exit code,
+                                             which is the first non-zero exit code across
+                                             ranks, or None if no rank reported one.
 
-    def get_all_jobs_with_status(self) -> List[Job]:
+        Raises:
+            TimeoutError: If the job is still running after the timeout.
+        """
+        if job.status in TERMINAL_STATUSES:
+            return job.status, job_exit_code(job, self.probe_jobs([job]))
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = min_interval
+        previous = None
+        while True:
+            reports = self.probe_jobs([job])
+            statuses = node_statuses(job, reports)
+            if all(status in TERMINAL_STATUSES for status in statuses):
+                status = aggregate_status(statuses)
+                self.update_job_statuses({job.id: status}, time.time())
+                job.status = status
+                return status, job_exit_code(job, reports)
+
+            if statuses != previous:
+                interval = min_interval
+            else:
+                interval = min(interval * 2, max_interval)
+            previous = statuses
+
+            delay = random.uniform(interval / 2, interval)
+            if deadline is not None:
+                if time.monotonic() + delay > deadline:
+                    raise TimeoutError(
+                        f"Job {job.id} is still running after {timeout}s"
+                    )
+            time.sleep(delay)
+
+    def get_all_jobs_with_status(self, max_age: Optional[float] = None) -> List[Job]:
         """Retrieve all jobs and update their statuses.
 
+        Args:
+            max_age (Optional[float]): Only check the jobs whose status was last checked more
+                                       than this many seconds ago, and serve the others from
+                                       the database. Defaults to checking all live jobs.
+
         Returns:
             List[Job]: A list of all jobs with updated statuses.
         """
         jobs = self.list_jobs()
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self.check_job_status, job) for job in jobs]
-            for job, future in zip(jobs, futures):
-                try:
-                    new_status = future.result()
-                    if new_status != job.status:
-                        self.update_job_status(job.id, new_status)
-                        job.status = new_status
-                except Exception as exc:
-                    print(f"Job {job.id} generated an exception: {exc}")
+        if max_age is None:
+            stale_jobs = jobs
+        else:
+            deadline = time.time() - max_age
+            stale_jobs = [
+                job
+                for job in jobs
+                if job.status_checked_at is None or job.status_checked_at < deadline
+            ]
+
+        statuses = self.check_job_statuses(stale_jobs)
+        checked_at = time.time()
+        self.update_job_statuses(statuses, checked_at)
+        for job in stale_jobs:
+            if job.id in statuses:
+                job.status = statuses[job.id]
+                job.status_checked_at = checked_at
         return jobs
 
     def update_job_status(self, job_id: str, status: JobStatus):
@@ -204,26 +526,68 @@ class JobManager:
         """
         if not isinstance(status, JobStatus):
             raise ValueError(f"Invalid job status: {status}")
-        self.conn.execute(
-            "UPDATE jobs SET status = ? WHERE id = ?", (status.value, job_id)
-        )
-        self.conn.commit()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ? WHERE id = ?", (status.value, job_id)
+            )
+
+    def update_job_statuses(
+        self,
+        statuses: Dict[str, JobStatus],
+        checked_at: Optional[float] = None,
+        pids: Optional[Dict[str, Dict[Node, Optional[int]]]] = None,
+    ):
+        """Record the statuses, and optionally the process IDs, of several jobs in one
+        transaction.
 
-    def update_job_pids(self, job_id: str, pids: Dict[Node, int]):
+        Args:
+            statuses (Dict[str, JobStatus]): A dictionary mapping job IDs to their status.
+            checked_at (Optional[float]): When the statuses were checked on the nodes, as a
+                                          Unix timestamp, or None if they were not.
+            pids (Optional[Dict[str, Dict[Node, Optional[int]]]]): A dictionary mapping job
+                                                                   IDs to their new process
+                                                                   IDs.
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE jobs SET status = ?, status_checked_at = ? WHERE id = ?",
+                [
+                    (status.value, checked_at, job_id)
+                    for job_id, status in statuses.items()
+                ],
+            )
+            for job_id, job_pids in (pids or {}).items():
+                self._write_pids(conn, job_id, job_pids)
+
+    def update_job_pids(self, job_id: str, pids: Dict[Node, Optional[int]]):
         """Update the process IDs for a job in the database.
 
         Args:
             job_id (str): The ID of the job to update.
-            pids (Dict[Node, int]): A dictionary mapping nodes to process IDs.
-        """
-        self.conn.execute(
-            "UPDATE jobs SET pids = ? WHERE id = ?",
-            (
-                ",".join([f"{node.public_ip}:{pid}" for node, pid in pids.items()]),
-                job_id,
-            ),
+            pids (Dict[Node, Optional[int]]): A dictionary mapping nodes to process IDs.
+        """
+        with self._transaction() as conn:
+            self._write_pids(conn, job_id, pids)
+
+    @staticmethod
+    def _write_pids(
+        conn: sqlite3.Connection, job_id: str, pids: Dict[Node, Optional[int]]
+    ):
+        ranks = {}
+        for row in conn.execute(
+            "SELECT rank, public_ip FROM job_nodes WHERE job_id = ? ORDER BY rank DESC",
+            (job_id,),
+        ):
+            ranks[row["public_ip"]] = row["rank"]
+        conn.execute("DELETE FROM job_pids WHERE job_id = ?", (job_id,))
+        conn.executemany(
+            "INSERT INTO job_pids VALUES (?, ?, ?)",
+            [
+                (job_id, ranks[node.public_ip], pid)
+                for node, pid in pids.items()
+                if pid is not None and node.public_ip in ranks
+            ],
         )
-        self.conn.commit()
 
     def delete_job(self, job_id: str):
         """Delete a job from the database.
@@ -231,19 +595,99 @@ class JobManager:
         Args:
             job_id (str): The ID of the job to delete.
         """
-        self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
-        self.conn.commit()
+        with self._transaction() as conn:
+            for table in ("job_pids", "job_nodes"):
+                conn.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
 
     def delete_all_jobs(self):
         """Delete all jobs from the database."""
-        self.conn.execute("DELETE FROM jobs")
-        self.conn.commit()
+        with self._transaction() as conn:
+            for table in ("job_pids", "job_nodes", "jobs"):
+                conn.execute(f"DELETE FROM {table}")
 
     def close(self):
-        """Close the database connection."""
-        self.conn.close()
+        """Close the database connection, which is shared by all JobManagers of the
+        process using the same database."""
+        with _databases_lock:
+            for db_path, (conn, _) in list(_databases.items()):
+                if conn is self.conn:
+                    del _databases[db_path]
+            with self.lock:
+                self.conn.close()
 
     def migrate_table(self):
-        """Perform any necessary database migrations."""
-        # Add any necessary migration steps here
-        pass
+        """Perform any necessary database migrations.
+
+        The schema version is kept in the user_version of the database. Version 0 databases
+        may hold the original jobs table, which stored the nodes and the pids of each job as
+        delimited strings. Its rows are moved into the current schema. Version 1 databases
+        lack the cpu_bind column. The migration runs in one transaction, so that concurrent
+        processes migrate the database only once.
+        """
+        with self._transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if version < 1 and "nodes" in columns:
+                self._migrate_delimited_jobs(columns)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "cpu_bind" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN cpu_bind TEXT DEFAULT NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_name ON jobs (name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_cluster ON jobs (cluster)")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_delimited_jobs(self, columns: Set[str]):
+        """Move the jobs of the original jobs table into the normalized tables, within the
+        transaction of migrate_table.
+
+        Args:
+            columns (Set[str]): The columns of the original jobs table. Columns that were
+                                added by later releases may be missing.
+        """
+        self.conn.execute("ALTER TABLE jobs RENAME TO jobs_delimited")
+        self._create_jobs_table()
+        job_columns = [row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        for row in self.conn.execute("SELECT * FROM jobs_delimited").fetchall():
+            try:
+                nodes = [Node.from_db(node) for node in row["nodes"].split(",")]
+            except (AttributeError, ValueError):
+                console.print(
+                    f"[bold yellow]Dropping job {row['id']}, its nodes cannot be read[/bold yellow]"
+                )
+                continue
+            job_row = {
+                column: row[column] if column in columns else None
+                for column in job_columns
+            }
+            self.conn.execute(
+                f"INSERT INTO jobs ({', '.join(job_row)}) "
+                f"VALUES ({', '.join('?' for _ in job_row)})",
+                tuple(job_row.values()),
+            )
+            job = Job(
+                id=row["id"],
+                name=row["name"],
+                status=JobStatus.UNKNOWN,
+                working_dir=row["working_dir"],
+                nodes=nodes,
+                cluster=row["cluster"],
+                command=row["command"],
+                executor=Executor.TORCHRUN,
+            )
+            for pair in (row["pids"] or "").split(","):
+                node_ip, _, pid = pair.rpartition(":")
+                node = next((n for n in nodes if n.public_ip == node_ip), None)
+                if node and pid.isdigit():
+                    job.pids[node] = int(pid)
+            self.conn.executemany(
+                "INSERT INTO job_nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                job.nodes_to_db(),
+            )
+            self.conn.executemany(
+                "INSERT INTO job_pids VALUES (?, ?, ?)", job.pids_to_db()
+            )
+        self.conn.execute("DROP TABLE jobs_delimited")
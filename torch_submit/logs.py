@@ -0,0 +1,397 @@
+import heapq
+import json
+import os
+import queue
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from rich.console import Console
+from rich.text import Text
+
+from .config import Node
+from .connection import NodeConnection, iter_output_lines
+from .scripts import remote_command
+
+console = Console()
+
+# Number of lines buffered per rank. Once a rank's buffer is full, its SSH channel stops
+# being read and the remote tail blocks, while the other ranks keep streaming.
+RANK_BUFFER_LINES = 1000
+
+# Number of lines printed from one rank before moving on to the next one.
+LINES_PER_TURN = 50
+
+# Styles of the rank prefixes, cycled through by rank.
+RANK_STYLES = ["cyan", "magenta", "green", "yellow", "blue", "red"]
+
+# Marks the end of a rank's stream in its buffer.
+_END = object()
+
+
+def gunzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Decompress a gzip stream incrementally.
+
+    Args:
+        chunks (Iterable[bytes]): The compressed stream.
+
+    Yields:
+        bytes: The decompressed data.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+class LogCache:
+    """
+    A local copy of a contiguous byte range of the log of one rank.
+
+    The cache holds the bytes from offset `base` to offset `end` of the remote log, so
+    that later fetches only need to pull the bytes written after `end`. The cache starts
+    past the beginning of the log when it was filled by a tail of the log. `shown` is the
+    offset up to which the log has been printed.
+
+    Attributes:
+        base (int): The offset in the remote log of the first cached byte.
+        end (int): The offset in the remote log after the last cached byte.
+        shown (int): The offset in the remote log up to which the log has been printed.
+    """
+
+    def __init__(self, job_id: str, rank: int):
+        """
+        Open the cache of a rank, discarding it if it is inconsistent.
+
+        Args:
+            job_id (str): The ID of the job.
+            rank (int): The rank of the node.
+        """
+        cache_dir = os.path.expanduser(f"~/.cache/torch-submit/jobs/{job_id}/logs")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.data_path = os.path.join(cache_dir, f"rank{rank}.log")
+        self.meta_path = os.path.join(cache_dir, f"rank{rank}.json")
+
+        self.base = self.end = self.shown = 0
+        if os.path.exists(self.meta_path) and os.path.exists(self.data_path):
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            if os.path.getsize(self.data_path) == meta["end"] - meta["base"]:
+                self.base, self.end = meta["base"], meta["end"]
+                self.shown = meta["shown"]
+                return
+        self.reset(0)
+
+    def reset(self, base: int):
+        """
+        Empty the cache, to be refilled from an offset of the remote log.
+
+        Args:
+            base (int): The offset in the remote log from which the cache is refilled.
+        """
+        open(self.data_path, "wb").close()
+        self.base = self.end = base
+        self.shown = min(self.shown, base)
+        self.save()
+
+    def append(self, start: int, chunks: Iterable[bytes]):
+        """
+        Add bytes fetched from the remote log to the cache.
+
+        Args:
+            start (int): The offset in the remote log of the first byte. If it does not
+                         continue the cached range, the cache is emptied first.
+            chunks (Iterable[bytes]): The bytes.
+        """
+        if start != self.end:
+            self.reset(start)
+        with open(self.data_path, "ab") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                self.end += len(chunk)
+        self.save()
+
+    def save(self):
+        with open(self.meta_path, "w") as f:
+            json.dump({"base": self.base, "end": self.end, "shown": self.shown}, f)
+
+    def lines(self, start: int = 0) -> Iterator[bytes]:
+        """
+        Read the cached log line by line.
+
+        Args:
+            start (int): The offset in the remote log from which to read.
+
+        Yields:
+            bytes: Each line, including the line terminator.
+        """
+        with open(self.data_path, "rb") as f:
+            f.seek(max(start - self.base, 0))
+            yield from f
+
+    def count_lines(self) -> int:
+        return sum(1 for _ in self.lines())
+
+
+class LogStreamer:
+    """
+    Streams the output of a job from all of its nodes at once, merged into one stream.
+
+    Each node is read on its own channel in its own thread, into a bounded buffer per rank.
+    The buffers are drained round-robin, a limited number of lines at a time, so a chatty
+    rank cannot starve or stall the others. Every line is prefixed with `[rank N host]`.
+    Logs that are not followed are fetched incrementally into a local LogCache per rank.
+
+    Attributes:
+        job_id (str): The ID of the job.
+        nodes (List[Node]): The nodes of the job, in rank order.
+        ranks (Optional[List[int]]): The ranks to stream. Defaults to all ranks.
+    """
+
+    def __init__(
+        self, job_id: str, nodes: List[Node], ranks: Optional[Iterable[int]] = None
+    ):
+        """
+        Initialize the LogStreamer.
+
+        Args:
+            job_id (str): The ID of the job.
+            nodes (List[Node]): The nodes of the job, in rank order.
+            ranks (Optional[Iterable[int]]): The ranks to stream. Defaults to all ranks.
+
+        Raises:
+            ValueError: If a rank does not exist.
+        """
+        self.job_id = job_id
+        self.nodes = nodes
+        self.ranks = sorted(set(ranks)) if ranks else list(range(len(nodes)))
+        for rank in self.ranks:
+            if not 0 <= rank < len(nodes):
+                raise ValueError(
+                    f"Rank {rank} does not exist, the job has {len(nodes)} nodes"
+                )
+        self.log_path = f"/tmp/torch_submit_job_{job_id}/output.log"
+
+    def fetch(self, tail: Optional[int] = None, since: bool = False):
+        """
+        Print the logs of the selected ranks, rank by rank, using the local log cache.
+
+        Only the bytes written since the previous fetch are pulled from each node. With a
+        tail and an empty cache, only the last lines are pulled, which the node finds by
+        seeking backwards from the end of the log. The cache is kept after the job
+        directory has been removed from the nodes.
+
+        Args:
+            tail (Optional[int]): Only print the last this many lines of each rank.
+            since (bool): Only print the output written since the previous fetch.
+        """
+        with ThreadPoolExecutor(max_workers=len(self.ranks)) as executor:
+            caches = list(
+                executor.map(
+                    lambda rank: self._update_cache(rank, tail, since), self.ranks
+                )
+            )
+
+        for rank, cache in zip(self.ranks, caches):
+            if since:
+                lines = cache.lines(cache.shown)
+            else:
+                lines = cache.lines()
+            if tail:
+                lines = deque(lines, maxlen=tail)
+            for line in lines:
+                self._print(rank, line)
+            cache.shown = cache.end
+            cache.save()
+
+    def _update_cache(
+        self, rank: int, tail: Optional[int], since: bool = False
+    ) -> LogCache:
+        """
+        Pull the bytes of the log of one rank that are missing from its cache.
+
+        Args:
+            rank (int): The rank.
+            tail (Optional[int]): The number of lines that will be printed, if limited.
+            since (bool): Whether only the output after the previous fetch will be printed.
+
+        Returns:
+            LogCache: The updated cache.
+        """
+        cache = LogCache(self.job_id, rank)
+        lines = 0
+        if cache.base > 0 and not since and (not tail or cache.count_lines() < tail):
+            # The cache was filled from a shorter tail and lacks the beginning of the log
+            cache.reset(0)
+        if tail and cache.end == 0:
+            lines = tail
+
+        try:
+            with NodeConnection(self.nodes[rank]) as conn:
+                output = iter_output_lines(
+                    conn,
+                    remote_command(
+                        "read_log", "range", self.log_path, str(cache.end), str(lines)
+                    ),
+                )
+                header = json.loads(next(output))
+                if not header["missing"]:
+                    cache.append(header["start"], gunzip(output))
+        except Exception as e:
+            self._print(
+                rank, f"Could not fetch logs, showing cached logs: {e}\n".encode()
+            )
+        return cache
+
+    def search(
+        self,
+        pattern: Optional[str] = None,
+        first: int = 1,
+        last: Optional[int] = None,
+        ignore_case: bool = False,
+    ):
+        """
+        Print the matching lines of the logs of the selected ranks, filtered on the nodes.
+
+        Each node searches its own log concurrently and sends back only the matching lines,
+        compressed. The results of all ranks are merged by line number. Lines are numbered
+        from the beginning of the oldest log segment still on the node.
+
+        Args:
+            pattern (Optional[str]): A regular expression that lines must match. Defaults to
+                                     matching all lines.
+            first (int): The first line to search, counting from 1.
+            last (Optional[int]): The last line to search. Defaults to the end of the log.
+            ignore_case (bool): Match the pattern case-insensitively.
+        """
+        command = remote_command(
+            "read_log",
+            "search",
+            self.log_path,
+            pattern or "",
+            str(first),
+            str(last or 0),
+            "1" if ignore_case else "0",
+        )
+
+        def search_rank(rank: int) -> List[Tuple[int, int, bytes]]:
+            try:
+                with NodeConnection(self.nodes[rank]) as conn:
+                    lines = b"".join(gunzip(iter_output_lines(conn, command)))
+            except Exception as e:
+                return [(0, rank, f"Could not search logs: {e}\n".encode())]
+            matches = []
+            for line in lines.split(b"\n")[:-1]:
+                number, _, text = line.partition(b"\t")
+                matches.append((int(number), rank, text))
+            return matches
+
+        with ThreadPoolExecutor(max_workers=len(self.ranks)) as executor:
+            results = list(executor.map(search_rank, self.ranks))
+
+        for number, rank, text in heapq.merge(*results):
+            self._print(rank, b"%d: " % number + text)
+
+    def command(self, follow: bool, tail: Optional[int] = None) -> str:
+        """
+        Build the shell command that prints the log on a node.
+
+        Followed logs are tailed by name, so that tailing continues in the new log after the
+        agent rotates it. Other logs are read across all of their rotated segments.
+
+        Args:
+            follow (bool): Keep printing new output as it is written.
+            tail (Optional[int]): Start from the last this many lines.
+
+        Returns:
+            str: The shell command.
+        """
+        if not follow:
+            return remote_command("read_log", "print", self.log_path, str(tail or 0))
+        lines = f"-n {tail} " if tail is not None else ""
+        # Stop tailing once the reader goes away and the channel's input is closed
+        return f"tail {lines}-F {self.log_path} 2> /dev/null & pid=$!; cat > /dev/null; kill $pid"
+
+    def stream(self, follow: bool = False, tail: Optional[int] = None):
+        """
+        Print the merged output of the selected ranks until all streams end.
+
+        Args:
+            follow (bool): Keep printing new output as it is written, until interrupted.
+            tail (Optional[int]): Start from the last this many lines of each rank.
+        """
+        buffers = {rank: queue.Queue(RANK_BUFFER_LINES) for rank in self.ranks}
+        ready = threading.Event()
+        for rank in self.ranks:
+            threading.Thread(
+                target=self._read,
+                args=(rank, self.command(follow, tail), buffers[rank], ready),
+                daemon=True,
+            ).start()
+
+        active = list(self.ranks)
+        while active:
+            printed = False
+            for rank in list(active):
+                for line in self._take(buffers[rank], LINES_PER_TURN):
+                    if line is _END:
+                        active.remove(rank)
+                        break
+                    self._print(rank, line)
+                    printed = True
+            if not printed:
+                ready.wait(0.1)
+                ready.clear()
+
+    def _read(
+        self, rank: int, command: str, buffer: queue.Queue, ready: threading.Event
+    ):
+        """
+        Read the log of one rank into its buffer, blocking while the buffer is full.
+
+        Args:
+            rank (int): The rank to read.
+            command (str): The shell command that prints the log.
+            buffer (queue.Queue): The buffer of the rank.
+            ready (threading.Event): Set whenever a line is added to the buffer.
+        """
+        node = self.nodes[rank]
+        try:
+            with NodeConnection(node) as conn:
+                for line in iter_output_lines(conn, command):
+                    buffer.put(line)
+                    ready.set()
+        except Exception as e:
+            buffer.put(f"Could not read logs: {e}\n".encode())
+        buffer.put(_END)
+        ready.set()
+
+    @staticmethod
+    def _take(buffer: queue.Queue, limit: int) -> List:
+        lines = []
+        while len(lines) < limit:
+            try:
+                lines.append(buffer.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _prefix(self, rank: int) -> Tuple[str, str]:
+        node = self.nodes[rank]
+        return f"[rank {rank} {node.public_ip}] ", RANK_STYLES[rank % len(RANK_STYLES)]
+
+    def _print(self, rank: int, line: bytes):
+        console.print(
+            Text.assemble(
+                self._prefix(rank), line.decode(errors="replace").rstrip("\r\n")
+            ),
+            soft_wrap=True,
+            highlight=False,
+        )
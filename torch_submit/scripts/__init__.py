@@ -0,0 +1,35 @@
+import os
+import shlex
+
+# Directory holding the scripts that are run on the nodes. The scripts only use the Python
+# standard library, so that they run with whatever python3 the nodes provide.
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def script_source(name: str) -> str:
+    """Read the source of a remote script.
+
+    Args:
+        name (str): The name of the script, without the .py suffix.
+
+    Returns:
+        str: The source of the script.
+    """
+    with open(os.path.join(SCRIPTS_DIR, f"{name}.py"), "r") as f:
+        return f.read()
+
+
+def remote_command(name: str, *args: str) -> str:
+    """Build the shell command that runs a script on a node without copying it there first.
+
+    Args:
+        name (str): The name of the script, without the .py suffix.
+        *args (str): The command line arguments of the script.
+
+    Returns:
+        str: The shell command.
+    """
+    return " ".join(
+        ["python3", "-c", shlex.quote(script_source(name))]
+        + [shlex.quote(arg) for arg in args]
+    )
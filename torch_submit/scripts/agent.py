@@ -0,0 +1,205 @@
+"""Run a job on a node and record its state in an append-only log.
+
+Launched by the executor next to each job as
+
+    python3 agent.py <job dir> <command> [<max log bytes> <kept segments> <compress>]
+
+so this script must only use the standard library. The agent starts the command in a shell,
+writes its process ID to job.pid, copies its output to output.log and appends one JSON
+object per line to state.log:
+
+    {"time": ..., "event": "started", "pid": ..., "agent_pid": ...}
+    {"time": ..., "event": "restarted", "restarts": ...}
+    {"time": ..., "event": "exited", "exit_code": ...}
+
+Restarts are detected from the messages torchrun prints when it restarts its worker group.
+Once the job has exited, its exit code is also written to the exit_code file.
+
+If a maximum log size is given, output.log is rotated once it reaches that size. Rotated
+segments are named output.log.<offset>, after the offset of their first byte in the whole
+output, and are optionally compressed to output.log.<offset>.gz. Only the given number of
+most recent segments is kept. The offset of the first byte of output.log is recorded in
+output.log.base, so that readers can address the output across segments.
+"""
+
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# Printed by the torchrun elastic agent before it restarts the worker group
+RESTART_PATTERN = re.compile(rb"attempts left; will restart worker group")
+
+# Output is read in chunks of up to this size, and relayed to the log in pieces ending in a
+# line feed or a carriage return, so that progress bars redrawn with \r show up as they
+# are drawn. Output without either is relayed in pieces of at most MAX_LINE_BYTES.
+READ_BYTES = 64 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+LINE_END_PATTERN = re.compile(rb"[\r\n]")
+
+SEGMENT_PATTERN = re.compile(r"^output\.log\.(\d+)(\.gz)?$")
+
+
+class RotatingLog:
+    """Append-only log file that is rotated into numbered segments once it grows too large."""
+
+    def __init__(self, job_dir, max_bytes=0, keep=0, compress=False):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, "output.log")
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.compress = compress
+        try:
+            with open(self.path + ".base", "r") as f:
+                self.base = int(f.read())
+        except (IOError, OSError, ValueError):
+            self.base = 0
+        self.file = open(self.path, "ab")
+        self.size = self.file.tell()
+        self.compressions = []
+
+    def write(self, data):
+        if self.max_bytes and self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+
+    def rotate(self):
+        self.file.close()
+        segment = "%s.%d" % (self.path, self.base)
+        os.rename(self.path, segment)
+        self.base += self.size
+        with open(self.path + ".base.tmp", "w") as f:
+            f.write("%d\n" % self.base)
+        os.rename(self.path + ".base.tmp", self.path + ".base")
+        self.file = open(self.path, "ab")
+        self.size = 0
+
+        if self.compress:
+            # Compress in the background, so that the job is not blocked on its output
+            thread = threading.Thread(target=self.compress_segment, args=(segment,))
+            thread.start()
+            self.compressions.append(thread)
+        self.prune()
+
+    @staticmethod
+    def compress_segment(segment):
+        try:
+            with open(segment, "rb") as src, gzip.open(
+                segment + ".gz.tmp", "wb", 6
+            ) as dst:
+                shutil.copyfileobj(src, dst)
+            if os.path.exists(segment):
+                os.rename(segment + ".gz.tmp", segment + ".gz")
+                os.remove(segment)
+            else:
+                # The segment was pruned while it was being compressed
+                os.remove(segment + ".gz.tmp")
+        except (IOError, OSError):
+            pass
+
+    def prune(self):
+        if not self.keep:
+            return
+        offsets = sorted(
+            set(
+                int(match.group(1))
+                for match in map(SEGMENT_PATTERN.match, os.listdir(self.job_dir))
+                if match
+            )
+        )
+        for offset in offsets[: max(len(offsets) - self.keep, 0)]:
+            for suffix in ("", ".gz"):
+                try:
+                    os.remove("%s.%d%s" % (self.path, offset, suffix))
+                except OSError:
+                    pass
+
+    def close(self):
+        self.file.close()
+        for thread in self.compressions:
+            thread.join()
+
+
+def read_pieces(stream):
+    """Yield the output read from a stream in pieces ending in \\n or \\r."""
+    fd = stream.fileno()
+    pending = b""
+    while True:
+        chunk = os.read(fd, READ_BYTES)
+        if not chunk:
+            break
+        pending += chunk
+        start = 0
+        while start < len(pending):
+            limit = start + MAX_LINE_BYTES
+            match = LINE_END_PATTERN.search(pending, start, limit)
+            if match:
+                end = match.end()
+            elif len(pending) >= limit:
+                end = limit
+            else:
+                break
+            yield pending[start:end]
+            start = end
+        pending = pending[start:]
+    if pending:
+        yield pending
+
+
+def append_state(job_dir, event, **fields):
+    record = dict(time=time.time(), event=event, **fields)
+    with open(os.path.join(job_dir, "state.log"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def main(job_dir, command, max_bytes=0, keep=0, compress=False):
+    process = subprocess.Popen(
+        ["bash", "-c", command],
+        cwd=job_dir,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    with open(os.path.join(job_dir, "job.pid"), "w") as f:
+        f.write("%d\n" % process.pid)
+    append_state(job_dir, "started", pid=process.pid, agent_pid=os.getpid())
+
+    restarts = 0
+    output = RotatingLog(job_dir, max_bytes, keep, compress)
+    for piece in read_pieces(process.stdout):
+        output.write(piece)
+        if RESTART_PATTERN.search(piece):
+            restarts += 1
+            append_state(job_dir, "restarted", restarts=restarts)
+    output.close()
+
+    exit_code = process.wait()
+    # Report signals like a shell does
+    if exit_code < 0:
+        exit_code = 128 - exit_code
+    with open(os.path.join(job_dir, "exit_code"), "w") as f:
+        f.write("%d\n" % exit_code)
+    append_state(job_dir, "exited", exit_code=exit_code)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        main(
+            sys.argv[1],
+            sys.argv[2],
+            int(sys.argv[3]),
+            int(sys.argv[4]),
+            sys.argv[5] == "1",
+        )
+    else:
+        main(sys.argv[1], sys.argv[2])
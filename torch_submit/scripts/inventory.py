@@ -0,0 +1,165 @@
+"""Report the hardware of a node as JSON.
+
+Run on the nodes with `python3 -c`, so this script must only use the standard library.
+The report is:
+
+    {
+        "cpus": the number of CPUs of the node,
+        "usable_cpus": the number of CPUs this user's processes may run on,
+        "numa_nodes": [{"id", "cpus": list of CPU ids, "cores", "memory_bytes"}],
+        "memory_bytes": the total memory of the node,
+        "memory_available_bytes": the memory available to new processes,
+        "gpus": [{"index", "name", "memory_mb", "numa_node"}],
+        "tmp_free_bytes": the free space on /tmp, available to unprivileged users,
+    }
+
+NUMA nodes are read from sysfs; nodes without NUMA support report a single NUMA node with
+all CPUs. Only the CPUs this user's processes may run on are listed, and the cores of a
+NUMA node group its CPUs by physical core, so that hyperthreads of the same core are kept
+together. GPUs are listed with nvidia-smi, and are missing if it is not installed. The
+NUMA node of a GPU is null if it is unknown.
+"""
+
+import glob
+import json
+import os
+import re
+import subprocess
+
+
+def read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def parse_cpu_list(text):
+    """Parse a CPU list such as 0-3,8-11 into a list of CPU ids."""
+    cpus = []
+    for part in (text or "").split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def meminfo(text):
+    """Parse a meminfo file into a dictionary of sizes in bytes."""
+    values = {}
+    for line in (text or "").splitlines():
+        match = re.match(r"(?:Node \d+ )?(\w+):\s+(\d+)(?: kB)?", line)
+        if match:
+            values[match.group(1)] = int(match.group(2)) * 1024
+    return values
+
+
+def allowed_cpus():
+    """Get the CPUs this user's processes may run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def physical_cores(cpus):
+    """Group CPUs by physical core, using the thread siblings of each CPU."""
+    cores = {}
+    for cpu in cpus:
+        siblings = parse_cpu_list(
+            read("/sys/devices/system/cpu/cpu%d/topology/thread_siblings_list" % cpu)
+        )
+        cores.setdefault(min(siblings or [cpu]), []).append(cpu)
+    return [cores[first] for first in sorted(cores)]
+
+
+def numa_nodes(allowed):
+    nodes = []
+    for path in glob.glob("/sys/devices/system/node/node[0-9]*"):
+        cpus = parse_cpu_list(read(os.path.join(path, "cpulist")))
+        nodes.append(
+            {
+                "id": int(re.search(r"(\d+)$", path).group(1)),
+                "cpus": [cpu for cpu in cpus if cpu in allowed],
+                "memory_bytes": meminfo(read(os.path.join(path, "meminfo"))).get(
+                    "MemTotal"
+                ),
+            }
+        )
+    if not nodes:
+        nodes.append(
+            {
+                "id": 0,
+                "cpus": sorted(allowed),
+                "memory_bytes": meminfo(read("/proc/meminfo")).get("MemTotal"),
+            }
+        )
+    for node in nodes:
+        node["cores"] = physical_cores(node["cpus"])
+    return sorted(nodes, key=lambda node: node["id"])
+
+
+def gpus():
+    try:
+        output = subprocess.check_output(
+            [
+                "nvidia-smi",
+                "--query-gpu=index,name,memory.total,pci.bus_id",
+                "--format=csv,noheader,nounits",
+            ],
+            stderr=subprocess.DEVNULL,
+        ).decode()
+    except (OSError, subprocess.CalledProcessError):
+        return []
+
+    devices = []
+    for line in output.splitlines():
+        fields = [field.strip() for field in line.split(",")]
+        if len(fields) != 4:
+            continue
+        index, name, memory, bus_id = fields
+        # nvidia-smi prints an 8 digit PCI domain, sysfs uses 4 digits
+        domain, _, rest = bus_id.lower().partition(":")
+        numa_node = read("/sys/bus/pci/devices/%s:%s/numa_node" % (domain[-4:], rest))
+        devices.append(
+            {
+                "index": int(index),
+                "name": name,
+                "memory_mb": int(memory) if memory.isdigit() else None,
+                "numa_node": int(numa_node)
+                if numa_node and int(numa_node) >= 0
+                else None,
+            }
+        )
+    return devices
+
+
+def main():
+    memory = meminfo(read("/proc/meminfo"))
+    allowed = allowed_cpus()
+    try:
+        stat = os.statvfs("/tmp")
+        tmp_free_bytes = stat.f_bavail * stat.f_frsize
+    except OSError:
+        tmp_free_bytes = None
+
+    print(
+        json.dumps(
+            {
+                "cpus": os.cpu_count(),
+                "usable_cpus": len(allowed),
+                "numa_nodes": numa_nodes(set(allowed)),
+                "memory_bytes": memory.get("MemTotal"),
+                "memory_available_bytes": memory.get("MemAvailable"),
+                "gpus": gpus(),
+                "tmp_free_bytes": tmp_free_bytes,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Report the state of the torch-submit jobs on a node as JSON.
+
+Run on the nodes with `python3 -c`, so this script must only use the standard library.
+Each job directory /tmp/torch_submit_job_<id> is reported as:
+
+    {
+        "pid": the process ID of the job, or null if it was never launched,
+        "alive": whether the process is still running,
+        "exit_code": the exit code of the job, or null if it has not exited,
+        "started_at": the start time of the process as a Unix timestamp, or null,
+        "exited_at": when the job exited as a Unix timestamp, or null,
+        "restarts": the number of times torchrun restarted the workers,
+        "children": the process tree below the job process,
+    }
+
+where each entry of the process tree is {"pid", "command", "children"}. The state log
+written by the node agent is folded into the report, so that the exit code and restart
+count recorded by the agent are reported even for jobs that exited between two probes. If job IDs are
+given as arguments, only those jobs are reported.
+"""
+
+import glob
+import json
+import os
+import sys
+
+JOB_DIR_PREFIX = "/tmp/torch_submit_job_"
+
+
+def read(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def read_int(path):
+    value = read(path)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fold_state(job_dir):
+    """Fold the state log written by the node agent into the latest state of the job."""
+    state = {"started_at": None, "exited_at": None, "exit_code": None, "restarts": 0}
+    try:
+        with open(os.path.join(job_dir, "state.log"), "r") as f:
+            lines = f.readlines()
+    except (IOError, OSError):
+        return state
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # The agent may be appending the last line right now
+            continue
+        if record["event"] == "started":
+            # A restarted job starts over, so forget how the previous run ended
+            state.update(started_at=record["time"], exited_at=None, exit_code=None)
+        elif record["event"] == "restarted":
+            state["restarts"] = record["restarts"]
+        elif record["event"] == "exited":
+            state["exited_at"] = record["time"]
+            state["exit_code"] = record["exit_code"]
+    return state
+
+
+def boot_time():
+    for line in (read("/proc/stat") or "").splitlines():
+        if line.startswith("btime "):
+            return int(line.split()[1])
+    return None
+
+
+def proc_stat(pid):
+    """Parse /proc/<pid>/stat into (command, state, parent pid, start time in ticks)."""
+    stat = read("/proc/%d/stat" % pid)
+    if stat is None:
+        return None
+    # The command is in parentheses and may itself contain spaces and parentheses
+    command = stat[stat.index("(") + 1 : stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return command, fields[0], int(fields[1]), int(fields[19])
+
+
+def process_table():
+    table = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if entry.isdigit():
+            stat = proc_stat(int(entry))
+            if stat is not None:
+                table[int(entry)] = stat
+    return table
+
+
+def process_tree(pid, table, children):
+    return [
+        {
+            "pid": child,
+            "command": table[child][0],
+            "children": process_tree(child, table, children),
+        }
+        for child in sorted(children.get(pid, []))
+    ]
+
+
+def is_alive(pid, table):
+    if table:
+        return pid in table and table[pid][1] != "Z"
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def main(job_ids):
+    table = process_table()
+    children = {}
+    for pid, (_, _, ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    btime = boot_time()
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    report = {}
+    for job_dir in sorted(glob.glob(JOB_DIR_PREFIX + "*")):
+        job_id = job_dir[len(JOB_DIR_PREFIX) :]
+        if job_ids and job_id not in job_ids:
+            continue
+
+        state = fold_state(job_dir)
+        pid = read_int(os.path.join(job_dir, "job.pid"))
+        alive = pid is not None and is_alive(pid, table)
+        started_at = state["started_at"]
+        if started_at is None and alive and pid in table and btime is not None:
+            started_at = btime + table[pid][3] / float(ticks)
+        elif started_at is None and pid is not None:
+            started_at = os.path.getmtime(os.path.join(job_dir, "job.pid"))
+        exit_code = state["exit_code"]
+        # Jobs started before the agent existed only have an exit_code file
+        if exit_code is None and state["started_at"] is None:
+            exit_code = read_int(os.path.join(job_dir, "exit_code"))
+
+        report[job_id] = {
+            "pid": pid,
+            "alive": alive,
+            "exit_code": exit_code,
+            "started_at": started_at,
+            "exited_at": state["exited_at"],
+            "restarts": state["restarts"],
+            "children": process_tree(pid, table, children) if alive else [],
+        }
+    json.dump(report, sys.stdout)
+
+
+if __name__ == "__main__":
+    main(set(sys.argv[1:]))
@@ -0,0 +1,323 @@
+"""Read a job log across its rotated segments.
+
+Run on the nodes with `python3 -c`, so this script must only use the standard library.
+Usage:
+
+    read_log.py range <path> <start> <lines>
+    read_log.py search <path> <pattern> <first> <last> <ignore case>
+    read_log.py print <path> <lines>
+
+The node agent rotates the log into segments named <path>.<offset>, optionally compressed
+to <path>.<offset>.gz, where offset is the position of the first byte of the segment in
+the whole output. The offset of the first byte of <path> itself is stored in <path>.base.
+Offsets are therefore stable across rotations, and the segments are read as one log that
+starts at the oldest segment still on the node.
+
+range prints a byte range of the log, preceded by a JSON header line. The size of the log
+is fixed when the script starts, so the range is consistent even while the job keeps
+writing. If lines is positive, the range starts at the beginning of the last that many
+lines, but not before start. Otherwise it starts at start, or at the beginning of the
+oldest segment if start is outside of the log, e.g. because it was rotated away. The
+header is
+
+    {"size": the size of the log, "start": the start of the range, "missing": bool}
+
+followed by the bytes of the range, compressed as a gzip stream.
+
+search prints the lines numbered first to last, counting from 1 at the beginning of the
+oldest segment, that match a pattern, compressed as a gzip stream. A last of 0 searches to
+the end and an empty pattern matches every line. Each matching line is printed as
+`<line number>\\t<line>`. A missing log yields an empty stream.
+
+print prints the last lines of the log, or all of it if lines is 0, uncompressed.
+"""
+
+import gzip
+import json
+import os
+import re
+import sys
+from collections import deque
+
+BLOCK_SIZE = 64 * 1024
+
+# Logs compress very well, even at the fastest level
+RANGE_COMPRESS_LEVEL = 1
+
+# Search results are small, so they are worth compressing harder
+SEARCH_COMPRESS_LEVEL = 6
+
+
+class Segment:
+    """The bytes of the log from offset to end, stored in one file."""
+
+    def __init__(self, path, offset, end, compressed=False, f=None):
+        self.path = path
+        self.offset = offset
+        self.end = end
+        self.compressed = compressed
+        self.f = f
+
+    def open(self):
+        if self.f is not None:
+            self.f.seek(0)
+            return self.f
+        # The agent may have compressed the segment since it was listed
+        for compressed in (self.compressed, not self.compressed):
+            try:
+                if compressed:
+                    return gzip.open(self.path + ".gz", "rb")
+                return open(self.path, "rb")
+            except (IOError, OSError):
+                pass
+        raise IOError("Log segment %s was removed" % self.path)
+
+    def read(self, start, end):
+        """Yield the bytes from offset start to offset end."""
+        f = self.open()
+        try:
+            if self.compressed and self.f is None:
+                skip = start - self.offset
+                while skip > 0:
+                    skip -= len(f.read(min(BLOCK_SIZE, skip)))
+            else:
+                f.seek(start - self.offset)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(BLOCK_SIZE, remaining))
+                if not chunk:
+                    break
+                yield chunk
+                remaining -= len(chunk)
+        finally:
+            if f is not self.f:
+                f.close()
+
+    def newlines(self, start, end, limit):
+        """Find the offsets of the last limit newlines from offset start to offset end."""
+        if self.compressed and self.f is None:
+            # Compressed segments can only be read forwards
+            found = deque(maxlen=limit)
+            position = start
+            for chunk in self.read(start, end):
+                index = chunk.find(b"\n")
+                while index != -1:
+                    found.append(position + index)
+                    index = chunk.find(b"\n", index + 1)
+                position += len(chunk)
+            return list(found)
+
+        f = self.open()
+        found = []
+        try:
+            position = end
+            while position > start and len(found) < limit:
+                block_start = max(position - BLOCK_SIZE, start)
+                f.seek(block_start - self.offset)
+                block = f.read(position - block_start)
+                index = block.rfind(b"\n")
+                while index != -1 and len(found) < limit:
+                    found.append(block_start + index)
+                    index = block.rfind(b"\n", 0, index)
+                position = block_start
+        finally:
+            if f is not self.f:
+                f.close()
+        return found[::-1]
+
+    def lines(self):
+        f = self.open()
+        try:
+            if self.f is None:
+                for line in f:
+                    yield line
+            else:
+                # Stop at the size of the log when the script started
+                remaining = self.end - self.offset
+                while remaining > 0:
+                    line = f.readline(remaining)
+                    if not line:
+                        break
+                    remaining -= len(line)
+                    yield line
+        finally:
+            if f is not self.f:
+                f.close()
+
+
+def read_base(path):
+    try:
+        with open(path + ".base", "r") as f:
+            return int(f.read())
+    except (IOError, OSError, ValueError):
+        return 0
+
+
+def list_segments(path):
+    """List the segments of a log, oldest first, or return None if the log is missing."""
+    directory, name = os.path.split(path)
+    pattern = re.compile(re.escape(name) + r"\.(\d+)(\.gz)?$")
+    try:
+        names = os.listdir(directory)
+    except (IOError, OSError):
+        return None
+
+    rotated = {}
+    for entry in names:
+        match = pattern.match(entry)
+        if match:
+            offset = int(match.group(1))
+            # A segment is only removed once its compressed copy is complete
+            rotated[offset] = rotated.get(offset, True) and bool(match.group(2))
+
+    # Make sure the log was not rotated between reading its base and opening it
+    for _ in range(10):
+        base = read_base(path)
+        try:
+            current = open(path, "rb")
+        except (IOError, OSError):
+            current = None
+        if read_base(path) == base:
+            break
+        if current is not None:
+            current.close()
+
+    offsets = sorted(offset for offset in rotated if offset < base)
+    if current is None and not offsets:
+        return None
+
+    segments = []
+    for offset, end in zip(offsets, offsets[1:] + [base]):
+        segment_path = "%s.%d" % (path, offset)
+        segments.append(Segment(segment_path, offset, end, rotated[offset]))
+    if current is not None:
+        size = os.fstat(current.fileno()).st_size
+        segments.append(Segment(path, base, base + size, f=current))
+    return segments
+
+
+def find_last_lines(segments, start, size, lines):
+    """Find the offset of the beginning of the last lines of the log, reading backwards."""
+    newlines = []
+    for segment in reversed(segments):
+        segment_start, segment_end = max(segment.offset, start), min(segment.end, size)
+        if segment_start < segment_end:
+            found = segment.newlines(
+                segment_start, segment_end, lines + 1 - len(newlines)
+            )
+            newlines.extend(reversed(found))
+        if len(newlines) > lines:
+            break
+    # A trailing newline terminates the last line rather than starting a new one
+    if newlines and newlines[0] == size - 1:
+        newlines = newlines[1:]
+    if len(newlines) >= lines:
+        return newlines[lines - 1] + 1
+    return start
+
+
+def read_range(segments, start, end):
+    for segment in segments:
+        segment_start, segment_end = max(segment.offset, start), min(segment.end, end)
+        if segment_start < segment_end:
+            for chunk in segment.read(segment_start, segment_end):
+                yield chunk
+
+
+def close(segments):
+    for segment in segments or []:
+        if segment.f is not None:
+            segment.f.close()
+
+
+def read_log_range(path, start, lines):
+    out = sys.stdout.buffer
+    segments = list_segments(path)
+    if segments is None:
+        out.write(
+            (json.dumps({"size": 0, "start": 0, "missing": True}) + "\n").encode()
+        )
+        return
+
+    try:
+        oldest, size = segments[0].offset, segments[-1].end
+        if not oldest <= start <= size:
+            start = oldest
+        if lines > 0:
+            start = find_last_lines(segments, start, size, lines)
+
+        out.write(
+            (
+                json.dumps({"size": size, "start": start, "missing": False}) + "\n"
+            ).encode()
+        )
+        with gzip.GzipFile(
+            fileobj=out, mode="wb", compresslevel=RANGE_COMPRESS_LEVEL
+        ) as gz:
+            for chunk in read_range(segments, start, size):
+                gz.write(chunk)
+        out.flush()
+    finally:
+        close(segments)
+
+
+def search_log(path, pattern, first, last, ignore_case):
+    regex = None
+    if pattern:
+        regex = re.compile(pattern.encode(), re.IGNORECASE if ignore_case else 0)
+
+    out = sys.stdout.buffer
+    segments = list_segments(path)
+    try:
+        with gzip.GzipFile(
+            fileobj=out, mode="wb", compresslevel=SEARCH_COMPRESS_LEVEL
+        ) as gz:
+            number = 0
+            for segment in segments or []:
+                for line in segment.lines():
+                    number += 1
+                    if number < first:
+                        continue
+                    if last and number > last:
+                        return
+                    if regex is None or regex.search(line):
+                        if not line.endswith(b"\n"):
+                            line += b"\n"
+                        gz.write(b"%d\t" % number + line)
+    finally:
+        out.flush()
+        close(segments)
+
+
+def print_log(path, lines):
+    segments = list_segments(path)
+    if segments is None:
+        return
+    try:
+        start, size = segments[0].offset, segments[-1].end
+        if lines > 0:
+            start = find_last_lines(segments, start, size, lines)
+        out = sys.stdout.buffer
+        for chunk in read_range(segments, start, size):
+            out.write(chunk)
+        out.flush()
+    finally:
+        close(segments)
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1]
+    if mode == "range":
+        read_log_range(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    elif mode == "search":
+        search_log(
+            sys.argv[2],
+            sys.argv[3],
+            int(sys.argv[4]),
+            int(sys.argv[5]),
+            sys.argv[6] == "1",
+        )
+    elif mode == "print":
+        print_log(sys.argv[2], int(sys.argv[3]))
+    else:
+        sys.exit("Unknown mode: %s" % mode)
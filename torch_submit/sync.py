@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .archive import write_archive
+from .types import ArchiveCodec, Job, SyncMode
+from .utils import file_digest
+
+# Per-file manifest entry: [size, mtime_ns, sha256]
+ManifestEntry = List
+Manifest = Dict[str, ManifestEntry]
+
+# Mirror of each synced working directory on the nodes, relative to the remote user's home
+# directory. Each tree lives next to the manifest describing its contents.
+TREE_CACHE_DIR = ".cache/torch-submit/trees"
+
+# Trees that no job synced for this many days are removed from the nodes.
+TREE_RETENTION_DAYS = 7
+
+
+def tree_key(working_dir: str) -> str:
+    """Get the key under which a local working directory is mirrored on the nodes.
+
+    The key is derived from the submitting host and the absolute path of the working
+    directory, so that repeated submits from the same checkout reuse the same remote tree.
+
+    Args:
+        working_dir: The path to the local working directory.
+
+    Returns:
+        A short hexadecimal key.
+    """
+    origin = f"{socket.gethostname()}:{os.path.abspath(working_dir)}"
+    return hashlib.sha256(origin.encode()).hexdigest()[:16]
+
+
+def build_manifest(
+    files: Iterable[Tuple[str, str]], previous: Optional[Manifest] = None
+) -> Manifest:
+    """Build a manifest of file sizes, modification times and hashes.
+
+    Hashes from a previous manifest are reused for files whose size and modification time
+    have not changed, so that only modified files are read.
+
+    Args:
+        files: Pairs of local file path and archive name.
+        previous: A previously built manifest for the same working directory.
+
+    Returns:
+        A dictionary mapping archive names to [size, mtime_ns, sha256] entries.
+    """
+    previous = previous or {}
+    manifest = {}
+    for file_path, arcname in files:
+        stat = os.stat(file_path)
+        entry = previous.get(arcname)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            manifest[arcname] = entry
+        else:
+            manifest[arcname] = [stat.st_size, stat.st_mtime_ns, file_digest(file_path)]
+    return manifest
+
+
+def diff_manifests(local: Manifest, remote: Manifest) -> Tuple[List[str], List[str]]:
+    """Compare a local manifest against the manifest of a remote tree.
+
+    Args:
+        local: The manifest of the working directory being submitted.
+        remote: The manifest of the tree currently on the node.
+
+    Returns:
+        A tuple of the archive names that are new or changed, and those that were deleted.
+    """
+    changed = [
+        arcname
+        for arcname, entry in local.items()
+        if arcname not in remote or remote[arcname][2] != entry[2]
+    ]
+    deleted = [arcname for arcname in remote if arcname not in local]
+    return changed, deleted
+
+
+def write_delta(
+    root: str, manifest: Manifest, changed: List[str], output_path: str
+) -> Manifest:
+    """Write the changed files of a working directory into a single tar.gz archive.
+
+    Files that were modified since the manifest was built are re-hashed while they are
+    added, so that the returned manifest always describes what was actually shipped.
+
+    Args:
+        root: The path to the local working directory.
+        manifest: The manifest of the working directory.
+        changed: The archive names of the files to include.
+        output_path: The path of the tar.gz file to write.
+
+    Returns:
+        The manifest of the working directory, updated for files that changed on disk.
+    """
+    manifest = dict(manifest)
+    files = []
+    for arcname in changed:
+        file_path = os.path.join(root, arcname)
+        stat = os.stat(file_path)
+        if [stat.st_size, stat.st_mtime_ns] != manifest[arcname][:2]:
+            manifest[arcname] = [stat.st_size, stat.st_mtime_ns, file_digest(file_path)]
+        files.append((file_path, arcname))
+    write_archive(files, output_path, ArchiveCodec.TAR_GZ)
+    return manifest
+
+
+def changed_files(root: str, manifest: Manifest) -> List[str]:
+    """Find the files of a working directory that changed since a manifest was built.
+
+    Only sizes and modification times are compared. Files that no longer exist count as
+    changed.
+
+    Args:
+        root: The path to the local working directory.
+        manifest: A manifest, or a mapping of archive names to [size, mtime_ns] entries.
+
+    Returns:
+        The archive names of the changed files.
+    """
+    changed = []
+    for arcname, entry in manifest.items():
+        try:
+            stat = os.stat(os.path.join(root, arcname))
+        except OSError:
+            changed.append(arcname)
+            continue
+        if [stat.st_size, stat.st_mtime_ns] != list(entry[:2]):
+            changed.append(arcname)
+    return changed
+
+
+def working_dir_changes(job: Job) -> List[str]:
+    """Find the files of the working directory of a job that changed since it was submitted.
+
+    Delta and stream jobs keep no copy of the working directory, so running them again
+    ships the working directory as it is now. Archived jobs always run the archived code.
+
+    Args:
+        job: The job.
+
+    Returns:
+        The archive names of the changed files, or an empty list for archived jobs.
+    """
+    if job.sync_mode not in (SyncMode.DELTA, SyncMode.STREAM):
+        return []
+    with open(job.working_dir, "r") as f:
+        submitted = json.load(f)
+    if job.sync_mode == SyncMode.DELTA:
+        return changed_files(submitted["root"], submitted["files"])
+    if "stats" not in submitted:
+        # File lists written before their sizes were recorded cannot be checked
+        return submitted["files"]
+    return changed_files(submitted["root"], submitted["stats"])
+
+
+def load_manifest(text: str) -> Manifest:
+    """Parse a manifest, treating missing or empty content as an empty manifest.
+
+    Args:
+        text: The JSON encoded manifest.
+
+    Returns:
+        The parsed manifest.
+    """
+    return json.loads(text) if text.strip() else {}
+
+
+def prune_trees_command(
+    tree_dir: str = f"~/{TREE_CACHE_DIR}", retention_days: int = TREE_RETENTION_DAYS
+) -> str:
+    """Build the shell command that removes the trees no job synced for a while.
+
+    Every sync replaces the manifest of its tree, so the age of a manifest is the time since
+    its tree was last used. Old trees are removed under their lock, and skipped while a sync
+    holds it. Files staged by syncs that did not finish are removed as well.
+
+    Args:
+        tree_dir: The directory holding the trees on the node.
+        retention_days: The number of days after which unused trees are removed.
+
+    Returns:
+        The shell command.
+    """
+    return (
+        f"(cd {tree_dir} && "
+        f"find . -maxdepth 1 -type f -name '*.json' -mtime +{retention_days} | "
+        "while read -r manifest; do "
+        'key="${manifest%.json}"; '
+        '( flock -n 9 && rm -rf -- "$key" "$manifest" "$key.lock" ) 9>> "$key.lock"; '
+        "done; "
+        "find . -maxdepth 1 -type f \\( -name '*.tar.gz' -o -name '*.deleted' \\) "
+        f"-mtime +{retention_days} -delete)"
+    )
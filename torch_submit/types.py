@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
 from .config import Database, Node
 
@@ -13,6 +13,37 @@ class Executor(str, Enum):
     OPTUNA = "optuna"
 
 
+class SyncMode(str, Enum):
+    """Enumeration of the ways the working directory is shipped to the nodes."""
+
+    ARCHIVE = "archive"
+    DELTA = "delta"
+    STREAM = "stream"
+
+
+class ArchiveCodec(str, Enum):
+    """Enumeration of working directory archive formats, named after their file suffix."""
+
+    ZIP = "zip"
+    TAR_GZ = "tar.gz"
+    TAR_ZST = "tar.zst"
+
+
+class Distribution(str, Enum):
+    """Enumeration of the ways the working directory archive reaches the worker nodes."""
+
+    DIRECT = "direct"
+    HEAD = "head"
+
+
+class CpuBind(str, Enum):
+    """Enumeration of the ways the processes of a node are pinned to its CPUs."""
+
+    NONE = "none"
+    CORES = "cores"
+    NUMA = "numa"
+
+
 class JobStatus(str, Enum):
     """Enumeration of different job statuses."""
 
@@ -45,6 +76,16 @@ class Job:
         docker_image (Optional[str]): The Docker image to be used for the job.
         database (Optional[Database]): The database configuration for the job.
         optuna_port (Optional[int]): The port for Optuna executor.
+        sync_mode (SyncMode): How the working directory is shipped to the nodes.
+        distribution (Distribution): How the working directory archive reaches the workers.
+        status_checked_at (Optional[float]): When the status was last checked on the nodes,
+                                             as a Unix timestamp.
+        log_max_bytes (int): The size at which the output log of each node is rotated, or 0
+                             to never rotate it.
+        log_keep (int): The number of rotated log segments kept on each node, or 0 to keep
+                        all of them.
+        log_compress (bool): Whether rotated log segments are compressed.
+        cpu_bind (CpuBind): How the local ranks of each node are pinned to its CPUs.
     """
 
     id: str
@@ -61,6 +102,13 @@ class Job:
     docker_image: Optional[str] = None
     database: Optional[Database] = None
     optuna_port: Optional[int] = None
+    sync_mode: SyncMode = SyncMode.ARCHIVE
+    distribution: Distribution = Distribution.DIRECT
+    status_checked_at: Optional[float] = None
+    log_max_bytes: int = 0
+    log_keep: int = 0
+    log_compress: bool = False
+    cpu_bind: CpuBind = CpuBind.NONE
 
     def __post_init__(self):
         """Post-initialization checks for the Job class."""
@@ -68,65 +116,131 @@ class Job:
             raise ValueError("Optuna executor requires a port")
 
     @classmethod
-    def from_db(cls, row: Tuple) -> "Job":
+    def from_db(
+        cls, row: Mapping, node_rows: Sequence[Mapping], pid_rows: Sequence[Mapping]
+    ) -> "Job":
         """
-        Create a Job instance from a database row.
+        Create a Job instance from its rows in the database.
 
         Args:
-            row (Tuple): A tuple representing a row from the database.
+            row (Mapping): The row of the job in the jobs table.
+            node_rows (Sequence[Mapping]): The rows of the job in the job_nodes table.
+            pid_rows (Sequence[Mapping]): The rows of the job in the job_pids table.
 
         Returns:
-            Job: A Job instance created from the database row.
+            Job: A Job instance created from the database rows.
         """
-        nodes = [Node.from_db(node) for node in row[4].split(",")]
-        pids = {}
-        if row[9]:
-            for pair in row[9].split(","):
-                node_ip, pid = pair.split(":")
-                node = next((n for n in nodes if n.public_ip == node_ip), None)
-                if node:
-                    pids[node] = int(pid)
+        nodes = {
+            node_row["rank"]: Node(
+                node_row["public_ip"],
+                node_row["private_ip"],
+                node_row["num_gpus"],
+                node_row["nproc"],
+                node_row["ssh_user"],
+                node_row["ssh_pub_key_path"],
+                node_row["ssh_port"],
+            )
+            for node_row in node_rows
+        }
+        pids = {
+            nodes[pid_row["rank"]]: pid_row["pid"]
+            for pid_row in pid_rows
+            if pid_row["rank"] in nodes
+        }
 
         return cls(
-            id=row[0],
-            name=row[1],
-            status=JobStatus(row[2]),
-            working_dir=row[3],
-            nodes=nodes,
-            cluster=row[5],
-            command=row[6],
-            max_restarts=int(row[7]),
-            num_gpus=int(row[8]) if row[8] else None,
+            id=row["id"],
+            name=row["name"],
+            status=JobStatus(row["status"]),
+            working_dir=row["working_dir"],
+            nodes=[nodes[rank] for rank in sorted(nodes)],
+            cluster=row["cluster"],
+            command=row["command"],
+            max_restarts=int(row["max_restarts"] or 0),
+            num_gpus=int(row["num_gpus"]) if row["num_gpus"] else None,
             pids=pids,
-            executor=Executor(row[10]),
-            docker_image=row[11] or None,
-            database=Database.from_db(row[12]) if row[12] else None,
-            optuna_port=int(row[13]) if row[13] else None,
+            executor=Executor(row["executor"]),
+            docker_image=row["docker_image"] or None,
+            database=Database.from_db(row["database"]) if row["database"] else None,
+            optuna_port=int(row["optuna_port"]) if row["optuna_port"] else None,
+            sync_mode=SyncMode(row["sync_mode"])
+            if row["sync_mode"]
+            else SyncMode.ARCHIVE,
+            distribution=Distribution(row["distribution"])
+            if row["distribution"]
+            else Distribution.DIRECT,
+            status_checked_at=row["status_checked_at"],
+            log_max_bytes=row["log_max_bytes"] or 0,
+            log_keep=row["log_keep"] or 0,
+            log_compress=bool(row["log_compress"]),
+            cpu_bind=CpuBind(row["cpu_bind"]) if row["cpu_bind"] else CpuBind.NONE,
         )
 
-    def to_db(self) -> Tuple:
+    def to_db(self) -> Dict[str, Any]:
         """
-        Convert the Job instance to a tuple for database storage.
+        Convert the Job instance to its row in the jobs table.
 
         Returns:
-            Tuple: A tuple representing the Job instance for database storage.
+            Dict[str, Any]: The columns of the jobs table and their values.
         """
-        return (
-            self.id,
-            self.name,
-            self.status.value,
-            self.working_dir,
-            ",".join([node.to_db() for node in self.nodes]),
-            self.cluster,
-            self.command,
-            self.max_restarts,
-            self.num_gpus or "",
-            ",".join([f"{k}:{v}" for k, v in self.pids.items()]),
-            self.executor.value,
-            self.docker_image or "",
-            self.database.to_db() or "" if self.database else "",
-            self.optuna_port or "",
-        )
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status.value,
+            "working_dir": self.working_dir,
+            "cluster": self.cluster,
+            "command": self.command,
+            "max_restarts": self.max_restarts,
+            "num_gpus": self.num_gpus,
+            "executor": self.executor.value,
+            "docker_image": self.docker_image,
+            "database": self.database.to_db() if self.database else None,
+            "optuna_port": self.optuna_port,
+            "sync_mode": self.sync_mode.value,
+            "distribution": self.distribution.value,
+            "status_checked_at": self.status_checked_at,
+            "log_max_bytes": self.log_max_bytes,
+            "log_keep": self.log_keep,
+            "log_compress": int(self.log_compress),
+            "cpu_bind": self.cpu_bind.value,
+        }
+
+    def nodes_to_db(self) -> List[Tuple]:
+        """
+        Convert the nodes of the job to their rows in the job_nodes table.
+
+        Returns:
+            List[Tuple]: One (job_id, rank, public_ip, private_ip, num_gpus, nproc, ssh_user,
+                         ssh_pub_key_path, ssh_port) tuple per node, in rank order.
+        """
+        return [
+            (
+                self.id,
+                rank,
+                node.public_ip,
+                node.private_ip,
+                node.num_gpus,
+                node.nproc,
+                node.ssh_user,
+                node.ssh_pub_key_path,
+                int(node.ssh_port) if node.ssh_port else None,
+            )
+            for rank, node in enumerate(self.nodes)
+        ]
+
+    def pids_to_db(self) -> List[Tuple]:
+        """
+        Convert the process IDs of the job to their rows in the job_pids table.
+
+        Returns:
+            List[Tuple]: One (job_id, rank, pid) tuple per node with a process ID.
+        """
+        ranks = {node: rank for rank, node in reversed(list(enumerate(self.nodes)))}
+        return [
+            (self.id, ranks[node], pid)
+            for node, pid in self.pids.items()
+            if pid is not None and node in ranks
+        ]
 
     def get_executor(self):
         """
@@ -182,6 +296,13 @@ class Job:
             f"executor={self.executor}, "
             f"docker_image={self.docker_image}, "
             f"database={self.database}, "
-            f"optuna_port={self.optuna_port}"
+            f"optuna_port={self.optuna_port}, "
+            f"sync_mode={self.sync_mode}, "
+            f"distribution={self.distribution}, "
+            f"status_checked_at={self.status_checked_at}, "
+            f"log_max_bytes={self.log_max_bytes}, "
+            f"log_keep={self.log_keep}, "
+            f"log_compress={self.log_compress}, "
+            f"cpu_bind={self.cpu_bind}"
             f")"
         )
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import random
 from typing import Dict, Optional
@@ -81,3 +82,22 @@ def get_job_metadata() -> Optional[Dict[str, str]]:
             return job_metadata
     except FileNotFoundError:
         return None
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 digest of a file.
+
+    The file is read in chunks, so that large archives do not have to fit in memory.
+
+    Args:
+        path: The path to the file.
+        chunk_size: The number of bytes to read at a time.
+
+    Returns:
+        The hexadecimal SHA-256 digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()